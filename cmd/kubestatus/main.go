@@ -4,6 +4,7 @@ import (
 	"context"
 	"encoding/json"
 	"fmt"
+	"io"
 	"log"
 	"os"
 	"strings"
@@ -18,7 +19,7 @@ func Main(ctx context.Context, version string, args ...string) error {
 	var st = &cobra.Command{
 		Use:           "kubestatus <kind> [<name>]",
 		Short:         "get and set status of kubernetes resources",
-		Args:          cobra.RangeArgs(1, 2),
+		Args:          cobra.RangeArgs(0, 2),
 		SilenceErrors: true,
 		SilenceUsage:  true,
 	}
@@ -27,10 +28,34 @@ func Main(ctx context.Context, version string, args ...string) error {
 	fields := st.Flags().StringP("field-selector", "f", "", "field selector")
 	labels := st.Flags().StringP("label-selector", "l", "", "label selector")
 	statusFile := st.Flags().StringP("update", "u", "", "update with new status from file (must be json)")
+	batchFile := st.Flags().StringP("batch", "b", "", "apply a batch of status updates from file (a stream of json objects)")
 
 	st.RunE = func(cmd *cobra.Command, args []string) error {
 		var status map[string]interface{}
 
+		if *batchFile != "" {
+			if len(args) != 0 {
+				return fmt.Errorf("--batch does not take a <kind> or <name>")
+			}
+
+			rawBatch, err := os.Open(*batchFile)
+			if err != nil {
+				return err
+			}
+			defer rawBatch.Close()
+
+			client, err := kates.NewClientFromConfigFlags(info.GetConfigFlags())
+			if err != nil {
+				return err
+			}
+
+			return runBatch(cmd.Context(), client, rawBatch, os.Stdout)
+		}
+
+		if len(args) == 0 {
+			return fmt.Errorf("requires a <kind> unless --batch is given")
+		}
+
 		if *statusFile != "" {
 			rawStatus, err := os.Open(*statusFile)
 			if err != nil {
@@ -145,3 +170,99 @@ func Main(ctx context.Context, version string, args ...string) error {
 	st.SetArgs(args)
 	return st.ExecuteContext(ctx)
 }
+
+type batchUpdate struct {
+	Kind      string                 `json:"kind"`
+	Name      string                 `json:"name"`
+	Namespace string                 `json:"namespace"`
+	Status    map[string]interface{} `json:"status"`
+}
+
+type batchResult struct {
+	Kind      string `json:"kind"`
+	Name      string `json:"name"`
+	Namespace string `json:"namespace"`
+	Error     string `json:"error,omitempty"`
+}
+
+// runBatch applies every update in input, writing one result per update to
+// output. Updates are grouped by kind and namespace, and a group with more
+// than one update is fetched with a single List rather than a Get for each
+// resource.
+func runBatch(ctx context.Context, client *kates.Client, input io.Reader, output io.Writer) error {
+	type groupKey struct {
+		kind      string
+		namespace string
+	}
+
+	groups := map[groupKey][]batchUpdate{}
+	var order []groupKey
+
+	dec := json.NewDecoder(input)
+	for {
+		var update batchUpdate
+		err := dec.Decode(&update)
+		if err == io.EOF {
+			break
+		}
+		if err != nil {
+			return err
+		}
+
+		key := groupKey{update.Kind, update.Namespace}
+		if _, ok := groups[key]; !ok {
+			order = append(order, key)
+		}
+		groups[key] = append(groups[key], update)
+	}
+
+	enc := json.NewEncoder(output)
+
+	for _, key := range order {
+		updates := groups[key]
+		listed := map[string]*kates.Unstructured{}
+
+		if len(updates) > 1 {
+			var items []*kates.Unstructured
+			err := client.List(ctx, kates.Query{Kind: key.kind, Namespace: key.namespace}, &items)
+			if err != nil {
+				// Fall back to a Get for each resource.
+				log.Printf("error listing %s in namespace %s: %v", key.kind, key.namespace, err)
+			}
+			for _, obj := range items {
+				listed[obj.GetName()] = obj
+			}
+		}
+
+		for _, update := range updates {
+			result := batchResult{Kind: update.Kind, Name: update.Name, Namespace: update.Namespace}
+
+			obj, ok := listed[update.Name]
+			var err error
+
+			if !ok {
+				obj = kates.NewUnstructured(update.Kind, "")
+				obj.SetName(update.Name)
+				if update.Namespace != "" {
+					obj.SetNamespace(update.Namespace)
+				}
+				err = client.Get(ctx, obj, obj)
+			}
+
+			if err == nil {
+				obj.Object["status"] = update.Status
+				err = client.UpdateStatus(ctx, obj, nil)
+			}
+
+			if err != nil {
+				result.Error = err.Error()
+			}
+
+			if err := enc.Encode(result); err != nil {
+				return err
+			}
+		}
+	}
+
+	return nil
+}
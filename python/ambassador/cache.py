@@ -1,6 +1,8 @@
-from typing import Any, Dict, Callable, Optional, Set, Tuple, TYPE_CHECKING
+from typing import Any, Dict, Callable, List, Optional, Set, Tuple, TYPE_CHECKING
 
+import collections
 import logging
+import sys
 
 class Cacheable(dict):
     """
@@ -31,16 +33,53 @@ class Cache():
     """
     A cache of Cacheables, supporting add/delete/fetch and also linking
     an owning Cacheable to an owned Cacheable. Deletion is cascaded: if you
-    delete something, everything it owns is recursively deleted too. THIS ONLY
-    HAPPENS IN ONE DIRECTION at present, so deleting a Cacheable in the middle
-    of the ownership tree can leave dangling pointers.
+    delete something, everything it owns is recursively deleted too. Links
+    are kept in both directions, so deleting a Cacheable in the middle of the
+    ownership tree also removes it from its owners' links, rather than leaving
+    them dangling.
+
+    The cache can also track dependencies on things that aren't cached at all
+    (Secrets, TLSContexts, Services, etc.): see add_dependency. Invalidating a
+    dependency key invalidates everything that depends on it. To ask what
+    depends on something, or what something depends on, see dependents and
+    dependencies.
+
+    Finally, the cache can be bounded by max_entries and/or max_bytes (0 means
+    unlimited). Every add or fetch marks an entry as used in the current
+    generation; end_generation(), called once a configuration built from the
+    cache is in use, evicts the least-recently-used entries until the cache
+    is back within its limits, then starts a new generation. See recency for
+    what counts as used, and evict for how eviction stays consistent with the
+    links.
     """
     
-    def __init__(self, logger: logging.Logger) -> None:
+    def __init__(self, logger: logging.Logger, max_entries: int=0, max_bytes: int=0) -> None:
         self.cache: Dict[str, CacheEntry] = {}
-        self.links: Dict[str, CacheLink] = {}
         self.logger = logger
 
+        # owner -> owned, and owned -> owner. Keys can be dependency keys as
+        # well as cache keys (see add_dependency).
+        self.links: Dict[str, CacheLink] = {}
+        self.reverse_links: Dict[str, CacheLink] = {}
+
+        # Cacheables that were rehydrated from disk (see CacheStore), and so
+        # need to be adopted by the next IR that uses this cache.
+        self.detached: List[Cacheable] = []
+
+        self.max_entries = max(max_entries, 0)
+        self.max_bytes = max(max_bytes, 0)
+
+        self.generation = 0
+
+        # key -> the last generation that added or fetched it. Entries without
+        # one (e.g. rehydrated by CacheStore) count as older than anything else.
+        self.last_used: Dict[str, int] = {}
+
+        # key -> estimated size in bytes (see estimate_size). These are only
+        # kept when max_bytes is set, since measuring isn't free.
+        self.sizes: Dict[str, int] = {}
+        self.total_bytes = 0
+
         self.reset_stats()
 
         self.logger.debug("Cache initialized")
@@ -50,6 +89,12 @@ class Cache():
         self.misses = 0
         self.invalidate_calls = 0
         self.invalidated_objects = 0
+        self.evictions = 0
+        self.evicted_objects = 0
+
+        # Where hits and misses stood at the end of the last generation.
+        self.generation_hits = 0
+        self.generation_misses = 0
 
     @staticmethod
     def fn_name(fn: Optional[Callable]) -> str:
@@ -69,11 +114,12 @@ class Cache():
             self.logger.info(f"CACHE: ignore, no cache_key: {rsrc}")
         elif key in self.cache:
             # self.logger.info(f"CACHE: ignore, already present: {rsrc}")
-            pass
+            self.last_used[key] = self.generation
         else:
             self.logger.debug(f"CACHE: adding {key}: {rsrc}, on_delete {self.fn_name(on_delete)}")
 
             self.cache[key] = (rsrc, on_delete)
+            self.last_used[key] = self.generation
 
     def link(self, owner: Cacheable, owned: Cacheable) -> None:
         """
@@ -104,8 +150,109 @@ class Cache():
 
         # self.logger.info(f"CACHE: linking {owner_key} -> {owned_key}")
 
-        links = self.links.setdefault(owner_key, set())
-        links.update([ owned_key ])
+        self.add_link(owner_key, owned_key)
+
+    @staticmethod
+    def dependency_key(kind: str, name: str, namespace: Optional[str]=None) -> str:
+        """
+        Returns the key used to track dependencies on a resource that isn't
+        itself cached. The namespace is optional because some things (like
+        TLSContexts) are looked up by name alone.
+        """
+
+        if namespace:
+            return f"Dep-{kind}-{name}-{namespace}"
+        else:
+            return f"Dep-{kind}-{name}"
+
+    def add_dependency(self, dependency: str, owned_key: str) -> None:
+        """
+        Notes that the thing named by owned_key depends on the thing named by
+        dependency. Unlike link, neither key has to be in the cache: the
+        dependency is usually something we never cache (see dependency_key),
+        and the owned key may itself be another dependency key, which lets
+        dependencies chain (e.g. Secret -> TLSContext -> Mapping).
+        """
+
+        # self.logger.info(f"CACHE: depend {dependency} -> {owned_key}")
+
+        self.add_link(dependency, owned_key)
+
+    def add_link(self, owner_key: str, owned_key: str) -> None:
+        """
+        Adds a link from owner_key to owned_key, without any checks at all.
+        Use link or add_dependency instead, unless you're restoring links that
+        were checked when they were first made (see CacheStore).
+        """
+
+        self.links.setdefault(owner_key, set()).add(owned_key)
+        self.reverse_links.setdefault(owned_key, set()).add(owner_key)
+
+    def drop_links(self, key: str) -> None:
+        """
+        Removes every link to or from key. A dependency key left with nothing
+        depending on it is dropped too, which can leave another dependency key
+        with nothing depending on it, and so on.
+        """
+
+        worklist = collections.deque([ key ])
+
+        while worklist:
+            key = worklist.popleft()
+
+            for owned in self.links.pop(key, ()):
+                owners = self.reverse_links.get(owned)
+
+                if owners is not None:
+                    owners.discard(key)
+
+                    if not owners:
+                        del(self.reverse_links[owned])
+
+            for owner in self.reverse_links.pop(key, ()):
+                links = self.links.get(owner)
+
+                if links is not None:
+                    links.discard(key)
+
+                    if not links:
+                        del(self.links[owner])
+
+                        if owner not in self.cache:
+                            worklist.append(owner)
+
+    def dependents(self, key: str) -> Set[str]:
+        """
+        Returns the keys of every cached entry that depends on the thing named by
+        'key', directly or indirectly: exactly what invalidating it would take
+        out of the cache, not counting key itself.
+        """
+
+        to_delete, _ = self.collect([ key ])
+        to_delete.pop(key, None)
+
+        return set(to_delete.keys())
+
+    def dependencies(self, key: str) -> Set[str]:
+        """
+        Returns every key that the thing named by 'key' depends on, directly
+        or indirectly: the cached entries that own it, and any dependency keys
+        (see add_dependency). Invalidating any of these would invalidate key.
+        """
+
+        found: Set[str] = set()
+        worklist = collections.deque(self.reverse_links.get(key, ()))
+
+        while worklist:
+            owner = worklist.popleft()
+
+            if owner not in found:
+                found.add(owner)
+                worklist.extend(self.reverse_links.get(owner, ()))
+
+        found.discard(key)
+
+        return found
 
     def invalidate(self, key: str) -> None:
         """
@@ -119,14 +266,34 @@ class Cache():
         #
         # Note that word "consider". If you want to invalidate something from 
         # the cache that isn't in the cache, that's not an error -- it'll be
-        # silently ignored. That helps with dangling links (e.g. if two Mappings
-        # both link to the same Group, and you invalidate the first Mapping, the 
-        # second will have a dangling link to the now-invalidated Group, and that
-        # needs to not break anything).
+        # silently ignored.
 
         self.invalidate_calls += 1
 
-        worklist = [ key ]
+        to_delete, dependencies = self.collect([ key ])
+
+        self.delete(to_delete)
+        self.invalidated_objects += len(to_delete)
+
+        for key in dependencies:
+            self.logger.debug(f"CACHE: DEP {key}: dropping links")
+            self.drop_links(key)
+
+    def collect(self, keys: List[str]) -> Tuple[Dict[str, CacheEntry], Set[str]]:
+        """
+        Find everything that invalidating the given keys would delete: the
+        entries themselves, and everything they own, recursively. Returns the
+        entries to delete, and the dependency keys that were followed to find
+        them.
+        """
+
+        worklist = collections.deque(keys)
+
+        # Dependency keys (see add_dependency) aren't in the cache, but they can
+        # have links. We follow those too, and invalidate drops their links once
+        # it's done, since whatever depended on them will get relinked when it's
+        # rebuilt.
+        dependencies: Set[str] = set()
 
         # Under the hood, "invalidating" something from this cache is really
         # deleting it, so we'll use "to_delete" for the set of things we're going
@@ -138,7 +305,7 @@ class Cache():
         # Keep going until we have nothing else to do.
         while worklist:
             # Pop off the first thing...
-            key = worklist.pop(0)
+            key = worklist.popleft()
 
             # ...and check if it's in the cache.
             if key in self.cache:
@@ -153,24 +320,37 @@ class Cache():
 
                     # ...and then toss all of its linked objects on our list to
                     # consider.
-                    if key in self.links:
-                        for owned in sorted(self.links[key]):
-                            self.logger.debug(f"CACHE: DEL {key}: will check owned {owned}")
-                            worklist.append(owned)
+                    owned_keys = self.links.get(key, ())
+                    self.logger.debug(f"CACHE: DEL {key}: will check owned {owned_keys}")
+                    worklist.extend(owned_keys)
 
                     # (If we have seen the key already, just ignore it and go to the next
                     # key in the worklist. This is important to not get stuck if we somehow
                     # get a circular link list.)
+            elif (key in self.links) and (key not in dependencies):
+                # Not cached, but linked: this is a dependency key. Consider everything
+                # that depends on it.
+                dependencies.add(key)
+
+                self.logger.debug(f"CACHE: DEP {key}: will check dependents {self.links[key]}")
+                worklist.extend(self.links[key])
+
+        return to_delete, dependencies
+
+    def delete(self, to_delete: Dict[str, CacheEntry]) -> None:
+        """
+        Delete the given entries from the cache (see collect and evict).
+        """
 
-        # OK, we have a set of things to delete. Get to it.
         for key, rdh in to_delete.items():
             self.logger.debug(f"CACHE: DEL {key}: smiting!")
 
-            self.invalidated_objects += 1
             del(self.cache[key])
 
-            if key in self.links:
-                del(self.links[key])
+            self.drop_links(key)
+
+            self.last_used.pop(key, None)
+            self.total_bytes -= self.sizes.pop(key, 0)
 
             rsrc, on_delete = rdh
 
@@ -178,6 +358,167 @@ class Cache():
                 self.logger.debug(f"CACHE: DEL {key}: calling {self.fn_name(on_delete)}")
                 on_delete(rsrc)
 
+    @staticmethod
+    def estimate_size(rsrc: Cacheable) -> int:
+        """
+        Estimate how many bytes rsrc holds: itself, plus everything reachable
+        through its dicts, lists, tuples, and sets -- but not other Cacheables,
+        which are accounted for under their own keys.
+        """
+
+        seen: Set[int] = set()
+        worklist: List[Any] = [ rsrc ]
+        size = 0
+
+        while worklist:
+            obj = worklist.pop()
+
+            if id(obj) in seen:
+                continue
+
+            seen.add(id(obj))
+            size += sys.getsizeof(obj)
+
+            if isinstance(obj, dict):
+                for k, v in obj.items():
+                    worklist.append(k)
+
+                    if not isinstance(v, Cacheable):
+                        worklist.append(v)
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                worklist.extend(v for v in obj if not isinstance(v, Cacheable))
+
+        return size
+
+    def over_limits(self) -> bool:
+        if self.max_entries and (len(self.cache) > self.max_entries):
+            return True
+
+        if self.max_bytes and (self.total_bytes > self.max_bytes):
+            return True
+
+        return False
+
+    def recency(self) -> Dict[str, int]:
+        """
+        Returns the last generation in which each entry, or anything it owns
+        (recursively), was used. Owners have to count as used along with what
+        they own, since what gets fetched isn't always the owner: the IR fetches
+        a Group, for example, but never the Mapping that owns it.
+        """
+
+        recency: Dict[str, int] = {}
+
+        # Going from the most recently used down, the first time we reach an
+        # entry is by way of the most recently used thing it owns.
+        for key in sorted(self.cache.keys(), key=lambda k: -self.last_used.get(k, -1)):
+            generation = self.last_used.get(key, -1)
+            worklist = [ key ]
+
+            while worklist:
+                k = worklist.pop()
+
+                if (k not in recency) and (k in self.cache):
+                    recency[k] = generation
+                    worklist.extend(self.reverse_links.get(k, ()))
+
+        return recency
+
+    def evict(self, key: str) -> Set[str]:
+        """
+        Evict the entry named by 'key' from the cache, returning the keys of
+        every entry that went with it.
+
+        Dropping an entry that something else owns would leave its owner behind
+        pointing at something that's no longer there (a Group whose Cluster is
+        gone, say), so evicting an entry evicts everything that owns it, too.
+        Then everything those own goes as well, as long as nothing that's
+        staying in the cache owns it. Nothing here has changed, so unlike
+        invalidate, this never follows dependency keys (though deleting the
+        entries drops them from the dependency keys' links).
+        """
+
+        # Find every cached owner of key, recursively...
+        to_delete: Dict[str, CacheEntry] = {}
+        worklist = [ key ]
+
+        while worklist:
+            k = worklist.pop()
+
+            if (k not in to_delete) and (k in self.cache):
+                to_delete[k] = self.cache[k]
+                worklist.extend(self.reverse_links.get(k, ()))
+
+        # ...then everything they own that isn't also owned by something staying.
+        worklist = collections.deque(to_delete.keys())
+
+        while worklist:
+            k = worklist.popleft()
+
+            for owned in self.links.get(k, ()):
+                if (owned in to_delete) or (owned not in self.cache):
+                    continue
+
+                if all((owner in to_delete) or (owner not in self.cache) for owner in self.reverse_links.get(owned, ())):
+                    self.logger.debug(f"CACHE: EVICT {k}: will evict owned {owned}")
+                    to_delete[owned] = self.cache[owned]
+                    worklist.append(owned)
+
+        self.delete(to_delete)
+
+        self.evictions += 1
+        self.evicted_objects += len(to_delete)
+
+        return set(to_delete.keys())
+
+    def end_generation(self) -> Dict[str, int]:
+        """
+        Finish the current generation: if the cache is over its limits, evict
+        entries, least recently used first, until it isn't. Then start a new
+        generation. Returns stats for the generation just finished.
+
+        This must only be called between reconfigures, never while an IR or
+        Envoy config is being built from the cache.
+        """
+
+        if self.max_bytes:
+            # Measure anything we haven't measured yet.
+            for key, (rsrc, _) in self.cache.items():
+                if key not in self.sizes:
+                    self.sizes[key] = self.estimate_size(rsrc)
+                    self.total_bytes += self.sizes[key]
+
+        evicted: Set[str] = set()
+
+        if self.over_limits():
+            recency = self.recency()
+            lru = sorted(self.cache.keys(), key=lambda k: (recency[k], k))
+
+            for key in lru:
+                if not self.over_limits():
+                    break
+
+                # An earlier eviction may have taken this one along with it.
+                if key in self.cache:
+                    evicted.update(self.evict(key))
+
+            self.logger.debug(f"CACHE: evicted {len(evicted)} entries, {len(self.cache)} left")
+
+        stats = {
+            "generation": self.generation,
+            "hits": self.hits - self.generation_hits,
+            "misses": self.misses - self.generation_misses,
+            "evicted": len(evicted),
+            "entries": len(self.cache),
+            "bytes": self.total_bytes
+        }
+
+        self.generation_hits = self.hits
+        self.generation_misses = self.misses
+        self.generation += 1
+
+        return stats
+
     def __getitem__(self, key: str) -> Optional[Cacheable]:
         """
         Fetches only the _resource_ for a given key from the cache. If the
@@ -192,6 +533,7 @@ class Cache():
         if item is not None:
             self.logger.debug(f"CACHE: fetch {key}")
             self.hits += 1
+            self.last_used[key] = self.generation
             return item[0]
         else:
             self.logger.debug(f"CACHE: missing {key}")
@@ -212,6 +554,13 @@ class Cache():
                 for owned in sorted(self.links[k]):
                     self.logger.info(f"CACHE:   -> {owned}")
 
+        for k in sorted(self.links.keys()):
+            if k not in self.cache:
+                self.logger.info(f"CACHE: {k} (dependency):")
+
+                for owned in sorted(self.links[k]):
+                    self.logger.info(f"CACHE:   -> {owned}")
+
     def dump_stats(self) -> None:
         total = self.hits + self.misses
 
@@ -224,6 +573,8 @@ class Cache():
         self.logger.info("CACHE: Hit ratio:      %s" % ratio)
         self.logger.info("CACHE: Invalidations:  %d calls" % self.invalidate_calls)
         self.logger.info("CACHE:                 %d objects" % self.invalidated_objects)
+        self.logger.info("CACHE: Evictions:      %d calls" % self.evictions)
+        self.logger.info("CACHE:                 %d objects" % self.evicted_objects)
 
 
 class NullCache(Cache):
@@ -239,6 +590,8 @@ class NullCache(Cache):
     def __init__(self, logger: logging.Logger) -> None:
         self.logger = logger
         self.logger.debug("NullCache: INIT")
+        self.detached = []
+        self.generation = 0
         self.reset_stats()
         pass
 
@@ -249,6 +602,18 @@ class NullCache(Cache):
     def link(self, owner: Cacheable, owned: Cacheable) -> None:
         pass
 
+    def add_dependency(self, dependency: str, owned_key: str) -> None:
+        pass
+
+    def add_link(self, owner_key: str, owned_key: str) -> None:
+        pass
+
+    def dependents(self, key: str) -> Set[str]:
+        return set()
+
+    def dependencies(self, key: str) -> Set[str]:
+        return set()
+
     def invalidate(self, key: str) -> None:
         self.invalidate_calls += 1
         pass
@@ -256,6 +621,21 @@ class NullCache(Cache):
     def __getitem__(self, key: str) -> Any:
         self.misses += 1
         return None
+
+    def end_generation(self) -> Dict[str, int]:
+        stats = {
+            "generation": self.generation,
+            "hits": 0,
+            "misses": self.misses - self.generation_misses,
+            "evicted": 0,
+            "entries": 0,
+            "bytes": 0
+        }
+
+        self.generation_misses = self.misses
+        self.generation += 1
+
+        return stats
     
     def dump(self) -> None:
         self.logger.info("NullCache: empty")
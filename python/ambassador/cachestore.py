@@ -0,0 +1,331 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import hashlib
+import hmac
+import io
+import logging
+import os
+import pickle
+import secrets
+import stat
+
+from .cache import Cache, Cacheable
+from .config import ACResource
+from .ir import IR
+from .ir.irresource import IRResource
+from .VERSION import Version, Build
+
+# DeltaList is the same shape as the Deltas we get from watt.
+DeltaList = List[Dict[str, Any]]
+
+# The IR pointer of a rehydrated resource gets pickled as this persistent ID.
+PERSISTENT_IR = "ir"
+
+# How long a key we sign the persisted cache with.
+KEY_BYTES = 32
+
+
+class CachePickler(pickle.Pickler):
+    """
+    A Pickler that refuses to follow the IR pointer of an IRResource (we'd
+    end up pickling the whole IR!) and that pickles loggers by name.
+    """
+
+    def persistent_id(self, obj: Any) -> Any:
+        if isinstance(obj, IR):
+            return PERSISTENT_IR
+
+        if isinstance(obj, logging.Logger):
+            return ("logger", obj.name)
+
+        return None
+
+
+class CacheUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid: Any) -> Any:
+        if pid == PERSISTENT_IR:
+            # There's no IR yet; the first IR to use the cache will adopt everything
+            # we load (see Cache.detached).
+            return None
+
+        if isinstance(pid, tuple) and (pid[0] == "logger"):
+            return logging.getLogger(pid[1])
+
+        raise pickle.UnpicklingError(f"unknown persistent ID {pid}")
+
+
+class CacheStore:
+    """
+    A persistent store for a Cache, so that diagd can rehydrate its cache at
+    startup rather than rebuilding everything from scratch.
+
+    The whole cache -- every entry, the cache's link graph, and hashes of the
+    input resources that the cache was built from -- is pickled in one go, so
+    that objects shared between entries are still shared once they're loaded.
+    Comparing the input hashes against a new set of inputs gives us a DeltaList
+    to feed through the normal incremental path.
+
+    Unpickling runs arbitrary code, so the pickle is prefixed with an HMAC
+    (keyed by a secret that only we can read) covering both it and a fingerprint
+    of the code that built the cache, and we won't load anything from a file
+    or directory that someone else could have written.
+
+    Deletion handlers are not persisted: nothing in Ambassador uses them at
+    present.
+    """
+
+    def __init__(self, logger: logging.Logger, path: str,
+                 fingerprint: Optional[str]=None) -> None:
+        self.logger = logger
+        self.path = path
+        self.cache_path = os.path.join(path, "cache.pickle")
+        self.key_path = os.path.join(path, "cache.key")
+        self.fingerprint = fingerprint or CacheStore.code_fingerprint()
+
+        # self.saved is what we last stored (or loaded): the entries, links, and
+        # inputs. If none of them have changed, there's no need to save again.
+        self.saved: Optional[Tuple[Dict[str, Cacheable], Dict[str, List[str]], Dict[str, str]]] = None
+
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        self.check_private(path, os.stat(path), 0o022)
+
+        self.key = self.load_key()
+
+    @staticmethod
+    def code_fingerprint() -> str:
+        """
+        Returns a fingerprint for the code and environment that build the cache:
+        if either changes, persisted entries can't be trusted.
+        """
+
+        h = hashlib.sha256()
+        h.update(f"{Version}\n{Build.git.commit}\n".encode("utf-8"))
+
+        for k in sorted(os.environ.keys()):
+            if k.startswith("AMBASSADOR_"):
+                h.update(f"{k}={os.environ[k]}\n".encode("utf-8"))
+
+        return h.hexdigest()
+
+    @staticmethod
+    def input_key(kind: str, name: str, namespace: str) -> str:
+        return ACResource.content_key(kind, name, namespace)
+
+    @staticmethod
+    def input_hashes(resources: Iterable[ACResource]) -> Dict[str, str]:
+        """
+        Hashes a set of input resources, keyed by kind, name, and namespace.
+        """
+
+        return ACResource.content_hashes(resources)
+
+    @staticmethod
+    def deltas(old_inputs: Dict[str, str], new_inputs: Dict[str, str]) -> DeltaList:
+        """
+        Compares two sets of input hashes, and returns a Delta for every
+        resource that was added, changed, or removed.
+        """
+
+        deltas: DeltaList = []
+
+        for key in sorted(set(old_inputs.keys()) | set(new_inputs.keys())):
+            old_hash = old_inputs.get(key)
+            new_hash = new_inputs.get(key)
+
+            if old_hash == new_hash:
+                continue
+
+            if old_hash is None:
+                delta_type = "add"
+            elif new_hash is None:
+                delta_type = "delete"
+            else:
+                delta_type = "update"
+
+            kind, name, namespace = key.split("|", 2)
+
+            deltas.append({
+                "kind": kind,
+                "metadata": { "name": name, "namespace": namespace },
+                "deltaType": delta_type
+            })
+
+        return deltas
+
+    @staticmethod
+    def check_private(path: str, st: os.stat_result, forbidden_mode: int) -> None:
+        """
+        Raise unless path (whose stat result is st) is ours, and has none of
+        the forbidden_mode bits set.
+        """
+
+        if st.st_uid != os.getuid():
+            raise PermissionError(f"{path} is owned by UID {st.st_uid}, not {os.getuid()}")
+
+        if st.st_mode & forbidden_mode:
+            raise PermissionError(f"{path} has mode {stat.S_IMODE(st.st_mode):o}")
+
+    def load_key(self) -> bytes:
+        """
+        Load our HMAC key, creating it first if need be.
+        """
+
+        try:
+            fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "wb") as f:
+                f.write(secrets.token_bytes(KEY_BYTES))
+
+        with open(self.key_path, "rb") as f:
+            self.check_private(self.key_path, os.fstat(f.fileno()), 0o077)
+            key = f.read()
+
+        if len(key) < KEY_BYTES:
+            raise ValueError(f"{self.key_path} is truncated")
+
+        return key
+
+    def sign(self, data: bytes) -> bytes:
+        return hmac.new(self.key, data, hashlib.sha256).hexdigest().encode("ascii")
+
+    def write_atomically(self, path: str, data: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+            f.write(data)
+
+        os.replace(tmp_path, path)
+
+    def remove(self) -> None:
+        try:
+            os.unlink(self.cache_path)
+        except FileNotFoundError:
+            pass
+
+    def save(self, cache: Cache, inputs: Dict[str, str]) -> None:
+        """
+        Persist a Cache, along with the hashes of the inputs it was built from.
+        If nothing has changed since the last save, nothing is written.
+        """
+
+        entries = { key: rsrc for key, (rsrc, _) in cache.cache.items() }
+        links = { k: sorted(v) for k, v in cache.links.items() }
+
+        if self.saved:
+            saved_entries, saved_links, saved_inputs = self.saved
+
+            if ((saved_entries.keys() == entries.keys()) and
+                all(saved_entries[key] is rsrc for key, rsrc in entries.items()) and
+                (saved_links == links) and (saved_inputs == inputs)):
+                self.logger.debug("CACHESTORE: cache unchanged, not saving")
+                return
+
+        buf = io.BytesIO()
+
+        try:
+            CachePickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump({
+                "entries": entries,
+                "links": links,
+                "inputs": inputs
+            })
+        except Exception as e:
+            # Not fatal: we'll just start with whatever we saved last time, and
+            # the input hashes will tell us what changed since.
+            self.logger.error(f"CACHESTORE: cannot persist cache: {e}")
+            return
+
+        data = self.fingerprint.encode("utf-8") + b"\n" + buf.getvalue()
+        self.write_atomically(self.cache_path, self.sign(data) + b"\n" + data)
+
+        self.saved = (entries, links, inputs)
+
+        self.logger.debug(f"CACHESTORE: saved {len(entries)} entries ({len(data)} bytes)")
+
+    def load(self, cache: Cache) -> Optional[Dict[str, str]]:
+        """
+        Rehydrate a Cache from disk. The Cache should be empty. Returns the input
+        hashes saved with the cache, or None if there was nothing usable on disk
+        (in which case the Cache is left empty).
+        """
+
+        try:
+            with open(self.cache_path, "rb") as f:
+                self.check_private(self.cache_path, os.fstat(f.fileno()), 0o022)
+                contents = f.read()
+        except FileNotFoundError:
+            self.logger.info("CACHESTORE: no persisted cache")
+            return None
+        except Exception as e:
+            self.logger.error(f"CACHESTORE: could not read persisted cache: {e}")
+            return None
+
+        signature, _, data = contents.partition(b"\n")
+
+        if not hmac.compare_digest(signature, self.sign(data)):
+            self.logger.error("CACHESTORE: persisted cache failed verification, ignoring it")
+            self.remove()
+            return None
+
+        fingerprint, _, pickled = data.partition(b"\n")
+
+        if fingerprint != self.fingerprint.encode("utf-8"):
+            self.logger.info("CACHESTORE: persisted cache was built by different code, ignoring it")
+            self.remove()
+            return None
+
+        try:
+            persisted = CacheUnpickler(io.BytesIO(pickled)).load()
+        except Exception as e:
+            self.logger.error(f"CACHESTORE: could not load persisted cache: {e}")
+            self.remove()
+            return None
+
+        for key, rsrc in persisted["entries"].items():
+            cache.cache[key] = (rsrc, None)
+
+        for k, v in persisted["links"].items():
+            for owned in v:
+                cache.add_link(k, owned)
+
+        cache.detached = self.find_detached(cache)
+
+        self.saved = (persisted["entries"], persisted["links"], persisted["inputs"])
+
+        self.logger.info(f"CACHESTORE: rehydrated {len(cache.cache)} entries")
+
+        return persisted["inputs"]
+
+    @staticmethod
+    def find_detached(cache: Cache) -> List[IRResource]:
+        """
+        Find every IRResource reachable from the cache, including those nested in
+        other resources, since they all need a new IR pointer.
+        """
+
+        detached: List[IRResource] = []
+        seen: Set[int] = set()
+        worklist: List[Any] = [ rsrc for rsrc, _ in cache.cache.values() ]
+
+        while worklist:
+            obj = worklist.pop()
+
+            if id(obj) in seen:
+                continue
+
+            seen.add(id(obj))
+
+            if isinstance(obj, IRResource):
+                detached.append(obj)
+
+            if isinstance(obj, dict):
+                worklist.extend(obj.values())
+            elif isinstance(obj, (list, tuple)):
+                worklist.extend(obj)
+
+            if isinstance(obj, Cacheable):
+                # Some Cacheables (e.g. V3Route) keep references as real attributes.
+                worklist.extend(vars(obj).values())
+
+        return detached
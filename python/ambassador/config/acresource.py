@@ -1,7 +1,11 @@
 # from typing import List
-from typing import Optional, Type, TypeVar, TYPE_CHECKING
+from typing import Dict, Iterable, List, Optional, Type, TypeVar, TYPE_CHECKING
 from typing import cast as typecast
 
+import hashlib
+
+import orjson
+
 from ..resource import Resource
 
 R = TypeVar('R', bound=Resource)
@@ -142,3 +146,41 @@ class ACResource (Resource):
             description="The '--diagnostics--' source marks objects created by Ambassador to assist with diagnostic output."
         )
 
+    def content_hash(self) -> str:
+        """
+        Return a stable hash of this resource's contents. The raw serialization
+        is left out: it can change (with the status of a Kubernetes resource,
+        say) when nothing we build from the resource has.
+        """
+
+        contents = dict(self)
+
+        for key in [ 'serialization', '_referenced_by', '_errored' ]:
+            contents.pop(key, None)
+
+        return hashlib.sha256(orjson.dumps(contents, default=str,
+                                           option=orjson.OPT_NON_STR_KEYS|orjson.OPT_SORT_KEYS)).hexdigest()
+
+    @staticmethod
+    def content_key(kind: str, name: str, namespace: str) -> str:
+        return f"{kind}|{name}|{namespace}"
+
+    @staticmethod
+    def content_hashes(resources: Iterable['ACResource']) -> Dict[str, str]:
+        """
+        Hash a set of resources, keyed by kind, name, and namespace (see
+        content_key). Comparing the hashes of two sets of resources tells us
+        exactly which resources were added, changed, or removed.
+        """
+
+        hashes: Dict[str, List[str]] = {}
+
+        for rsrc in resources:
+            key = ACResource.content_key(rsrc.kind, rsrc.name, rsrc.get('namespace') or '')
+            hashes.setdefault(key, []).append(rsrc.content_hash())
+
+        # Several resources can share a key (e.g. duplicates from annotations),
+        # so combine their hashes in a stable order.
+        return { key: (digests[0] if len(digests) == 1 else
+                       hashlib.sha256("".join(sorted(digests)).encode("utf-8")).hexdigest())
+                 for key, digests in hashes.items() }
@@ -17,22 +17,18 @@ from typing import Any, Callable, ClassVar, Dict, Iterable, List, Optional, Tupl
 from typing import cast as typecast
 
 import collections
-import importlib
-import json
 import logging
 import os
 
-import jsonschema
-
 from multi import multi
 from pkg_resources import Requirement, resource_filename
-from google.protobuf import json_format
 
 from ..utils import RichStatus, dump_json, parse_bool
 
 from ..resource import Resource
 from .acresource import ACResource
 from .acmapping import ACMapping
+from .validators import validator_registry
 
 
 #############################################################################
@@ -166,6 +162,13 @@ class Config:
         self.logger.debug("SCHEMA DIR    %s" % os.path.abspath(self.schema_dir_path))
         self.k8s_status_updates: Dict[str, Tuple[str, str, Optional[Dict[str, Any]]]] = {}  # Tuple is (name, namespace, status_json)
         self.pod_labels: Dict[str, str] = {}
+
+        # Which Kubernetes object (kind, name, namespace) carried each resource
+        # that came from annotations, keyed by the resource's content_key. (Not
+        # by rkey: annotations and CRDs can have the same rkeys.) The fetcher
+        # fills this in.
+        self.annotation_sources: Dict[str, Tuple[str, str, str]] = {}
+
         self._reset()
 
     def _reset(self) -> None:
@@ -603,21 +606,11 @@ class Config:
         return RichStatus.OK(msg="Not validating getambassador.io/{apiVersion} {kind}")
 
     def get_proto_validator(self, apiVersion, kind) -> Optional[Validator]:
-        # See if we can import a protoclass...
-        proto_modname = f"ambassador.proto.{apiVersion}.{kind}_pb2"
-        proto_classname = f"{kind}Spec"
-        m = None
-
-        try:
-            m = importlib.import_module(proto_modname)
-        except ModuleNotFoundError:
-            self.logger.debug(f"no proto in {proto_modname}")
-            return None
-
-        protoclass = getattr(m, proto_classname, None)
+        # See if we can import a protoclass. (The validator_registry remembers
+        # this across Configs, so we needn't go through importlib every time.)
+        protoclass = validator_registry.protoclass(self.logger, apiVersion, kind)
 
         if not protoclass:
-            self.logger.debug(f"no class {proto_classname} in {proto_modname}")
             return None
 
         self.logger.debug(f"using validate_with_proto for getambassador.io/{apiVersion} {kind}")
@@ -629,12 +622,11 @@ class Config:
     def validate_with_proto(self, resource: ACResource, protoclass: Any) -> RichStatus:
         # This is... a little odd.
         #
-        # First, protobuf works with JSON, not dictionaries. Second, by the time we get here,
-        # the metadata has been folded in, and our *Spec protos (HostSpec, etc) don't include
-        # the metadata (by design).
+        # By the time we get here, the metadata has been folded in, and our *Spec
+        # protos (HostSpec, etc) don't include the metadata (by design).
         #
-        # So. We make a copy, strip the metadata fields, serialize, and _then_ see if  we can
-        # parse it. Yuck.
+        # So. We make a copy, strip the metadata fields, and _then_ see if we can
+        # parse it.
 
         rdict = resource.as_dict()
         rdict.pop('apiVersion', None)
@@ -645,46 +637,38 @@ class Config:
         metadata_labels = rdict.pop('metadata_labels', None)
         generation = rdict.pop('generation', None)
 
-        serialized = dump_json(rdict)
+        error = validator_registry.validate(protoclass.DESCRIPTOR.full_name, rdict,
+                                            lambda obj: validator_registry.proto_error(obj, protoclass))
 
-        try:
-            json_format.Parse(serialized, protoclass())
-        except json_format.ParseError as e:
-            return RichStatus.fromError(str(e))
+        if error:
+            return RichStatus.fromError(error)
 
         return RichStatus.OK(msg=f"good {resource.kind}")
 
     def get_jsonschema_validator(self, apiVersion, kind) -> Optional[Validator]:
-        # Do we have a JSONSchema on disk for this?
+        # Do we have a JSONSchema on disk for this? (Again, the validator_registry
+        # remembers the compiled schema across Configs.)
         schema_path = os.path.join(self.schema_dir_path, apiVersion, f"{kind}.schema")
 
-        try:
-            schema = json.load(open(schema_path, "r"))
-
-            # Note that we'll never get here if the schema doesn't parse.
-            if schema:
-                self.logger.debug(f"using validate_with_jsonschema for getambassador.io/{apiVersion} {kind}")
+        validator = validator_registry.jsonschema_validator(self.logger, schema_path)
 
-                # Ew. Early binding for Python lambdas is kinda weird.
-                return typecast(Validator,
-                                lambda resource, schema=schema: self.validate_with_jsonschema(resource, schema))
-        except OSError:
-            self.logger.debug(f"no schema at {schema_path}, not validating")
-            return None
-        except json.decoder.JSONDecodeError as e:
-            self.logger.warning(f"corrupt schema at {schema_path}, skipping ({e})")
+        if not validator:
             return None
 
-        # This can't actually happen -- the only way to get here is to have an uncaught
-        # exception. But it shuts up mypy so WTF.
-        return None
+        self.logger.debug(f"using validate_with_jsonschema for getambassador.io/{apiVersion} {kind}")
+
+        # Ew. Early binding for Python lambdas is kinda weird.
+        return typecast(Validator,
+                        lambda resource, path=schema_path, validator=validator:
+                            self.validate_with_jsonschema(resource, path, validator))
+
+    def validate_with_jsonschema(self, resource: ACResource, schema_path: str, validator: Any) -> RichStatus:
+        error = validator_registry.validate(schema_path, resource.as_dict(),
+                                            lambda obj: validator_registry.jsonschema_error(obj, validator))
 
-    def validate_with_jsonschema(self, resource: ACResource, schema: dict) -> RichStatus:
-        try:
-            jsonschema.validate(resource.as_dict(), schema)
-        except jsonschema.exceptions.ValidationError as e:
+        if error:
             # Nope. Bzzzzt.
-            return RichStatus.fromError(f"not a valid {resource.kind}: {e}")
+            return RichStatus.fromError(f"not a valid {resource.kind}: {error}")
 
         # All good. Return an OK.
         return RichStatus.OK(msg=f"good {resource.kind}")
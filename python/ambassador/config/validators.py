@@ -0,0 +1,197 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import collections
+import hashlib
+import importlib
+import json
+import logging
+import threading
+
+import jsonschema
+import orjson
+
+from google.protobuf import json_format
+
+from ..utils import dump_json
+
+
+class ValidatorRegistry:
+    """
+    Every reconfigure makes a new Config, so anything Config caches for itself
+    gets thrown away. The ValidatorRegistry holds what's worth keeping across
+    Configs for the whole process:
+
+    - the proto class for each apiVersion and kind (or the fact that there
+      isn't one);
+    - the compiled jsonschema validator for each schema file; and
+    - the result of validating each distinct resource, keyed by a hash of its
+      contents, so that a resource we've seen before needn't be validated
+      again.
+    """
+
+    def __init__(self, max_results: int=10000) -> None:
+        self.max_results = max_results
+
+        self.lock = threading.Lock()
+
+        # proto module and class name -> proto class, or None if there isn't one
+        self.protoclasses: Dict[str, Optional[Any]] = {}
+
+        # schema path -> compiled jsonschema validator, or None if there isn't one
+        self.schemas: Dict[str, Optional[Any]] = {}
+
+        # (validator key, content hash) -> error message, or None if it's valid
+        self.results: 'collections.OrderedDict[Tuple[str, str], Optional[str]]' = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self.lock:
+            self.protoclasses = {}
+            self.schemas = {}
+            self.results = collections.OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    def protoclass(self, logger: logging.Logger, apiVersion: str, kind: str) -> Optional[Any]:
+        proto_modname = f"ambassador.proto.{apiVersion}.{kind}_pb2"
+        proto_classname = f"{kind}Spec"
+        key = f"{proto_modname}.{proto_classname}"
+
+        with self.lock:
+            if key in self.protoclasses:
+                return self.protoclasses[key]
+
+        protoclass = None
+
+        try:
+            m = importlib.import_module(proto_modname)
+            protoclass = getattr(m, proto_classname, None)
+
+            if not protoclass:
+                logger.debug(f"no class {proto_classname} in {proto_modname}")
+        except ModuleNotFoundError:
+            logger.debug(f"no proto in {proto_modname}")
+
+        with self.lock:
+            self.protoclasses[key] = protoclass
+
+        return protoclass
+
+    def jsonschema_validator(self, logger: logging.Logger, schema_path: str) -> Optional[Any]:
+        with self.lock:
+            if schema_path in self.schemas:
+                return self.schemas[schema_path]
+
+        validator = None
+
+        try:
+            with open(schema_path, "r") as schema_file:
+                schema = json.load(schema_file)
+
+            # Note that we'll never get here if the schema doesn't parse.
+            if schema:
+                cls = jsonschema.validators.validator_for(schema)
+                cls.check_schema(schema)
+                validator = cls(schema)
+        except OSError:
+            logger.debug(f"no schema at {schema_path}, not validating")
+        except json.decoder.JSONDecodeError as e:
+            logger.warning(f"corrupt schema at {schema_path}, skipping ({e})")
+        except jsonschema.exceptions.SchemaError as e:
+            logger.warning(f"invalid schema at {schema_path}, skipping ({e.message})")
+
+        with self.lock:
+            self.schemas[schema_path] = validator
+
+        return validator
+
+    @staticmethod
+    def content_hash(obj: Any) -> Optional[str]:
+        try:
+            return hashlib.sha256(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS|orjson.OPT_SORT_KEYS)).hexdigest()
+        except TypeError:
+            # Something in here isn't JSON-serializable, so we can't remember
+            # what we thought of it.
+            return None
+
+    def validate(self, key: str, obj: Any, check: Callable[[Any], Optional[str]]) -> Optional[str]:
+        """
+        Validate obj with check, unless we've already checked something with
+        the same contents using the validator identified by key. Returns the
+        error message, or None if obj is valid.
+        """
+
+        digest = self.content_hash(obj)
+
+        if digest is not None:
+            with self.lock:
+                if (key, digest) in self.results:
+                    self.results.move_to_end((key, digest))
+                    self.hits += 1
+                    return self.results[(key, digest)]
+
+        error = check(obj)
+
+        with self.lock:
+            self.misses += 1
+
+            if digest is not None:
+                self.results[(key, digest)] = error
+
+                while len(self.results) > self.max_results:
+                    self.results.popitem(last=False)
+
+        return error
+
+    @staticmethod
+    def proto_error(rdict: Dict[str, Any], protoclass: Any) -> Optional[str]:
+        try:
+            json_format.ParseDict(rdict, protoclass())
+            return None
+        except Exception:
+            # ParseDict can be pickier than parsing JSON about things like
+            # YAML timestamps, so let a round trip through JSON decide.
+            pass
+
+        try:
+            json_format.Parse(dump_json(rdict), protoclass())
+        except json_format.ParseError as e:
+            return str(e)
+
+        return None
+
+    @staticmethod
+    def jsonschema_error(obj: Any, validator: Any) -> Optional[str]:
+        error = jsonschema.exceptions.best_match(validator.iter_errors(obj))
+
+        return str(error) if error else None
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "protoclasses": len(self.protoclasses),
+                "schemas": len(self.schemas),
+                "results": len(self.results),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# The one registry for the whole process.
+validator_registry = ValidatorRegistry()
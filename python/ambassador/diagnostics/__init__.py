@@ -1,2 +1,3 @@
 from .diagnostics import Diagnostics
 from .envoy_stats import EnvoyStatsMgr, EnvoyStats
+from .overview_patches import OverviewPatcher
@@ -163,7 +163,7 @@ class DiagResult:
         :param obj: object for which to include referencing keys
         """
 
-        for element_key in obj['_referenced_by']:
+        for element_key in obj.get('_referenced_by', []):
             self.include_element(element_key)
 
     def include_cluster(self, cluster: dict) -> DiagCluster:
@@ -600,8 +600,8 @@ class Diagnostics:
 
         for m in group['mappings']:
             fm = {
-                "_active": m['_active'],
-                "_errored": m['_errored'],
+                "_active": m._active,
+                "_errored": m._errored,
                 "_rkey": m['rkey'],
                 "location": m['location'],
                 "name": m['name'],
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import logging
 import requests
@@ -22,6 +22,13 @@ import time
 from dataclasses import dataclass
 from dataclasses import field as dc_field
 
+# The per-cluster stats we actually use. While parsing, each cluster gets a
+# record holding just these, in this order; every other per-cluster stat is
+# skipped without even parsing its value.
+CLUSTER_STATS = ( 'membership_healthy', 'membership_total', 'update_attempt', 'update_success',
+                  'upstream_rq_completed', 'upstream_rq_4xx', 'upstream_rq_5xx' )
+CLUSTER_STAT_INDEX = { stat: idx for idx, stat in enumerate(CLUSTER_STATS) }
+
 def percentage(x: float, y: float) -> int:
     if y == 0:
         return 0
@@ -146,8 +153,67 @@ class EnvoyStats:
         return cstat
 
 
+def parse_envoy_stats(lines: Iterable[str]) -> Tuple[Dict[str, Any], Dict[str, List[int]]]:
+    """
+    Parse the output of Envoy's /stats endpoint, one line at a time.
+
+    Per-cluster stats are by far the bulk of the output, and we only need a
+    few of them, so they go into a record per cluster (see CLUSTER_STATS).
+    Everything else gets parsed into a hierarchy of dicts.
+
+    :param lines: the lines of /stats output
+    :return: the hierarchy of non-cluster stats, and the cluster records
+    """
+
+    envoy_stats: Dict[str, Any] = {}    # Ew.
+    cluster_records: Dict[str, List[int]] = {}
+
+    for line in lines:
+        if not line:
+            continue
+
+        key, _, value = line.partition(":")
+
+        if key.startswith("cluster."):
+            cluster_name, _, stat = key[8:].partition(".")
+            record = cluster_records.get(cluster_name)
+
+            if record is None:
+                record = [ 0 ] * len(CLUSTER_STATS)
+                cluster_records[cluster_name] = record
+
+            idx = CLUSTER_STAT_INDEX.get(stat)
+
+            if idx is not None:
+                try:
+                    record[idx] = int(value)
+                except ValueError:
+                    pass
+
+            continue
+
+        keypath = key.split('.')
+
+        node = envoy_stats
+
+        for element in keypath[:-1]:
+            if element not in node:
+                node[element] = {}
+
+            node = node[element]
+
+        # Skip histograms for the moment (and any stat whose name is also a
+        # prefix of other stats).
+        try:
+            node[keypath[-1]] = int(value)
+        except (TypeError, ValueError):
+            continue
+
+    return envoy_stats, cluster_records
+
+
 LogLevelFetcher = Callable[[Optional[str]], Optional[str]]
-EnvoyStatsFetcher = Callable[[], Optional[str]]
+EnvoyStatsFetcher = Callable[[], Optional[Union[str, Iterable[str]]]]
 
 class EnvoyStatsMgr:
     # fetch_log_levels and fetch_envoy_stats are debugging hooks
@@ -163,6 +229,11 @@ class EnvoyStatsMgr:
         self.fetch_log_levels = fetch_log_levels or self._fetch_log_levels
         self.fetch_envoy_stats = fetch_envoy_stats or self._fetch_envoy_stats
 
+        # A keep-alive connection to Envoy's admin port for fetching stats. Only
+        # update_envoy_stats uses it, and it's always called with the update_lock
+        # held, so the session is never shared between threads.
+        self.stats_session = requests.Session()
+
         self.stats = EnvoyStats(
             created=time.time(),
             max_live_age=max_live_age,
@@ -188,19 +259,30 @@ class EnvoyStatsMgr:
             self.logger.warning("EnvoyStats.update_log_levels failed: %s" % e)
             return None
 
-    def _fetch_envoy_stats(self) -> Optional[str]:
+    def _fetch_envoy_stats(self) -> Optional[Iterable[str]]:
         try:
-            r = requests.get("http://127.0.0.1:8001/stats")
+            r = self.stats_session.get("http://127.0.0.1:8001/stats", stream=True)
 
             if r.status_code != 200:
                 self.logger.warning("EnvoyStats.update failed: %s" % r.text)
+                r.close()
                 return None
 
-            return r.text
+            return self._stream_lines(r)
         except OSError as e:
             self.logger.warning("EnvoyStats.update failed: %s" % e)
             return None
 
+    @staticmethod
+    def _stream_lines(r: requests.Response) -> Iterator[str]:
+        # Hand back lines as they arrive, rather than reading the whole thing
+        # first. Closing the response puts the connection back in the pool.
+        try:
+            for line in r.iter_lines(chunk_size=65536):
+                yield line.decode('utf-8', errors='replace')
+        finally:
+            r.close()
+
     def update_log_levels(self, last_attempt: float, level: Optional[str]=None) -> bool:
         """
         Heavy lifting around updating the Envoy log levels.
@@ -285,6 +367,23 @@ class EnvoyStatsMgr:
             return ''
         return r.text
 
+    def _stats_update_failed(self, last_attempt: float) -> None:
+        # EnvoyStats is immutable, so...
+        new_stats = EnvoyStats(
+            max_live_age=self.stats.max_live_age,
+            max_ready_age=self.stats.max_ready_age,
+            created=self.stats.created,
+            last_update=self.stats.last_update,
+            last_attempt=last_attempt,                    # THIS IS A CHANGE
+            update_errors=self.stats.update_errors + 1,   # THIS IS A CHANGE
+            requests=self.stats.requests,
+            clusters=self.stats.clusters,
+            envoy=self.stats.envoy
+        )
+
+        with self.access_lock:
+            self.stats = new_stats
+
     def update_envoy_stats(self, last_attempt: float) -> None:
         """
         Heavy lifting around updating the Envoy stats.
@@ -300,55 +399,17 @@ class EnvoyStatsMgr:
         text = self.fetch_envoy_stats()
 
         if not text:
-            # EnvoyStats is immutable, so...
-            new_stats = EnvoyStats(
-                max_live_age=self.stats.max_live_age,
-                max_ready_age=self.stats.max_ready_age,
-                created=self.stats.created,
-                last_update=self.stats.last_update,
-                last_attempt=last_attempt,                    # THIS IS A CHANGE
-                update_errors=self.stats.update_errors + 1,   # THIS IS A CHANGE
-                requests=self.stats.requests,
-                clusters=self.stats.clusters,
-                envoy=self.stats.envoy
-            )
-
-            with self.access_lock:
-                self.stats = new_stats
-                return
-
-        # Parse stats into a hierarchy.
-        envoy_stats: Dict[str, Any] = {}    # Ew.
-
-        for line in text.split("\n"):
-            if not line:
-                continue
-
-            # self.logger.info('line: %s' % line)
-            key, value = line.split(":")
-            keypath = key.split('.')
-
-            node = envoy_stats
-
-            for key in keypath[:-1]:
-                if key not in node:
-                    node[key] = {}
-
-                node = node[key]
-
-            value = value.strip()
-
-            # Skip histograms for the moment.
-            # if value.startswith("P0("):
-            #     continue
-            #     # for field in value.split(' '):
-            #     #     if field.startswith('P95('):
-            #     #         value = field.split(',')
+            self._stats_update_failed(last_attempt)
+            return
 
-            try:
-                node[keypath[-1]] = int(value)
-            except:
-                continue
+        # Parse stats as they arrive. If the connection drops partway through,
+        # that's a failed update like any other.
+        try:
+            envoy_stats, cluster_records = parse_envoy_stats(text.split("\n") if isinstance(text, str) else text)
+        except OSError as e:
+            self.logger.warning("EnvoyStats.update failed: %s" % e)
+            self._stats_update_failed(last_attempt)
+            return
 
         # Now dig into clusters a bit more.
 
@@ -374,9 +435,12 @@ class EnvoyStatsMgr:
                 "ok": requests_ok,
             }
 
-        if "cluster" in envoy_stats:
-            for cluster_name in envoy_stats['cluster']:
-                cluster = envoy_stats['cluster'][cluster_name]
+        if cluster_records:
+            for cluster_name, record in cluster_records.items():
+                # Weird: upstream_rq_completed, not upstream_rq_2xx or
+                # upstream_rq_pending_total, is the total here.
+                ( healthy_members, total_members, update_attempts, update_successes,
+                  upstream_total, upstream_4xx, upstream_5xx ) = record
 
                 # # Toss any _%d -- that's madness with our Istio code at the moment.
                 # cluster_name = re.sub('_\d+$', '', cluster_name)
@@ -384,25 +448,13 @@ class EnvoyStatsMgr:
                 # mapping_name = active_cluster_map[cluster_name]
                 # active_mappings[mapping_name] = {}
 
-                # self.logger.info("cluster %s stats: %s" % (cluster_name, cluster))
+                # self.logger.info("cluster %s stats: %s" % (cluster_name, record))
 
                 healthy_percent: Optional[int]
                 
-                healthy_members = cluster['membership_healthy']
-                total_members = cluster['membership_total']
                 healthy_percent = percentage(healthy_members, total_members)
-
-                update_attempts = cluster['update_attempt']
-                update_successes = cluster['update_success']
                 update_percent = percentage(update_successes, update_attempts)
 
-                # Weird.
-                # upstream_ok = cluster.get('upstream_rq_2xx', 0)
-                # upstream_total = cluster.get('upstream_rq_pending_total', 0)
-                upstream_total = cluster.get('upstream_rq_completed', 0)
-
-                upstream_4xx = cluster.get('upstream_rq_4xx', 0)
-                upstream_5xx = cluster.get('upstream_rq_5xx', 0)
                 upstream_bad = upstream_5xx # used to include 4XX here, but that seems wrong.
 
                 upstream_ok = upstream_total - upstream_bad
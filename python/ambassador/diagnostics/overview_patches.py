@@ -0,0 +1,246 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import collections
+import hashlib
+import json
+import threading
+
+import jsonpatch
+from expiringdict import ExpiringDict
+
+
+def pointer_token(name: str) -> str:
+    # RFC 6901 escaping for a single JSON pointer token.
+    return name.replace('~', '~0').replace('/', '~1')
+
+
+class OverviewPatcher:
+    """
+    Hands out the diag overview to polling clients as JSON patches (see
+    http://jsonpatch.com/) against whatever each client saw last.
+
+    Rather than keeping a full copy of the overview for every client, we keep
+    a few recent versions of it, and each client just remembers which version
+    it has. A version is made of the content hashes of its top-level
+    sections; each section is parsed only once per distinct content, and the
+    patch between two versions is computed once and then shared by every
+    client going from one to the other.
+
+    Sections that don't appear in volatile are assumed to depend only on
+    stable_key (e.g. the configuration generation and when Envoy stats were
+    last updated), so as long as stable_key doesn't change we don't even
+    serialize them again.
+    """
+
+    def __init__(self, serialize: Callable[[Any], str], parse: Callable[[str], Any],
+                 max_versions: int=16, max_patches: int=64, max_clients: int=1000,
+                 max_age_seconds: int=60) -> None:
+        self.serialize = serialize
+        self.parse = parse
+        self.max_versions = max_versions
+        self.max_patches = max_patches
+
+        # Requests come in on many threads at once.
+        self.lock = threading.Lock()
+
+        # Which version each client has.
+        self.clients = ExpiringDict(max_len=max_clients, max_age_seconds=max_age_seconds)
+
+        # version ID -> { section name: section hash }
+        self.versions: 'collections.OrderedDict[str, Dict[str, str]]' = collections.OrderedDict()
+
+        # section hash -> parsed section, for every section of a kept version
+        self.sections: Dict[str, Any] = {}
+
+        # (from version, to version) -> patch document
+        self.patches: 'collections.OrderedDict[Tuple[str, str], str]' = collections.OrderedDict()
+
+        # stable key -> { section name: section hash }
+        self.stable: 'collections.OrderedDict[Hashable, Dict[str, str]]' = collections.OrderedDict()
+
+        self.serialized = 0
+        self.patches_computed = 0
+        self.patches_shared = 0
+
+    def expire(self) -> None:
+        """
+        Drop clients we haven't heard from in max_age_seconds.
+        """
+
+        # Getting elements in the ExpiringDict makes sure eviction happens on
+        # its TTL rather than waiting for it to fill up. Loop over a copy of
+        # the keys so we don't mutate it while iterating.
+        for k in list(self.clients.keys()):
+            self.clients.get(k)
+
+    def section_hash(self, name: str, value: Any, stable_hashes: Optional[Dict[str, str]]) -> str:
+        if stable_hashes is not None:
+            digest = stable_hashes.get(name)
+
+            if digest is not None:
+                return digest
+
+        serialized = self.serialize(value)
+        self.serialized += 1
+
+        digest = hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+        if digest not in self.sections:
+            self.sections[digest] = self.parse(serialized)
+
+        if stable_hashes is not None:
+            stable_hashes[name] = digest
+
+        return digest
+
+    def add_version(self, tvars: Dict[str, Any], stable_key: Optional[Hashable],
+                    volatile: Iterable[str]) -> str:
+        stable_hashes: Optional[Dict[str, str]] = None
+
+        if stable_key is not None:
+            stable_hashes = self.stable.get(stable_key)
+
+            if stable_hashes is None:
+                stable_hashes = {}
+                self.stable[stable_key] = stable_hashes
+
+                while len(self.stable) > self.max_versions:
+                    self.stable.popitem(last=False)
+            else:
+                self.stable.move_to_end(stable_key)
+
+        volatile = set(volatile)
+
+        hashes = {
+            name: self.section_hash(name, value, None if name in volatile else stable_hashes)
+            for name, value in tvars.items()
+        }
+
+        version = hashlib.sha256(json.dumps(hashes, sort_keys=True).encode('utf-8')).hexdigest()
+
+        if version in self.versions:
+            self.versions.move_to_end(version)
+        else:
+            self.versions[version] = hashes
+            self.prune()
+
+        return version
+
+    def prune(self) -> None:
+        while len(self.versions) > self.max_versions:
+            self.versions.popitem(last=False)
+
+        live = set()
+
+        for hashes in self.versions.values():
+            live.update(hashes.values())
+
+        for stable_hashes in self.stable.values():
+            live.update(stable_hashes.values())
+
+        for digest in list(self.sections.keys()):
+            if digest not in live:
+                del self.sections[digest]
+
+    def patch_between(self, old: Optional[str], new: str) -> str:
+        key = (old or "", new)
+        patch = self.patches.get(key)
+
+        if patch is not None:
+            self.patches.move_to_end(key)
+            self.patches_shared += 1
+            return patch
+
+        old_hashes = self.versions.get(old, {}) if old else {}
+        new_hashes = self.versions[new]
+
+        ops: List[Dict[str, Any]] = []
+
+        for name in sorted(old_hashes.keys()):
+            if name not in new_hashes:
+                ops.append({ "op": "remove", "path": "/" + pointer_token(name) })
+
+        for name in sorted(new_hashes.keys()):
+            old_digest = old_hashes.get(name)
+            new_digest = new_hashes[name]
+            path = "/" + pointer_token(name)
+
+            if old_digest == new_digest:
+                continue
+
+            new_value = self.sections[new_digest]
+
+            if old_digest is None:
+                ops.append({ "op": "add", "path": path, "value": new_value })
+                continue
+
+            old_value = self.sections[old_digest]
+
+            if not (isinstance(old_value, (dict, list)) and (type(old_value) == type(new_value))):
+                ops.append({ "op": "replace", "path": path, "value": new_value })
+                continue
+
+            for op in jsonpatch.make_patch(old_value, new_value).patch:
+                op = dict(op)
+                op["path"] = path + op["path"]
+
+                if "from" in op:
+                    op["from"] = path + op["from"]
+
+                ops.append(op)
+
+        patch = json.dumps(ops)
+        self.patches_computed += 1
+
+        self.patches[key] = patch
+
+        while len(self.patches) > self.max_patches:
+            self.patches.popitem(last=False)
+
+        return patch
+
+    def patch_for(self, client: str, tvars: Dict[str, Any], stable_key: Optional[Hashable]=None,
+                  volatile: Iterable[str]=()) -> str:
+        """
+        Return the patch that takes client from the version it saw last (or
+        from an empty object, if we don't know what it saw) to tvars.
+        """
+
+        with self.lock:
+            version = self.add_version(tvars, stable_key, volatile)
+
+            old = self.clients.get(client)
+
+            if old not in self.versions:
+                # We've forgotten that version, so start the client over.
+                old = None
+
+            patch = self.patch_between(old, version)
+            self.clients[client] = version
+
+            return patch
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "clients": len(self.clients),
+                "versions": len(self.versions),
+                "sections": len(self.sections),
+                "serialized": self.serialized,
+                "patches_computed": self.patches_computed,
+                "patches_shared": self.patches_shared
+            }
@@ -0,0 +1,216 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, List, Set
+
+import hashlib
+import logging
+import os
+import re
+
+import orjson
+
+
+class ADSFileWriter:
+    """
+    Writes the Envoy configuration files that ambex reads, skipping any file
+    whose contents haven't changed since we last wrote it.
+
+    If resource_files is set, write_ads() also splits the ADS config up: each
+    cluster and each listener (with its routes) goes into a file of its own in
+    resource_dir, which must be one of the directories ambex watches, and only
+    the files for resources that changed get rewritten. Each of those files is
+    a Bootstrap holding a single resource, since ambex merges the
+    static_resources of every Bootstrap it finds, and converts the listeners
+    in them to RDS.
+
+    Every write_ads() also records what changed in MANIFEST_NAME. Ambex skips
+    files whose names start with a dot, so it never tries to load the manifest
+    (or our temporary files).
+    """
+
+    PREFIX = "ambassador-ads-"
+    MANIFEST_NAME = ".ads-manifest.json"
+
+    def __init__(self, logger: logging.Logger, resource_dir: str, resource_files: bool=False) -> None:
+        self.logger = logger
+        self.resource_dir = resource_dir
+        self.resource_files = resource_files
+
+        # Hashes of what we last wrote, by path.
+        self.written: Dict[str, str] = {}
+        self.version = 0
+
+        self.files_written = 0
+        self.files_skipped = 0
+        self.files_removed = 0
+
+        if not resource_files:
+            # Make sure no resource files from an earlier run get merged with
+            # the single ADS file.
+            self.remove_stale(set())
+
+    @staticmethod
+    def serialize(obj: Any, pretty: bool=False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS|orjson.OPT_SORT_KEYS
+
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(obj, option=option)
+
+    @staticmethod
+    def resource_filename(kind: str, name: str) -> str:
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+
+        if safe_name != name:
+            # Don't let two names collide once they're made safe.
+            safe_name += "-" + hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+
+        return f"{ADSFileWriter.PREFIX}{kind}-{safe_name}.json"
+
+    def write_file(self, path: str, obj: Any, pretty: bool=True) -> bool:
+        """
+        Write obj to path as JSON, unless that's exactly what we wrote last
+        time. Returns True if we wrote the file.
+        """
+
+        return self.write_bytes(path, self.serialize(obj, pretty=pretty))
+
+    def write_bytes(self, path: str, contents: bytes) -> bool:
+        digest = hashlib.sha256(contents).hexdigest()
+
+        if (self.written.get(path) == digest) and os.path.exists(path):
+            self.files_skipped += 1
+            return False
+
+        # Write to a dotfile and rename it into place, so that ambex never sees
+        # half a file.
+        tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+
+        with open(tmp_path, "wb") as output:
+            output.write(contents)
+
+        os.replace(tmp_path, path)
+
+        self.written[path] = digest
+        self.files_written += 1
+        return True
+
+    def remove_stale(self, keep: Set[str]) -> List[str]:
+        """
+        Remove any resource files in resource_dir that aren't in keep.
+        """
+
+        removed: List[str] = []
+
+        try:
+            names = os.listdir(self.resource_dir)
+        except OSError:
+            return removed
+
+        for name in names:
+            if name.startswith(self.PREFIX) and name.endswith(".json") and (name not in keep):
+                path = os.path.join(self.resource_dir, name)
+
+                try:
+                    os.unlink(path)
+                except OSError as e:
+                    self.logger.error(f"could not remove stale ADS file {path}: {e}")
+                    continue
+
+                self.written.pop(path, None)
+                removed.append(name)
+
+        self.files_removed += len(removed)
+        return removed
+
+    def write_ads(self, ads_path: str, ads_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Write the ADS config for ambex, and return the manifest describing what
+        changed.
+        """
+
+        self.version += 1
+
+        manifest: Dict[str, Any] = {
+            "version": self.version,
+            "resources": {},
+            "added": [],
+            "changed": [],
+            "removed": []
+        }
+
+        if not self.resource_files:
+            if self.write_file(ads_path, ads_config):
+                manifest["changed"].append(os.path.basename(ads_path))
+
+            self.write_manifest(manifest)
+            return manifest
+
+        static_resources = ads_config.get('static_resources', {})
+
+        # The main ADS file keeps everything except the clusters and listeners.
+        base_config = {
+            **ads_config,
+            'static_resources': { **static_resources, 'clusters': [], 'listeners': [] }
+        }
+
+        if self.write_file(ads_path, base_config):
+            manifest["changed"].append(os.path.basename(ads_path))
+
+        for kind, key in [ ("cluster", "clusters"), ("listener", "listeners") ]:
+            for resource in static_resources.get(key, []):
+                filename = self.resource_filename(kind, resource['name'])
+                path = os.path.join(self.resource_dir, filename)
+                existed = path in self.written
+
+                document = {
+                    '@type': ads_config['@type'],
+                    'static_resources': { key: [ resource ] }
+                }
+
+                contents = self.serialize(document)
+                manifest["resources"][filename] = {
+                    "kind": kind,
+                    "name": resource['name'],
+                    "hash": hashlib.sha256(contents).hexdigest()
+                }
+
+                if self.write_bytes(path, contents):
+                    manifest["changed" if existed else "added"].append(filename)
+
+        manifest["removed"] = self.remove_stale(set(manifest["resources"].keys()))
+
+        self.logger.debug("ADS files v%d: %d added, %d changed, %d removed, %d unchanged" %
+                          (self.version, len(manifest["added"]), len(manifest["changed"]),
+                           len(manifest["removed"]),
+                           len(manifest["resources"]) - len(manifest["added"]) - len(manifest["changed"])))
+
+        self.write_manifest(manifest)
+        return manifest
+
+    def write_manifest(self, manifest: Dict[str, Any]) -> None:
+        path = os.path.join(self.resource_dir, self.MANIFEST_NAME)
+
+        with open(path, "wb") as output:
+            output.write(self.serialize(manifest, pretty=True))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "version": self.version,
+            "written": self.files_written,
+            "skipped": self.files_skipped,
+            "removed": self.files_removed
+        }
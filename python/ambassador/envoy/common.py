@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import json
 
@@ -23,6 +23,7 @@ from ..utils import dump_json
 
 if TYPE_CHECKING:
     from ..ir import IR, IRResource # pragma: no cover
+    from ..ir.ircluster import IRCluster # pragma: no cover
     from ..ir.irhttpmappinggroup import IRHTTPMappingGroup # pragma: no cover
     from ...ir.irserviceresolver import ClustermapEntry # pragma: no cover
 
@@ -77,6 +78,15 @@ class EnvoyConfig:
     def split_config(self) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, 'ClustermapEntry']]:
         pass
 
+    @abstractmethod
+    def update_endpoints(self, clusters: List['IRCluster']) -> int:
+        """
+        Patch the Envoy clusters built from clusters, whose targets have
+        changed (see IR.update_endpoints), in place. Returns how many Envoy
+        clusters changed.
+        """
+        pass
+
     @abstractmethod
     def as_dict(self) -> Dict[str, Any]:
         pass
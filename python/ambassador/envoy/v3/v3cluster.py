@@ -13,7 +13,7 @@
 # limitations under the License
 
 import urllib
-from typing import Dict, List, Union, TYPE_CHECKING
+from typing import Any, Dict, List, Union, TYPE_CHECKING
 
 from ...cache import Cacheable
 from ...ir.ircluster import IRCluster
@@ -72,14 +72,7 @@ class V3Cluster(Cacheable):
                 'service_name': cmap_entry['endpoint_path']
             }
         else:
-            fields['load_assignment'] = {
-                'cluster_name': cluster.envoy_name,
-                'endpoints': [
-                    {
-                        'lb_endpoints': self.get_endpoints(cluster)
-                    }
-                ]
-            }
+            fields['load_assignment'] = self.get_load_assignment(cluster)
 
         if cluster.cluster_idle_timeout_ms:
             cluster_idle_timeout_ms = cluster.cluster_idle_timeout_ms
@@ -183,6 +176,34 @@ class V3Cluster(Cacheable):
 
         self.update(fields)
 
+    def get_load_assignment(self, cluster: IRCluster) -> Dict[str, Any]:
+        return {
+            'cluster_name': cluster.envoy_name,
+            'endpoints': [
+                {
+                    'lb_endpoints': self.get_endpoints(cluster)
+                }
+            ]
+        }
+
+    def update_endpoints(self, cluster: IRCluster) -> bool:
+        """
+        Rewrite our load assignment from cluster's current targets. EDS clusters
+        get their endpoints straight from ambex, so there's nothing to do for
+        those. Returns True if anything changed.
+        """
+
+        if 'load_assignment' not in self:
+            return False
+
+        load_assignment = self.get_load_assignment(cluster)
+
+        if load_assignment == self['load_assignment']:
+            return False
+
+        self['load_assignment'] = load_assignment
+        return True
+
     def get_endpoints(self, cluster: IRCluster):
         result = []
 
@@ -15,13 +15,15 @@
 from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 
 import json
+import os
 
 from ...cache import Cache, NullCache
+from ...utils import parse_bool
 
 from ..common import EnvoyConfig, sanitize_pre_json
 from .v3admin import V3Admin
 from .v3bootstrap import V3Bootstrap
-from .v3route import V3Route, V3RouteVariants
+from .v3route import V3Route, V3RouteIndex, V3RouteVariants
 from .v3listener import V3Listener
 from .v3cluster import V3Cluster
 from .v3_static_resources import V3StaticResources
@@ -30,6 +32,7 @@ from .v3ratelimit import V3RateLimit
 
 if TYPE_CHECKING:
     from ...ir import IR # pragma: no cover
+    from ...ir.ircluster import IRCluster # pragma: no cover
     from ...ir.irserviceresolver import ClustermapEntry # pragma: no cover
 
 
@@ -44,10 +47,12 @@ class V3Config (EnvoyConfig):
     bootstrap: V3Bootstrap
     routes: List[V3Route]
     route_variants: List[V3RouteVariants]
+    route_index: V3RouteIndex
     listeners: List[V3Listener]
     clusters: List[V3Cluster]
     static_resources: V3StaticResources
     clustermap: Dict[str, Any]
+    merge_virtual_hosts: bool
 
     def __init__(self, ir: 'IR', cache: Optional[Cache]=None) -> None:
         ir.logger.info("EnvoyConfig: Generating V3")
@@ -58,6 +63,10 @@ class V3Config (EnvoyConfig):
         # ...then make sure we have a cache (which might be a NullCache).
         self.cache = cache or NullCache(self.ir.logger)
 
+        # Should virtual hosts with identical routes share a single virtual host
+        # (with several domains) rather than each carrying its own copy?
+        self.merge_virtual_hosts = parse_bool(os.environ.get('AMBASSADOR_MERGE_VIRTUAL_HOSTS', 'false'))
+
         V3Admin.generate(self)
         V3Tracing.generate(self)
 
@@ -71,6 +80,18 @@ class V3Config (EnvoyConfig):
     def has_listeners(self) -> bool:
         return len(self.listeners) > 0
 
+    def update_endpoints(self, clusters: List['IRCluster']) -> int:
+        by_name = { cluster['name']: cluster for cluster in self.clusters }
+        updated = 0
+
+        for ircluster in clusters:
+            cluster = by_name.get(ircluster.envoy_name)
+
+            if cluster and cluster.update_endpoints(ircluster):
+                updated += 1
+
+        return updated
+
     def as_dict(self) -> Dict[str, Any]:
         bootstrap_config, ads_config, clustermap = self.split_config()
 
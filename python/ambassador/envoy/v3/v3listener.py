@@ -703,20 +703,24 @@ class V3Listener(dict):
             # The data structure we're walking here is config.route_variants rather than
             # config.routes. There's a one-to-one correspondence between the two, but we use the
             # V3RouteVariants to lazily cache some of the work that we're doing across chains.
-            for rv in self.config.route_variants:
-                if self._log_debug:
-                    logger.debug("  CHECK ROUTE: %s", v3prettyroute(dict(rv.route)))
+            #
+            # Rather than asking every Host about every route, we use config.route_index to
+            # find the routes that match each Host, then walk just those routes in order.
+            # (Routes that match no Host on this chain are dropped outright.)
+            route_hosts: Dict[int, List[IRHost]] = {}
 
-                matching_hosts = chain.matching_hosts(rv.route)
+            for host in chain.hosts.values():
+                for idx in self.config.route_index.matching_routes(host):
+                    route_hosts.setdefault(idx, []).append(host)
+
+            for idx in sorted(route_hosts.keys()):
+                rv = self.config.route_variants[idx]
+                matching_hosts = route_hosts[idx]
 
                 if self._log_debug:
+                    logger.debug("  CHECK ROUTE: %s", v3prettyroute(dict(rv.route)))
                     logger.debug("    = matching_hosts %s", ", ".join([ h.hostname for h in matching_hosts ]))
 
-                if not matching_hosts:
-                    if self._log_debug:
-                        logger.debug(f"    drop outright: no hosts match {sorted(rv.route['_host_constraints'])}")
-                    continue
-
                 for host in matching_hosts:
                     # For each host, we need to look at things for the secure world as well
                     # as the insecure world, depending on what the action is exactly (and note
@@ -768,6 +772,7 @@ class V3Listener(dict):
 
                             variant = dict(rv.get_variant(matcher, action.lower()))
                             variant["_host_constraints"] = set([ hostname ])
+                            variant["_envoy_route"] = rv.get_envoy_variant(matcher, action.lower())
                             chain.add_route(variant)
                         else:
                             if self._log_debug:
@@ -899,14 +904,21 @@ class V3Listener(dict):
 
             # OK, we have the filter_chain variable set -- build the Envoy virtual_hosts for it.
 
-            for host in chain.hosts.values():
-                # Make certain that no internal keys from the route make it into the Envoy 
-                # configuration.
-                routes = []
-                
-                for r in chain.routes:
-                    routes.append({ k: v for k, v in r.items() if k[0] != '_' })
+            # Make certain that no internal keys from the route make it into the Envoy
+            # configuration. Most routes already have a stripped copy shared with every
+            # other chain using the same variant (see compute_chains); every host on
+            # this chain can share this list, too.
+            routes = []
+
+            for r in chain.routes:
+                envoy_route = r.get("_envoy_route")
+
+                if envoy_route is None:
+                    envoy_route = { k: v for k, v in r.items() if k[0] != '_' }
 
+                routes.append(envoy_route)
+
+            for host in chain.hosts.values():
                 # Do we - somehow - already have a vhost for this hostname? (This should
                 # be "impossible".)
 
@@ -929,8 +941,13 @@ class V3Listener(dict):
             http_config = dict(typecast(dict, self._base_http_config))
 
             # ...and unfold our vhosts dict into a list for Envoy.
+            vhosts = list(filter_chain["_vhosts"].values())
+
+            if self.config.merge_virtual_hosts:
+                vhosts = self.merge_vhosts(vhosts)
+
             http_config["route_config"] = {
-                "virtual_hosts": list(filter_chain["_vhosts"].values())
+                "virtual_hosts": vhosts
             }
 
             # Now that we've saved our vhosts as a list, drop the dict version.
@@ -959,6 +976,34 @@ class V3Listener(dict):
             # ...and save it.
             self._filter_chains.append(filter_chain)
 
+    def merge_vhosts(self, vhosts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Collapse virtual hosts with exactly the same routes into a single
+        virtual host for all their domains. Envoy picks the virtual host by
+        the best domain match no matter which virtual host the domain is in,
+        so this doesn't change routing, but it means each distinct route table
+        appears once per route_config, rather than once per host.
+
+        Virtual hosts share their Envoy routes (see compute_chains), so two
+        route lists are the same if they hold the same route objects.
+        """
+
+        merged: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+
+        for vhost in vhosts:
+            key = tuple(id(route) for route in vhost["routes"])
+            extant = merged.get(key)
+
+            if extant is None:
+                merged[key] = vhost
+            else:
+                extant["domains"] = extant["domains"] + vhost["domains"]
+
+        if self._log_debug:
+            self._irlistener.logger.debug("FHTTP %s: merged %d vhosts into %d", self, len(vhosts), len(merged))
+
+        return list(merged.values())
+
     def as_dict(self) -> dict:
         odict = {
             "name": self.name,
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from typing import Any, Dict, List, Optional, Set, Tuple, Union, TYPE_CHECKING
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union, TYPE_CHECKING
 from typing import cast as typecast
 
 from ..common import EnvoyRoute
@@ -25,6 +25,7 @@ from .v3ratelimitaction import V3RateLimitAction
 
 if TYPE_CHECKING:
     from . import V3Config # pragma: no cover
+    from ...ir.irhost import IRHost # pragma: no cover
 
 
 # This is the root of a certain amount of ugliness in this file -- it's a V3Route
@@ -158,10 +159,12 @@ class V3RouteVariants:
 
     route: 'V3Route'
     variants: Dict[str, DictifiedV3Route]
+    envoy_variants: Dict[str, Dict[str, Any]]
 
     def __init__(self, route: 'V3Route') -> None:
         self.route = route
         self.variants = {}
+        self.envoy_variants = {}
 
     # get_variant might return a cached variant, or it might make a new one.
     # Whatever. The important thing is that you can specify a matcher name
@@ -201,6 +204,20 @@ class V3RouteVariants:
         self.variants[key] = variant
         return self.variants[key]
 
+    # get_envoy_variant is get_variant with our internal keys stripped out, ready
+    # to hand to Envoy. It's cached too, so every virtual host that uses a given
+    # variant shares the same dict.
+    def get_envoy_variant(self, matcher: str, action: str) -> Dict[str, Any]:
+        key = f"{matcher.lower()}-{action.lower()}"
+
+        envoy_variant = self.envoy_variants.get(key, None)
+
+        if envoy_variant is None:
+            envoy_variant = { k: v for k, v in self.get_variant(matcher, action).items() if k[0] != '_' }
+            self.envoy_variants[key] = envoy_variant
+
+        return envoy_variant
+
     # Always match: don't add anything to the route.
     def matcher_always(self, variant: DictifiedV3Route) -> None:
         pass
@@ -258,6 +275,126 @@ class V3RouteVariants:
         }
 
 
+class V3RouteIndex:
+    """
+    A V3RouteIndex answers the question "which routes match this Host?"
+    without checking every Host against every route. It's built once per
+    V3Config, from config.route_variants, and shared by every V3Listener.
+
+    The answer has to be exactly what IRHost.matches_httpgroup would say for
+    each route, so a route is indexed by its group's host glob:
+
+    - any group with a host_regex matches every Host;
+    - "*" matches every Host whose hostname isn't itself a glob;
+    - "foo*" is a prefix glob, "*.foo" is a suffix glob;
+    - a glob without a '*' is an exact name;
+    - anything else (e.g. "foo.*.com") is checked the slow way.
+
+    and by its group's metadata labels, for Hosts that use a selector.
+
+    Hostnames that are themselves globs (e.g. "*.example.com") are checked
+    against each distinct route glob, which is still much cheaper than
+    checking every route.
+    """
+
+    route_variants: List[V3RouteVariants]
+    globs: Dict[str, List[int]]
+    exact: Dict[str, List[int]]
+    prefix: Dict[str, List[int]]
+    suffix: Dict[str, List[int]]
+    other: Dict[str, List[int]]
+    star: List[int]
+    regex: List[int]
+    labels: Dict[Tuple[str, str], List[int]]
+
+    def __init__(self, route_variants: List[V3RouteVariants]) -> None:
+        self.route_variants = route_variants
+        self.globs = {}
+        self.exact = {}
+        self.prefix = {}
+        self.suffix = {}
+        self.other = {}
+        self.star = []
+        self.regex = []
+        self.labels = {}
+
+        for idx, rv in enumerate(route_variants):
+            group = rv.route._group
+
+            if group.get('host_regex') or False:
+                # A regex matches any Host.
+                self.regex.append(idx)
+            else:
+                glob = group.get('host') or None
+
+                if glob:
+                    self.globs.setdefault(glob, []).append(idx)
+
+                    # This is the same order of checks that hostglob_matches uses.
+                    if glob == "*":
+                        self.star.append(idx)
+                    elif glob.endswith("*"):
+                        self.prefix.setdefault(glob[:-1], []).append(idx)
+                    elif glob.startswith("*"):
+                        self.suffix.setdefault(glob[1:], []).append(idx)
+                    elif "*" in glob:
+                        self.other.setdefault(glob, []).append(idx)
+                    else:
+                        self.exact.setdefault(glob, []).append(idx)
+
+            labels = group.get('metadata_labels') or {}
+
+            for k, v in labels.items():
+                self.labels.setdefault((k, v), []).append(idx)
+
+    def matching_routes(self, host: 'IRHost') -> Set[int]:
+        """
+        Return the indices (into route_variants) of every route that matches
+        the given Host.
+        """
+
+        matches: Set[int] = set(self.regex)
+        hostname = host.hostname
+
+        if "*" in hostname:
+            # The Host is itself a glob, so check it against each distinct glob.
+            for glob, indices in self.globs.items():
+                if hostglob_matches(hostname, glob):
+                    matches.update(indices)
+        else:
+            self._update(matches, self.star)
+            self._update(matches, self.exact.get(hostname))
+
+            # Every prefix and suffix of the hostname is a candidate key.
+            for i in range(len(hostname) + 1):
+                self._update(matches, self.prefix.get(hostname[:i]))
+                self._update(matches, self.suffix.get(hostname[i:]))
+
+            for glob, indices in self.other.items():
+                if hostglob_matches(hostname, glob):
+                    matches.update(indices)
+
+        selector = host.get('selector')
+
+        if selector:
+            match_labels = selector.get('matchLabels') or {}
+
+            if not match_labels:
+                # A selector with no matchLabels matches everything (see selector_matches).
+                return set(range(len(self.route_variants)))
+
+            for k, v in match_labels.items():
+                if isinstance(v, str):
+                    self._update(matches, self.labels.get((k, v)))
+
+        return matches
+
+    @staticmethod
+    def _update(matches: Set[int], indices: Optional[Iterable[int]]) -> None:
+        if indices:
+            matches.update(indices)
+
+
 # Model an Envoy route.
 #
 # This is where the magic happens to actually route an HTTP request. There's a
@@ -666,6 +803,10 @@ class V3Route(Cacheable):
             # Set up a currently-empty set of variants for this route.
             config.route_variants.append(V3RouteVariants(route))
 
+        # Finally, index the variants so that listeners can quickly find the routes
+        # for their Hosts.
+        config.route_index = V3RouteIndex(config.route_variants)
+
     @staticmethod
     def generate_headers(config: 'V3Config', mapping_group: IRHTTPMappingGroup) -> List[dict]:
         headers = []
@@ -0,0 +1,160 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, List, Optional, Set
+
+import hashlib
+import logging
+
+import orjson
+
+
+def fragment_hash(fragment: Any) -> str:
+    return hashlib.sha256(orjson.dumps(fragment, option=orjson.OPT_NON_STR_KEYS|orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class EnvoyValidationCache:
+    """
+    Remembers which fragments of an Envoy configuration -- each cluster, each
+    listener, and everything else as a single "base" fragment -- have already
+    passed `envoy --mode validate`, so that we needn't validate them again.
+
+    validation_config() works out what actually needs validating: nothing at
+    all, a minimal config with just the new clusters and listeners (plus any
+    clusters the new listeners refer to), or the whole thing. Once a config
+    has validated, mark_valid() records its fragments.
+
+    Things that can only go wrong across fragments (duplicate names or
+    addresses) are checked here, and force full validation.
+    """
+
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+
+        # Hashes of every fragment of the last config that validated.
+        self.validated: Set[str] = set()
+
+        self.skipped = 0
+        self.partial = 0
+        self.full = 0
+
+    @staticmethod
+    def base_fragment(config: Dict[str, Any]) -> Dict[str, Any]:
+        static_resources = config.get('static_resources', {})
+
+        return {
+            **config,
+            'static_resources': { k: v for k, v in static_resources.items()
+                                  if k not in [ 'clusters', 'listeners' ] }
+        }
+
+    @staticmethod
+    def fragment_hashes(config: Dict[str, Any]) -> Set[str]:
+        static_resources = config.get('static_resources', {})
+
+        hashes = set([ fragment_hash(EnvoyValidationCache.base_fragment(config)) ])
+        hashes.update(fragment_hash(c) for c in static_resources.get('clusters', []))
+        hashes.update(fragment_hash(l) for l in static_resources.get('listeners', []))
+
+        return hashes
+
+    @staticmethod
+    def has_conflicts(config: Dict[str, Any]) -> bool:
+        static_resources = config.get('static_resources', {})
+        clusters = static_resources.get('clusters', [])
+        listeners = static_resources.get('listeners', [])
+
+        cluster_names = [ c.get('name') for c in clusters ]
+        listener_names = [ l.get('name') for l in listeners ]
+        listener_addresses = [ fragment_hash(l.get('address')) for l in listeners ]
+
+        return ((len(set(cluster_names)) != len(cluster_names)) or
+                (len(set(listener_names)) != len(listener_names)) or
+                (len(set(listener_addresses)) != len(listener_addresses)))
+
+    @staticmethod
+    def referenced_clusters(fragment: Any) -> Set[str]:
+        """
+        Find the names of all the clusters a fragment refers to: route targets,
+        weighted clusters, and cluster_name for things like gRPC services.
+        """
+
+        names: Set[str] = set()
+        worklist: List[Any] = [ fragment ]
+
+        while worklist:
+            obj = worklist.pop()
+
+            if isinstance(obj, dict):
+                for key, value in obj.items():
+                    if (key in [ 'cluster', 'cluster_name' ]) and isinstance(value, str):
+                        names.add(value)
+                    elif key == 'weighted_clusters':
+                        names.update(c['name'] for c in value.get('clusters', []) if 'name' in c)
+                    else:
+                        worklist.append(value)
+            elif isinstance(obj, list):
+                worklist.extend(obj)
+
+        return names
+
+    def validation_config(self, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Return the config that needs to be validated before we can trust the
+        given config. This is None if every fragment has validated before, and
+        is the given config itself if full validation is needed.
+        """
+
+        static_resources = config.get('static_resources', {})
+        clusters = static_resources.get('clusters', [])
+        listeners = static_resources.get('listeners', [])
+
+        if (not self.validated) or self.has_conflicts(config):
+            self.full += 1
+            return config
+
+        if fragment_hash(self.base_fragment(config)) not in self.validated:
+            # Something global changed, so validate everything.
+            self.full += 1
+            return config
+
+        new_listeners = [ l for l in listeners if fragment_hash(l) not in self.validated ]
+        wanted = set(self.referenced_clusters(new_listeners))
+        new_clusters = [ c for c in clusters
+                         if (c.get('name') in wanted) or (fragment_hash(c) not in self.validated) ]
+
+        if not new_listeners and not new_clusters:
+            self.skipped += 1
+            return None
+
+        self.partial += 1
+
+        self.logger.debug(f"validating {len(new_clusters)} of {len(clusters)} clusters, "
+                          f"{len(new_listeners)} of {len(listeners)} listeners")
+
+        return {
+            **config,
+            'static_resources': {
+                **static_resources,
+                'clusters': new_clusters,
+                'listeners': new_listeners
+            }
+        }
+
+    def mark_valid(self, config: Dict[str, Any]) -> None:
+        """
+        Remember the fragments of a config that has passed validation.
+        """
+
+        self.validated = self.fragment_hashes(config)
@@ -137,6 +137,16 @@ spec:
     def location(self) -> str:
         return str(self.manager.locations.current)
 
+    def content_hashes(self) -> Dict[str, str]:
+        """
+        Return the content hash of every resource we've fetched, keyed by kind,
+        name, and namespace. Diffing these against the hashes from the last
+        snapshot gives the authoritative set of what changed, whether or not
+        watt's Deltas mention it.
+        """
+
+        return ACResource.content_hashes(self.elements)
+
     def load_from_filesystem(self, config_dir_path, recurse: bool=False,
                              k8s: bool=False, finalize: bool=True,
                              automatic_manifests: List[str]=[]):
@@ -219,7 +229,7 @@ spec:
         if finalize:
             self.finalize()
 
-    def parse_watt(self, serialization: str, finalize: bool=True) -> None:
+    def parse_watt(self, serialization: Union[str, bytes], finalize: bool=True) -> None:
         basedir = os.environ.get('AMBASSADOR_CONFIG_BASE_DIR', '/ambassador')
 
         if os.path.isfile(os.path.join(basedir, '.ambassador_ignore_crds')):
@@ -246,7 +256,8 @@ spec:
         if os.path.isfile(os.path.join(basedir, '.ambassador_ignore_ingress')):
             self.aconf.post_error("Ambassador is not permitted to read Ingress resources. Please visit https://www.getambassador.io/docs/edge-stack/latest/topics/running/ingress-controller/#ambassador-as-an-ingress-controller for more information. You can continue using Ambassador, but Ingress resources will be ignored...")
 
-        # Expand environment variables allowing interpolation in manifests.
+        # Expand environment variables allowing interpolation in manifests. (This
+        # works on raw bytes too, so callers needn't decode huge snapshots first.)
         serialization = os.path.expandvars(serialization)
 
         self.load_pod_labels()
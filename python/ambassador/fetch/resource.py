@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import dataclasses
 import json
@@ -22,6 +22,10 @@ class NormalizedResource:
     object: dict
     rkey: Optional[str] = None
 
+    # For resources from annotations, the kind, name, and namespace of the
+    # Kubernetes object that carried them.
+    annotated_by: Optional[Tuple[str, str, str]] = None
+
     @classmethod
     def from_data(cls, kind: str, name: str, namespace: Optional[str] = None,
                   generation: Optional[int] = None, version: str = 'v2',
@@ -94,7 +98,8 @@ class NormalizedResource:
             if r.get('namespace') is None and obj.scope == KubernetesObjectScope.NAMESPACE:
                 r['namespace'] = obj.namespace
 
-            return NormalizedResource(r, rkey=f'{obj.name}.{obj.namespace}')
+            return NormalizedResource(r, rkey=f'{obj.name}.{obj.namespace}',
+                                      annotated_by=(obj.kind, obj.name, obj.namespace or ''))
 
         return [clean_normalize(r) for r in parse_yaml(config) if r]
 
@@ -170,6 +175,10 @@ class ResourceManager:
         try:
             r = ACResource.from_dict(rkey, rkey, serialization, obj)
             self.elements.append(r)
+
+            if resource.annotated_by:
+                key = ACResource.content_key(r.kind, r.name, r.get('namespace') or '')
+                self.aconf.annotation_sources[key] = resource.annotated_by
         except Exception as e:
             self.aconf.post_error(e.args[0])
 
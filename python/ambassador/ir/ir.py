@@ -24,7 +24,7 @@ from ..constants import Constants
 
 from ..utils import RichStatus, SavedSecret, SecretHandler, SecretInfo, dump_json, parse_bool
 from ..cache import Cache, NullCache
-from ..config import Config
+from ..config import ACResource, Config
 
 from .irresource import IRResource
 from .irambassador import IRAmbassador
@@ -122,6 +122,14 @@ class IR:
         # ...then make sure we have a cache (which might be a NullCache).
         self.cache = cache or NullCache(self.logger)
 
+        # If the cache was just rehydrated from disk, everything in it needs
+        # to point at an IR, so adopt it all.
+        if self.cache.detached:
+            for rsrc in self.cache.detached:
+                rsrc.ir = self
+
+            self.cache.detached = []
+
         # We're using setattr since since mypy complains about assigning directly to a method.
         secret_root = os.environ.get('AMBASSADOR_CONFIG_BASE_DIR', "/ambassador")
 
@@ -591,6 +599,147 @@ class IR:
         """
         self.cache.link(owner, owned)
 
+    def cache_depend(self, dependency: str, owned_key: str) -> None:
+        """
+        Note that the cached thing named by owned_key depends on a resource that
+        we don't cache (see Cache.dependency_key), so that a change to that resource
+        can invalidate only the things that actually use it.
+        """
+        self.cache.add_dependency(dependency, owned_key)
+
+    @staticmethod
+    def delta_cache_keys(kind: str, name: str, namespace: str) -> Optional[List[str]]:
+        """
+        Figure out which cache keys need to be invalidated when a resource of the
+        given kind, name, and namespace changes.
+
+        Returns None if a change to this kind of resource can't be handled
+        incrementally, in which case the whole cache has to be reset. An empty
+        list means that nothing cached depends on this kind of resource.
+        """
+
+        if kind in ('Mapping', 'TCPMapping', 'AmbassadorMapping', 'AmbassadorTCPMapping'):
+            return [ IRBaseMapping.make_cache_key(kind, name, namespace) ]
+
+        if kind in ('Host', 'AmbassadorHost'):
+            # Hosts can create or modify TLSContexts, which clusters may use for origination.
+            return [ Cache.dependency_key('Host', name, namespace) ]
+
+        if kind == 'TLSContext':
+            # TLSContexts are looked up by name alone.
+            return [ Cache.dependency_key('TLSContext', name) ]
+
+        if kind == 'Secret':
+            return [ Cache.dependency_key('Secret', name, namespace) ]
+
+        if kind == 'Service':
+            # A Service can carry Mappings in its annotations, and its ports affect
+            # endpoint resolution.
+            return [ Cache.dependency_key('Service', name, namespace),
+                     Cache.dependency_key('Endpoints', name, namespace) ]
+
+        if kind == 'Endpoints':
+            return [ Cache.dependency_key('Endpoints', name, namespace) ]
+
+        if kind in ('KubernetesServiceResolver', 'KubernetesEndpointResolver', 'ConsulResolver'):
+            # Resolvers are looked up by name alone, too.
+            return [ Cache.dependency_key('Resolver', name) ]
+
+        if kind in ('Listener', 'AmbassadorListener'):
+            # Listeners are rebuilt from scratch every time, and nothing we cache
+            # depends on them.
+            return []
+
+        # Anything else (Modules, AuthServices, etc.) can affect nearly everything,
+        # so we can't be incremental.
+        return None
+
+    @staticmethod
+    def endpoints_only_change(old: ACResource, new: ACResource) -> bool:
+        """
+        Is the only difference between two versions of a Service which
+        addresses its endpoints have? The set of ports has to stay the same,
+        and every port has to still have somewhere to go: otherwise which
+        clusters exist, or which errors they have, could change too.
+        """
+
+        old_endpoints = old.get('endpoints') or {}
+        new_endpoints = new.get('endpoints') or {}
+
+        if set(old_endpoints.keys()) != set(new_endpoints.keys()):
+            return False
+
+        if not all(new_endpoints.values()):
+            return False
+
+        ignored = [ 'endpoints', 'serialization', '_referenced_by', '_errored' ]
+
+        old_rest = { key: value for key, value in old.items() if key not in ignored }
+        new_rest = { key: value for key, value in new.items() if key not in ignored }
+
+        return old_rest == new_rest
+
+    def update_endpoints(self, services: Dict[str, ACResource]) -> Optional[List[IRCluster]]:
+        """
+        Swap in new versions of Services (keyed by rkey, like self.services)
+        whose endpoints, and nothing else, have changed, and re-resolve the
+        targets of every cluster that routes to endpoints.
+
+        Returns the clusters whose targets changed, or None if the change can't
+        be handled without building a new IR, in which case nothing has been
+        touched.
+        """
+
+        for key, service in services.items():
+            old = self.services.get(key)
+
+            if (old is None) or not IR.endpoints_only_change(old, service):
+                self.logger.debug(f"IR: update_endpoints: {key} changed more than its endpoints")
+                return None
+
+        # Clusters without targets can't be affected: their Service either
+        # doesn't exist or has no endpoints for their port, and neither of
+        # those can change here.
+        candidates = [ cluster for cluster in self.clusters.values()
+                       if cluster.get('targets') and
+                          (cluster.get_resolver().kind in ('KubernetesEndpointResolver', 'ConsulResolver')) ]
+
+        # Every candidate had better resolve to exactly the targets it has now.
+        # If not, it was put together some other way (say, merged with another
+        # cluster), and re-resolving it would lose something.
+        for cluster in candidates:
+            if cluster.resolve_targets() != cluster.targets:
+                self.logger.debug(f"IR: update_endpoints: cluster {cluster.name} doesn't match its resolution")
+                return None
+
+        old_services = { key: self.services[key] for key in services.keys() }
+        self.services.update(services)
+
+        updates = []
+
+        for cluster in candidates:
+            targets = cluster.resolve_targets()
+
+            if not targets:
+                # This shouldn't be possible, since the ports didn't change, but
+                # if it happens, put everything back.
+                self.logger.debug(f"IR: update_endpoints: cluster {cluster.name} lost its targets")
+                self.services.update(old_services)
+                return None
+
+            if targets != cluster.targets:
+                updates.append((cluster, targets))
+
+        for cluster, targets in updates:
+            cluster.targets = targets
+
+        # Keep the diagnostics' idea of our sources in step, too.
+        for key, service in services.items():
+            if key in self.aconf.sources:
+                self.aconf.sources[key] = service
+
+        return [ cluster for cluster, _ in updates ]
+
     def save_resource(self, resource: IRResource) -> IRResource:
         if resource.is_active():
             self.saved_resources[resource.rkey] = resource
@@ -804,6 +953,17 @@ class IR:
                 group = self.groups[mapping.group_id]
                 group.add_mapping(aconf, mapping)
 
+            # If this Mapping came from the annotations on a Service, a change to
+            # that Service has to invalidate it -- and its group, since a Mapping
+            # that joined an existing group isn't linked to it.
+            source = aconf.annotation_sources.get(ACResource.content_key(mapping.kind, mapping.name,
+                                                                         mapping.namespace))
+
+            if source and (source[0] == 'Service'):
+                dependency = Cache.dependency_key(*source)
+                self.cache_depend(dependency, mapping.cache_key)
+                self.cache_depend(dependency, group.cache_key)
+
             return group
         else:
             return None
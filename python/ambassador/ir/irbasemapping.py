@@ -83,6 +83,8 @@ class IRBaseMapping (IRResource):
     status_update: Optional[Dict[str, str]]
     cluster_key: Optional[str]
 
+    __slots__ = ( 'cached_status', 'status_update', 'cluster_key' )
+
     def __init__(self, ir: 'IR', aconf: Config,
                  rkey: str,      # REQUIRED
                  name: str,      # REQUIRED
@@ -7,6 +7,7 @@ from .irbasemapping import IRBaseMapping
 
 if TYPE_CHECKING:
     from .ir import IR # pragma: no cover
+    from .ircluster import IRCluster # pragma: no cover
 
 
 class IRBaseMappingGroup (IRResource):
@@ -53,6 +54,19 @@ class IRBaseMappingGroup (IRResource):
 
         return self._cache_key
 
+    def cache_cluster_dependencies(self, mapping: IRBaseMapping, cluster: 'IRCluster') -> None:
+        """
+        Note the things (other than the Mapping) that a newly-synthesized cluster
+        depends on, so that a change to one of them invalidates the cluster, the
+        Mapping, and this Group. We need all three: the Mapping remembers its
+        cluster_key, and the Group's routes remember the cluster's name.
+        """
+
+        for dependency in cluster.dependency_keys(mapping.get('tls', None)):
+            self.ir.cache_depend(dependency, mapping.cache_key)
+            self.ir.cache_depend(dependency, self.cache_key)
+            self.ir.cache_depend(dependency, cluster.cache_key)
+
     def normalize_weights_in_mappings(self):
         weightless_mappings = []
         num_weightless_mappings = 0
@@ -19,6 +19,7 @@ import json
 import re
 import urllib.parse
 
+from ..cache import Cache
 from ..config import Config
 from ..utils import RichStatus
 
@@ -28,6 +29,7 @@ from .irtlscontext import IRTLSContext
 if TYPE_CHECKING:
     from .ir import IR # pragma: no cover
     from .ir.irserviceresolver import IRServiceResolver # pragma: no cover
+    from .irserviceresolver import SvcEndpointSet # pragma: no cover
 
 #############################################################################
 ## ircluster.py -- the ircluster configuration object for Ambassador
@@ -39,6 +41,9 @@ if TYPE_CHECKING:
 
 
 class IRCluster (IRResource):
+    # Where to find our targets, stashed for setup.
+    __slots__ = ( '_resolver', '_hostname', '_namespace', '_port', '_is_sidecar' )
+
     def __init__(self, ir: 'IR', aconf: Config, parent_ir_resource: 'IRResource',
                  location: str,  # REQUIRED
 
@@ -331,7 +336,7 @@ class IRCluster (IRResource):
             return False
 
         # Resolve our actual targets.
-        targets = ir.resolve_targets(self, self._resolver, self._hostname, self._namespace, self._port)
+        targets = self.resolve_targets()
 
         if targets or not Config.legacy_mode:
             # Great.
@@ -350,6 +355,13 @@ class IRCluster (IRResource):
 
         return True
 
+    def resolve_targets(self) -> Optional['SvcEndpointSet']:
+        """
+        Ask our resolver for our targets, given whatever Services the IR has
+        right now.
+        """
+        return self.ir.resolve_targets(self, self._resolver, self._hostname, self._namespace, self._port)
+
     def is_edge_stack_sidecar(self) -> bool:
         return self.is_active() and self._is_sidecar
 
@@ -401,6 +413,35 @@ class IRCluster (IRResource):
 
         return True
 
+    def dependency_keys(self, ctx_name: Optional[Union[str, bool]]=None) -> List[str]:
+        """
+        Returns the cache dependency keys (see Cache.dependency_key) for the resources
+        this cluster was built from, other than its Mapping: the TLSContext named for
+        origination, if any, the resolver, and the Endpoints we resolved, if we're
+        doing endpoint routing. We depend on the TLSContext name even if it didn't
+        resolve, since its later creation will change this cluster.
+        """
+
+        keys: List[str] = []
+
+        if ctx_name and (ctx_name is not True):
+            keys.append(Cache.dependency_key('TLSContext', typecast(str, ctx_name)))
+
+        if self.ignore_cluster:
+            return keys
+
+        # Resolvers, like TLSContexts, are looked up by name alone.
+        keys.append(Cache.dependency_key('Resolver', self.get_resolver().name))
+
+        if self.get_resolver().kind == 'KubernetesEndpointResolver':
+            entry = self.clustermap_entry()
+
+            if entry.get('kind') == 'KubernetesEndpointResolver':
+                keys.append(Cache.dependency_key('Endpoints', typecast(str, entry['service']),
+                                                 typecast(str, entry['namespace'])))
+
+        return keys
+
     def get_resolver(self) -> 'IRServiceResolver':
         return self.ir.resolve_resolver(self, self._resolver)
 
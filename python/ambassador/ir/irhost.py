@@ -3,6 +3,7 @@ from typing import Dict, List, Optional, TYPE_CHECKING
 
 import os
 
+from ..cache import Cache
 from ..utils import SavedSecret, dump_json
 from ..config import Config
 from .irresource import IRResource
@@ -87,6 +88,9 @@ class IRHost(IRResource):
 
                     ctx_name = f"{self.name}-context"
 
+                    # Whatever we do with our implicit TLSContext, it depends on us.
+                    self.cache_depend_context(ir, ctx_name)
+
                     implicit_tls_exists = ir.has_tls_context(ctx_name)
                     self.logger.debug(f"Host {self.name}: implicit TLSContext {ctx_name} {'exists' if implicit_tls_exists else 'missing'}")
 
@@ -277,6 +281,10 @@ class IRHost(IRResource):
         return True
 
     # Check a TLSContext name, and save the linked TLSContext if it'll work for us.
+    def cache_depend_context(self, ir: 'IR', ctx_name: str) -> None:
+        ir.cache_depend(Cache.dependency_key('Host', self.name, self.namespace),
+                        Cache.dependency_key('TLSContext', ctx_name))
+
     def save_context(self, ir: 'IR', ctx_name: str, tls_ss: SavedSecret, tls_name: str):
         # First obvious thing: does a TLSContext with the right name even exist?
         if not ir.has_tls_context(ctx_name):
@@ -286,6 +294,9 @@ class IRHost(IRResource):
         ctx = ir.get_tls_context(ctx_name)
         assert(ctx)    # For mypy -- we checked above to be sure it exists.
 
+        # We may modify the context below, so it depends on us.
+        self.cache_depend_context(ir, ctx_name)
+
         # Make sure that the TLSContext is "compatible" i.e. it at least has the same cert related
         # configuration as the one in this Host AND hosts are same as well.
 
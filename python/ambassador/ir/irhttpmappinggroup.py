@@ -250,6 +250,9 @@ class IRHTTPMappingGroup (IRBaseMappingGroup):
                                 circuit_breakers=mapping.get('circuit_breakers', None),
                                 marker=marker)
 
+            # Remember what else this cluster depends on.
+            self.cache_cluster_dependencies(mapping, cluster)
+
         # Make sure that the cluster is actually in our IR...
         stored = self.ir.add_cluster(cluster)
         stored.referenced_by(mapping)
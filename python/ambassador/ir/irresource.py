@@ -16,6 +16,12 @@ class IRResource (Resource):
     A resource within the IR.
     """
 
+    # Bookkeeping that isn't part of the resource itself lives in slots rather
+    # than in the dict: it's smaller and faster there, and it never has to be
+    # filtered out of the dict when flattening Mappings and the like. as_dict()
+    # still reports anything in slots that it doesn't drop.
+    __slots__ = ( 'ir', 'logger', '_active', '_errored', '_cache_key' )
+
     @staticmethod
     def helper_sort_keys(res: 'IRResource', k: str) -> Tuple[str, List[str]]:
         return k, list(sorted(res[k].keys()))
@@ -62,7 +68,6 @@ class IRResource (Resource):
 
         self._errored = False
 
-        self.__as_dict_helpers = IRResource.__as_dict_helpers
         self.add_dict_helper("_errors", IRResource.helper_list)
         self.add_dict_helper("_referenced_by", IRResource.helper_sort_keys)
         self.add_dict_helper("rkey", IRResource.helper_rkey)
@@ -224,6 +229,17 @@ class IRResource (Resource):
             elif self[k] is not None:
                 od[k] = self[k]
 
+        for k in sorted(self._slot_names):
+            if self.skip_key(k):
+                continue
+
+            v = getattr(self, k, None)
+
+            if isinstance(v, IRResource):
+                od[k] = v.as_dict()
+            elif v is not None:
+                od[k] = v
+
         return od
 
     @staticmethod
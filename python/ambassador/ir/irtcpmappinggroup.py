@@ -139,6 +139,9 @@ class IRTCPMappingGroup (IRBaseMappingGroup):
                                 marker=marker,
                                 allow_scheme=False)
 
+            # Remember what else this cluster depends on.
+            self.cache_cluster_dependencies(mapping, cluster)
+
         # Make sure that the cluster is really in our IR...
         stored = self.ir.add_cluster(cluster)
         stored.referenced_by(mapping)
@@ -4,6 +4,7 @@ import base64
 import logging
 import os
 
+from ..cache import Cache
 from ..utils import SavedSecret
 from ..config import Config
 from .irresource import IRResource
@@ -161,6 +162,10 @@ class IRTLSContext(IRResource):
         if "." in secret_name and secret_namespacing:
             secret_name, namespace = secret_name.rsplit('.', 1)
 
+        # Clusters that originate TLS with this context depend on this secret.
+        self.ir.cache_depend(Cache.dependency_key('Secret', secret_name, namespace),
+                             Cache.dependency_key('TLSContext', self.name))
+
         return self.ir.resolve_secret(self, secret_name, namespace)
 
     def resolve(self) -> bool:
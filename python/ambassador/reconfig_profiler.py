@@ -0,0 +1,250 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import datetime
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from types import FrameType
+
+# Stacks are tuples of frame names, outermost first.
+Stack = Tuple[str, ...]
+
+# Frames whose names match these patterns get broken out as phases in the
+# summary: the major reconfiguration steps, each IR factory, and each piece
+# of Envoy config generation.
+PHASE_PATTERNS = [
+    re.compile(r'^ResourceFetcher\.(parse_watt|load_from_filesystem)$'),
+    re.compile(r'^Config\.load_all$'),
+    re.compile(r'^IR\.__init__$'),
+    re.compile(r'^\w+Factory\.load_all$'),
+    re.compile(r'^EnvoyConfig\.generate$'),
+    re.compile(r'^V[23]\w+\.generate$'),
+    re.compile(r'^V[23]Listener\.(compute_chains|compute_routes|finalize_http|finalize_tcp)$'),
+    re.compile(r'^AmbassadorEventWatcher\.validate_envoy_config$'),
+]
+
+
+class ReconfigProfiler:
+    """
+    Profile the next few reconfigurations by sampling the stack of the thread
+    doing the reconfiguration. For each one, we write two files into the
+    output directory:
+
+    - profile-<stamp>.folded has one "frame;frame;frame count" line for each
+      distinct stack, which is the input format for flamegraph.pl, speedscope,
+      and friends; and
+    - profile-<stamp>.json summarizes time spent per phase (see PHASE_PATTERNS)
+      and per function.
+
+    Note that only the reconfiguring thread is sampled.
+    """
+
+    def __init__(self, logger: logging.Logger, output_dir: str, interval: float=0.005, top: int=50) -> None:
+        self.logger = logger
+        self.output_dir = output_dir
+        self.interval = interval
+        self.top = top
+
+        # self.lock protects self.remaining, which can be changed by diagd's
+        # request handlers while the watcher thread is reconfiguring.
+        self.lock = threading.Lock()
+        self.remaining = 0
+
+        self.samples: Dict[Stack, int] = {}
+        self.sampler: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.started: Optional[datetime.datetime] = None
+        self.start_time = 0.0
+
+        self.profiles = 0
+        self.last_paths: List[str] = []
+
+    def request(self, count: int) -> int:
+        """
+        Ask for the next count reconfigurations to be profiled. Returns the
+        number of reconfigurations still to be profiled.
+        """
+
+        with self.lock:
+            self.remaining = max(count, 0)
+            return self.remaining
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "remaining": self.remaining,
+                "active": self.sampler is not None,
+                "profiles": self.profiles,
+                "last_paths": list(self.last_paths)
+            }
+
+    def start(self) -> bool:
+        """
+        Start profiling the current thread, if a profile has been requested.
+        Returns True if we're profiling.
+        """
+
+        if self.sampler is not None:
+            # The last reconfiguration never finished (it probably raised an
+            # exception), so write out whatever we have for it.
+            self.finish("-unknown-", "aborted")
+
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+
+            self.remaining -= 1
+
+            self.samples = {}
+            self.stopping.clear()
+            self.started = datetime.datetime.now()
+            self.start_time = time.perf_counter()
+
+            self.sampler = threading.Thread(target=self.sample, args=(threading.get_ident(),),
+                                            name="reconfig-profiler", daemon=True)
+            self.sampler.start()
+
+        self.logger.info("PROFILER: profiling reconfiguration (%d more requested)", self.remaining)
+        return True
+
+    def finish(self, snapshot: str, outcome: str) -> Optional[List[str]]:
+        """
+        Stop profiling, and write out the profile. Returns the paths written,
+        or None if we weren't profiling.
+        """
+
+        with self.lock:
+            sampler = self.sampler
+
+        if sampler is None:
+            return None
+
+        self.stopping.set()
+        sampler.join()
+
+        elapsed = time.perf_counter() - self.start_time
+
+        with self.lock:
+            self.sampler = None
+            self.profiles += 1
+            stamp = "%s-%d" % (time.strftime("%Y%m%d-%H%M%S"), self.profiles)
+
+        folded_path = os.path.join(self.output_dir, f"profile-{stamp}.folded")
+        summary_path = os.path.join(self.output_dir, f"profile-{stamp}.json")
+
+        try:
+            with open(folded_path, "w") as output:
+                for stack, count in sorted(self.samples.items()):
+                    output.write("%s %d\n" % (";".join(stack), count))
+
+            with open(summary_path, "w") as output:
+                json.dump(self.summary(snapshot, outcome, elapsed), output, indent=2, sort_keys=True)
+        except IOError as e:
+            self.logger.error("PROFILER: could not write profile: %s" % e)
+            return None
+
+        with self.lock:
+            self.last_paths = [ folded_path, summary_path ]
+
+        self.logger.info("PROFILER: wrote %s and %s", folded_path, summary_path)
+        return [ folded_path, summary_path ]
+
+    def sample(self, thread_id: int) -> None:
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+
+            if frame is None:
+                continue
+
+            stack = self.stack_for(frame)
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    @staticmethod
+    def stack_for(frame: Optional[FrameType]) -> Stack:
+        names: List[str] = []
+
+        while frame is not None:
+            names.append(ReconfigProfiler.frame_name(frame))
+            frame = frame.f_back
+
+        names.reverse()
+        return tuple(names)
+
+    @staticmethod
+    def frame_name(frame: FrameType) -> str:
+        code = frame.f_code
+        qualname: Optional[str] = getattr(code, 'co_qualname', None)
+
+        if not qualname:
+            # Older Pythons don't know the qualified name of a code object, so
+            # work out the class for methods and classmethods.
+            qualname = code.co_name
+
+            if (code.co_argcount > 0) and (code.co_varnames[0] in [ 'self', 'cls' ]):
+                obj = frame.f_locals.get(code.co_varnames[0])
+
+                if obj is not None:
+                    cls = obj if isinstance(obj, type) else type(obj)
+                    qualname = f"{cls.__name__}.{qualname}"
+
+        module = frame.f_globals.get('__name__', '?')
+        return f"{module}:{qualname}"
+
+    def summary(self, snapshot: str, outcome: str, elapsed: float) -> Dict[str, Any]:
+        total = sum(self.samples.values())
+        inclusive: Dict[str, int] = {}
+        exclusive: Dict[str, int] = {}
+        phases: Dict[str, int] = {}
+
+        for stack, count in self.samples.items():
+            # Count each function once per stack, however deeply it recurses.
+            for name in set(stack):
+                inclusive[name] = inclusive.get(name, 0) + count
+
+                qualname = name.split(':', 1)[-1]
+
+                if any(pattern.match(qualname) for pattern in PHASE_PATTERNS):
+                    phases[qualname] = phases.get(qualname, 0) + count
+
+            if stack:
+                exclusive[stack[-1]] = exclusive.get(stack[-1], 0) + count
+
+        def top(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+            ordered = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[:self.top]
+
+            return [ { "function": name, "samples": count, "seconds": round(count * self.interval, 6) }
+                     for name, count in ordered ]
+
+        return {
+            "snapshot": snapshot,
+            "outcome": outcome,
+            "started": self.started.isoformat() if self.started else None,
+            "elapsed_seconds": round(elapsed, 6),
+            "interval_seconds": self.interval,
+            "samples": total,
+            "phases": { name: { "samples": count, "seconds": round(count * self.interval, 6) }
+                        for name, count in sorted(phases.items()) },
+            "top_inclusive": top(inclusive),
+            "top_self": top(exclusive)
+        }
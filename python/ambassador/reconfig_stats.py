@@ -14,7 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import datetime
 import logging
@@ -84,6 +84,10 @@ class ReconfigStats:
         self.checks = 0
         self.errors = 0
 
+        # self.resets tracks why we had to throw away the cache and do a complete
+        # reconfigure, keyed by reason (e.g. "no-deltas", "module"), for metrics.
+        self.resets: Dict[str, int] = {}
+
     def mark(self, what: str, when: Optional[PerfCounter]=None) -> None:
         """
         Mark that a reconfigure has occurred. The 'what' parameter is one of
@@ -143,6 +147,18 @@ class ReconfigStats:
         # trigger timer logging for diagnostics updates.
         self.configs_outstanding += 1
 
+    def mark_reset(self, reason: str) -> None:
+        """
+        Mark that we had to reset the cache, forcing a complete reconfigure,
+        and why. This doesn't mark the reconfigure itself: use mark() for that.
+
+        :param reason: Why we reset the cache, e.g. "no-deltas" or "module".
+        """
+
+        self.logger.debug(f"MARK RESET: {reason}")
+
+        self.resets[reason] = self.resets.get(reason, 0) + 1
+
     def needs_check(self, when: Optional[PerfCounter]=None) -> bool:
         """
         Determine if we need to do a complete reconfigure to doublecheck our
@@ -304,6 +320,10 @@ class ReconfigStats:
         
         self.logger.info(f"CACHE: incrementals outstanding: {self.incrementals_outstanding}")
         self.logger.info(f"CACHE: incremental checks: {self.checks}, errors {self.errors}")
+
+        for reason in sorted(self.resets.keys()):
+            self.logger.info(f"CACHE: reset for {reason}: {self.resets[reason]}")
+
         self.logger.info(f"CACHE: last_complete {self.isofmt(self.last_complete, now_pc, now_dt)}")
         self.logger.info(f"CACHE: last_check {self.isofmt(self.last_check, now_pc, now_dt)}")
 
@@ -1,6 +1,6 @@
 import sys
 
-from typing import Any, Dict, List, Optional, Type, TypeVar
+from typing import Any, ClassVar, Dict, FrozenSet, List, Optional, Type, TypeVar
 
 import json
 
@@ -51,6 +51,22 @@ class Resource (Cacheable):
     _errored: bool
     _referenced_by: Dict[str, 'Resource']
 
+    # Subclasses can declare __slots__ for bookkeeping that isn't really part
+    # of the resource. _slot_names collects every slot in the class hierarchy
+    # so that __setattr__ knows to store those as attributes rather than as
+    # dict items; anything else is still stored in the dict.
+    _slot_names: ClassVar[FrozenSet[str]] = frozenset()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+
+        slots = cls.__dict__.get('__slots__', ())
+
+        if isinstance(slots, str):
+            slots = (slots,)
+
+        cls._slot_names = cls._slot_names | frozenset(slots)
+
     def __init__(self, rkey: str, location: str, *,
                  kind: str,
                  serialization: Optional[str]=None,
@@ -67,7 +83,6 @@ class Resource (Cacheable):
         super().__init__(rkey=rkey, location=location,
                          kind=kind, serialization=serialization,
                          # _errors=[],
-                         _referenced_by={},
                          **kwargs)
 
     def sourced_by(self, other: 'Resource'):
@@ -77,10 +92,12 @@ class Resource (Cacheable):
 
     def referenced_by(self, other: 'Resource') -> None:
         # print("%s %s REF BY %s %s" % (self.kind, self.name, other.kind, other.rkey))
-        self._referenced_by[other.location] = other
+        # Most resources are never referenced by anything, so _referenced_by
+        # only gets created when it's needed.
+        self.setdefault('_referenced_by', {})[other.location] = other
 
     def is_referenced_by(self, other_location) -> Optional['Resource']:
-        return self._referenced_by.get(other_location, None)
+        return self.get('_referenced_by', {}).get(other_location, None)
 
     def __getattr__(self, key: str) -> Any:
         try:
@@ -89,7 +106,10 @@ class Resource (Cacheable):
             raise AttributeError(key)
 
     def __setattr__(self, key: str, value: Any) -> None:
-        self[key] = value
+        if key in self._slot_names:
+            object.__setattr__(self, key, value)
+        else:
+            self[key] = value
 
     def __str__(self) -> str:
         return("<%s %s>" % (self.kind, self.rkey))
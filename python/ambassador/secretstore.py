@@ -0,0 +1,224 @@
+from typing import Dict, Optional
+
+import errno
+import hashlib
+import logging
+import os
+import threading
+import weakref
+
+
+class SecretStore:
+    """
+    Materializes secrets as files under a cache directory, in
+    <cache_dir>/<namespace>/secrets-decoded/<name>/<fingerprint>.<ext>.
+
+    Since the filenames are content-addressed, most reconfigures ask for files
+    that are already there, so write() only touches the disk when a file is
+    missing or its contents differ, and then writes it atomically so that
+    Envoy never sees a partial file.
+
+    Every file asked for is marked as used in the current generation. When a
+    configuration has been handed to Envoy, end_generation() removes any file
+    that none of the last keep_generations configurations used -- keeping a
+    few around means an Envoy that hasn't picked up the newest config yet
+    won't lose files out from under it -- and starts a new generation.
+    """
+
+    def __init__(self, logger: logging.Logger, cache_dir: str, keep_generations: int=3) -> None:
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.keep_generations = max(keep_generations, 1)
+
+        self.lock = threading.Lock()
+        self.generation = 0
+
+        # path -> sha256 of what we know is on disk there
+        self.digests: Dict[str, str] = {}
+
+        # path -> the last generation that asked for it
+        self.last_used: Dict[str, int] = {}
+
+        # Files already on disk when we started are adopted at the first
+        # end_generation().
+        self.adopted = False
+
+        self.reset_counts()
+
+        self.total_bytes_written = 0
+        self.total_files_written = 0
+        self.total_files_skipped = 0
+        self.total_files_removed = 0
+
+    def reset_counts(self) -> None:
+        self.bytes_written = 0
+        self.files_written = 0
+        self.files_skipped = 0
+
+    def write(self, path: str, contents: str) -> None:
+        """
+        Make sure that path holds contents, writing it only if need be.
+        """
+
+        data = contents.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self.lock:
+            self.last_used[path] = self.generation
+
+            if self.digests.get(path) == digest:
+                self.files_skipped += 1
+                return
+
+        # We don't know what's there (we haven't written it since we
+        # started, say), so look before we write.
+        try:
+            with open(path, "rb") as existing:
+                if hashlib.sha256(existing.read()).hexdigest() == digest:
+                    with self.lock:
+                        self.digests[path] = digest
+                        self.files_skipped += 1
+
+                    return
+        except OSError:
+            pass
+
+        self.write_atomically(path, data)
+
+        with self.lock:
+            self.digests[path] = digest
+            self.files_written += 1
+            self.bytes_written += len(data)
+
+    def write_atomically(self, path: str, data: bytes) -> None:
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+
+        tmp_path = os.path.join(dirname, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        # Use the same permissions open() would have.
+        fd = os.open(tmp_path, os.O_WRONLY|os.O_CREAT|os.O_TRUNC, 0o666)
+
+        try:
+            with os.fdopen(fd, "wb") as output:
+                output.write(data)
+
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+            raise
+
+    def secret_files(self):
+        """
+        Yield the path of every file under <cache_dir>/*/secrets-decoded/*/.
+        """
+
+        try:
+            namespaces = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        for namespace in namespaces:
+            decoded_dir = os.path.join(self.cache_dir, namespace, "secrets-decoded")
+
+            if not os.path.isdir(decoded_dir):
+                continue
+
+            for name in os.listdir(decoded_dir):
+                secret_dir = os.path.join(decoded_dir, name)
+
+                if not os.path.isdir(secret_dir):
+                    continue
+
+                for filename in os.listdir(secret_dir):
+                    yield os.path.join(secret_dir, filename)
+
+    def end_generation(self) -> Dict[str, int]:
+        """
+        Finish the current generation: remove every file that none of the last
+        keep_generations generations used, then start a new generation.
+        Returns stats for the generation just finished.
+        """
+
+        with self.lock:
+            if not self.adopted:
+                # Give anything that was already on disk the same grace period
+                # as if we'd just used it.
+                for path in self.secret_files():
+                    self.last_used.setdefault(path, self.generation)
+
+                self.adopted = True
+
+            oldest = self.generation - self.keep_generations + 1
+            stale = [ path for path, generation in self.last_used.items() if generation < oldest ]
+
+            removed = 0
+
+            for path in stale:
+                del self.last_used[path]
+                self.digests.pop(path, None)
+
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except OSError as e:
+                    if e.errno != errno.ENOENT:
+                        self.logger.warning(f"secrets: could not remove {path}: {e}")
+
+                # If that was the last file for the secret, drop its directory
+                # too. (rmdir won't remove a directory that isn't empty.)
+                try:
+                    os.rmdir(os.path.dirname(path))
+                except OSError:
+                    pass
+
+            stats = {
+                "generation": self.generation,
+                "bytes_written": self.bytes_written,
+                "files_written": self.files_written,
+                "files_skipped": self.files_skipped,
+                "files_removed": removed,
+                "files": len(self.last_used)
+            }
+
+            self.total_bytes_written += self.bytes_written
+            self.total_files_written += self.files_written
+            self.total_files_skipped += self.files_skipped
+            self.total_files_removed += removed
+
+            self.generation += 1
+            self.reset_counts()
+
+        if removed:
+            self.logger.debug(f"secrets: removed {removed} secret files unused for {self.keep_generations} generations")
+
+        return stats
+
+
+# Every SecretHandler writing to the same cache directory shares one store,
+# for as long as anyone (e.g. diagd) holds on to it.
+_stores: 'weakref.WeakValueDictionary[str, SecretStore]' = weakref.WeakValueDictionary()
+_stores_lock = threading.Lock()
+
+
+def secret_store_for(logger: logging.Logger, cache_dir: str, keep_generations: Optional[int]=None) -> SecretStore:
+    """
+    Return the SecretStore for cache_dir, creating it if need be. If
+    keep_generations is given, it's applied to the store either way.
+    """
+
+    with _stores_lock:
+        store = _stores.get(cache_dir)
+
+        if store is None:
+            store = SecretStore(logger, cache_dir)
+            _stores[cache_dir] = store
+
+        if keep_generations is not None:
+            store.keep_generations = max(keep_generations, 1)
+
+        return store
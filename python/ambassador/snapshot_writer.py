@@ -0,0 +1,303 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+
+# What we write at each detail level. "minimal" is just what came in (the
+# watt snapshot) and what went out (the Envoy config); "full" adds the aconf
+# and the IR, which are much more expensive to serialize.
+DETAIL_ARTIFACTS = {
+    "none": [],
+    "minimal": [ "snapshot", "econf" ],
+    "full": [ "aconf", "econf", "ir", "snapshot" ],
+}
+
+COMPRESSIONS = [ "none", "gzip" ]
+
+# Snapshot files are named like aconf.json, aconf-1.json, ..., aconf-tmp.json.
+FILENAMES = {
+    "aconf": "aconf{}.json",
+    "econf": "econf{}.json",
+    "ir": "ir{}.json",
+    "snapshot": "snapshot{}.yaml",
+}
+
+
+class SnapshotJob:
+    def __init__(self, snapshot: str, staged: Dict[str, str], serializers: Dict[str, Callable[[], str]]) -> None:
+        self.snapshot = snapshot
+        self.staged = staged
+        self.serializers = serializers
+        self.contents: Dict[str, bytes] = {}
+
+
+class SnapshotWriter:
+    """
+    Writes the debugging snapshots for each reconfiguration into the snapshot
+    directory -- the watt snapshot, the aconf, the IR, and the Envoy config --
+    and rotates the older ones, on a background thread, once the new config
+    has been handed to Envoy.
+
+    submit() just moves the -tmp files that the reconfiguration already wrote
+    out of the way, so that the next reconfiguration can't clobber them.
+    Serializing the aconf and IR, writing, compressing, and rotating all
+    happen in the background. The next reconfiguration shares (and changes)
+    cached objects with this one, though, so it has to call wait_serialized()
+    before it touches any of them.
+
+    If reconfigurations come faster than we can write them, a job that hasn't
+    started yet is dropped in favor of the newer one, so the snapshots always
+    end up describing the latest configuration.
+    """
+
+    def __init__(self, logger: logging.Logger, snapshot_path: str, count: int=4,
+                 detail: str="full", compression: str="none") -> None:
+        if detail not in DETAIL_ARTIFACTS:
+            raise ValueError(f"snapshot detail must be one of {', '.join(DETAIL_ARTIFACTS.keys())}, not {detail}")
+
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"snapshot compression must be one of {', '.join(COMPRESSIONS)}, not {compression}")
+
+        self.logger = logger
+        self.snapshot_path = snapshot_path
+        self.count = count
+        self.detail = detail
+        self.compression = compression
+        self.artifacts = DETAIL_ARTIFACTS[detail]
+
+        # self.cond protects everything below.
+        self.cond = threading.Condition()
+        self.pending: Optional[SnapshotJob] = None
+        self.serializing: Optional[SnapshotJob] = None
+        self.busy = False
+        self.writer: Optional[threading.Thread] = None
+        self.sequence = 0
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_seconds = 0.0
+
+    def path_for(self, artifact: str, suffix: str) -> str:
+        path = os.path.join(self.snapshot_path, FILENAMES[artifact].format(suffix))
+
+        if (self.compression == "gzip") and (suffix != "-tmp"):
+            path += ".gz"
+
+        return path
+
+    def submit(self, snapshot: str, serializers: Dict[str, Callable[[], str]]) -> None:
+        """
+        Queue up the snapshots for a reconfiguration. serializers maps artifact
+        names to functions returning their contents, which are called on the
+        writer thread (but only for artifacts we're writing); artifacts with no
+        serializer are taken from their -tmp files.
+        """
+
+        if not self.artifacts:
+            return
+
+        serializers = { artifact: serializer for artifact, serializer in serializers.items()
+                        if artifact in self.artifacts }
+
+        with self.cond:
+            self.sequence += 1
+            staged: Dict[str, str] = {}
+
+            for artifact in self.artifacts:
+                if artifact in serializers:
+                    continue
+
+                tmp_path = self.path_for(artifact, "-tmp")
+                staged_path = os.path.join(self.snapshot_path, f".staged-{self.sequence}-{os.path.basename(tmp_path)}")
+
+                try:
+                    os.rename(tmp_path, staged_path)
+                    staged[artifact] = staged_path
+                except OSError as e:
+                    self.logger.debug("snapshot: not saving %s: %s" % (tmp_path, e))
+
+            job = SnapshotJob(snapshot, staged, serializers)
+
+            if self.pending:
+                self.logger.debug("snapshot: dropping snapshots for %s in favor of %s" %
+                                  (self.pending.snapshot, snapshot))
+                self.discard(self.pending)
+                self.dropped += 1
+
+            self.pending = job
+            self.serializing = job
+
+            # We're created before gunicorn forks, so start the writer the
+            # first time we need it.
+            if not self.writer or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self.write_jobs, name="snapshot-writer", daemon=True)
+                self.writer.start()
+
+            self.cond.notify_all()
+
+    def wait_serialized(self, timeout: Optional[float]=None) -> bool:
+        """
+        Wait until the serializers for everything submitted have run, so that
+        the objects they serialize can change again. Returns False if we timed
+        out.
+        """
+
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.serializing, timeout=timeout)
+
+    def serialize(self, job: SnapshotJob) -> None:
+        try:
+            for artifact, serializer in job.serializers.items():
+                try:
+                    job.contents[artifact] = serializer().encode('utf-8')
+                except Exception as e:
+                    self.logger.exception("snapshot: could not serialize %s for %s: %s" % (artifact, job.snapshot, e))
+        finally:
+            with self.cond:
+                if self.serializing is job:
+                    self.serializing = None
+
+                self.cond.notify_all()
+
+    def discard(self, job: SnapshotJob) -> None:
+        for staged_path in job.staged.values():
+            try:
+                os.unlink(staged_path)
+            except OSError:
+                pass
+
+    def write_jobs(self) -> None:
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+
+                job = self.pending
+                self.pending = None
+                self.busy = True
+
+            start = time.perf_counter()
+
+            try:
+                self.serialize(job)
+                self.write(job)
+                ok = True
+            except Exception as e:
+                self.logger.exception("snapshot: could not write snapshots for %s: %s" % (job.snapshot, e))
+                self.discard(job)
+                ok = False
+
+            with self.cond:
+                self.busy = False
+                self.last_seconds = time.perf_counter() - start
+
+                if ok:
+                    self.written += 1
+                else:
+                    self.errors += 1
+
+                self.cond.notify_all()
+
+    def rotations(self) -> List[Tuple[str, str]]:
+        # If count is 4, this range statement becomes range(-4, -1) which
+        # gives [ -4, -3, -2 ], which the list comprehension turns into
+        # [ ( "-3", "-4" ), ( "-2", "-3" ), ( "-1", "-2" ) ]... which is the
+        # list of suffixes to rename to rotate the snapshots.
+        snaplist = [ (str(x+1), str(x)) for x in range(-1 * self.count, -1) ]
+
+        if self.count > 0:
+            # After dealing with that, we need to rotate the current file into -1.
+            snaplist.append(( '', '-1' ))
+
+        return snaplist
+
+    def write(self, job: SnapshotJob) -> None:
+        self.logger.debug("snapshot: rotating snapshots for snapshot %s" % job.snapshot)
+
+        for from_suffix, to_suffix in self.rotations():
+            for artifact in FILENAMES.keys():
+                from_path = self.path_for(artifact, from_suffix)
+                to_path = self.path_for(artifact, to_suffix)
+
+                # The snapshots are a debugging aid: if we can't rotate them,
+                # meh, whatever.
+                try:
+                    os.rename(from_path, to_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.debug("snapshot: could not rename %s -> %s: %s" % (from_path, to_path, e))
+
+        for artifact in self.artifacts:
+            path = self.path_for(artifact, "")
+
+            if artifact in job.contents:
+                self.write_contents(path, job.contents[artifact])
+            elif artifact in job.staged:
+                self.move_staged(job.staged[artifact], path)
+
+    def write_contents(self, path: str, contents: bytes) -> None:
+        tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+
+        if self.compression == "gzip":
+            with gzip.open(tmp_path, "wb", compresslevel=6) as output:
+                output.write(contents)
+        else:
+            with open(tmp_path, "wb") as output:
+                output.write(contents)
+
+        os.replace(tmp_path, path)
+
+    def move_staged(self, staged_path: str, path: str) -> None:
+        if self.compression == "gzip":
+            tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+
+            with open(staged_path, "rb") as input, gzip.open(tmp_path, "wb", compresslevel=6) as output:
+                shutil.copyfileobj(input, output)
+
+            os.replace(tmp_path, path)
+            os.unlink(staged_path)
+        else:
+            os.replace(staged_path, path)
+
+    def wait_idle(self, timeout: Optional[float]=None) -> bool:
+        """
+        Wait until everything submitted has been written. Returns False if we
+        timed out.
+        """
+
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cond:
+            return {
+                "detail": self.detail,
+                "compression": self.compression,
+                "written": self.written,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "pending": self.pending is not None,
+                "last_seconds": round(self.last_seconds, 6)
+            }
@@ -15,7 +15,7 @@
 # limitations under the License
 
 from builtins import bytes
-from typing import Any, Dict, List, Optional, Union, TextIO, TYPE_CHECKING
+from typing import Any, BinaryIO, Dict, List, Optional, Union, TYPE_CHECKING
 
 import binascii
 import hashlib
@@ -33,6 +33,7 @@ import tempfile
 import yaml
 
 from .VERSION import Version
+from .secretstore import SecretStore, secret_store_for
 
 from distutils.util import strtobool
 from urllib.parse import urlparse
@@ -88,7 +89,7 @@ def dump_yaml(obj: Any, **kwargs) -> str:
     return yaml.dump(obj, Dumper=yaml_dumper, **kwargs)
 
 
-def parse_json(serialization: str) -> Any:
+def parse_json(serialization: Union[str, bytes]) -> Any:
     return orjson.loads(serialization)
 
 
@@ -100,28 +101,25 @@ def dump_json(obj: Any, pretty=False) -> str:
         return bytes.decode(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS))
 
 
-def _load_url_contents(logger: logging.Logger, url: str, stream1: TextIO, stream2: Optional[TextIO]=None) -> bool:
+def _load_url_contents(logger: logging.Logger, url: str, stream1: BinaryIO, stream2: Optional[BinaryIO]=None) -> bool:
     saved = False
 
     try:
-        with requests.get(url) as r:
+        with requests.get(url, stream=True) as r:
             if r.status_code == 200:
 
-                # All's well, pull the config down.
-                encoded = b''
-
+                # All's well, pull the config down. We copy the raw bytes to our
+                # streams as they arrive, rather than accumulating (and decoding)
+                # the whole thing first: snapshots can be very large.
                 try:
                     for chunk in r.iter_content(chunk_size=65536):
                         # We do this by hand instead of with 'decode_unicode=True'
                         # above because setting decode_unicode only decodes text,
                         # and WATT hands us application/json...
-                        encoded += chunk
-
-                    decoded = encoded.decode('utf-8')
-                    stream1.write(decoded)
+                        stream1.write(chunk)
 
-                    if stream2:
-                        stream2.write(decoded)
+                        if stream2:
+                            stream2.write(chunk)
 
                     saved = True
                 except IOError as e:
@@ -134,13 +132,18 @@ def _load_url_contents(logger: logging.Logger, url: str, stream1: TextIO, stream
     return saved
 
 
-def save_url_contents(logger: logging.Logger, url: str, path: str, stream2: Optional[TextIO]=None) -> bool:
-    with open(path, 'w', encoding='utf-8') as stream:
+def save_url_contents(logger: logging.Logger, url: str, path: str, stream2: Optional[BinaryIO]=None) -> bool:
+    with open(path, 'wb') as stream:
         return _load_url_contents(logger, url, stream, stream2=stream2)
 
 
-def load_url_contents(logger: logging.Logger, url: str, stream2: Optional[TextIO]=None) -> Optional[str]:
-    stream = io.StringIO()
+def load_url_bytes(logger: logging.Logger, url: str, stream2: Optional[BinaryIO]=None) -> Optional[bytes]:
+    """
+    Load the contents of a URL as raw bytes, optionally copying them to stream2
+    as they arrive. Returns None if the URL couldn't be loaded.
+    """
+
+    stream = io.BytesIO()
 
     saved = _load_url_contents(logger, url, stream, stream2=stream2)
 
@@ -150,6 +153,19 @@ def load_url_contents(logger: logging.Logger, url: str, stream2: Optional[TextIO
         return None
 
 
+def load_url_contents(logger: logging.Logger, url: str, stream2: Optional[BinaryIO]=None) -> Optional[str]:
+    encoded = load_url_bytes(logger, url, stream2=stream2)
+
+    if encoded is None:
+        return None
+
+    try:
+        return encoded.decode('utf-8')
+    except UnicodeDecodeError as e:
+        logger.error("couldn't decode %s: %s" % (url, e))
+        return None
+
+
 def parse_bool(s: Optional[Union[str, bool]]) -> bool:
     """ 
     Parse a boolean value from a string. T, True, Y, y, 1 return True;
@@ -754,6 +770,7 @@ class SecretHandler:
     logger: logging.Logger
     source_root: str
     cache_dir: str
+    secret_store: SecretStore
 
     def __init__(self, logger: logging.Logger, source_root: str, cache_dir: str, version: str) -> None:
         self.logger = logger
@@ -761,6 +778,10 @@ class SecretHandler:
         self.cache_dir = cache_dir
         self.version = version
 
+        # Every SecretHandler for the same cache_dir shares a SecretStore, so
+        # that we don't rewrite secrets we've already written.
+        self.secret_store = secret_store_for(logger, cache_dir)
+
     def load_secret(self, resource: 'IRResource', secret_name: str, namespace: str) -> Optional[SecretInfo]:
         """
         load_secret: given a secret’s name and namespace, pull it from wherever it really lives,
@@ -842,26 +863,22 @@ class SecretHandler:
 
             secret_dir = os.path.join(self.cache_dir, namespace, "secrets-decoded", name)
 
-            try:
-                os.makedirs(secret_dir)
-            except FileExistsError:
-                pass
-
+            # The secret store only writes files whose contents have changed.
             if tls_crt:
                 tls_crt_path = os.path.join(secret_dir, f'{hd}.crt')
-                open(tls_crt_path, "w").write(tls_crt)
+                self.secret_store.write(tls_crt_path, tls_crt)
 
             if tls_key:
                 tls_key_path = os.path.join(secret_dir, f'{hd}.key')
-                open(tls_key_path, "w").write(tls_key)
+                self.secret_store.write(tls_key_path, tls_key)
 
             if user_key:
                 user_key_path = os.path.join(secret_dir, f'{hd}.user')
-                open(user_key_path, "w").write(user_key)
+                self.secret_store.write(user_key_path, user_key)
 
             if root_crt:
                 root_crt_path = os.path.join(secret_dir, f'{hd}.root.crt')
-                open(root_crt_path, "w").write(root_crt)
+                self.secret_store.write(root_crt_path, root_crt)
 
             cert_data = {
                 'tls_crt': tls_crt,
@@ -0,0 +1,438 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+########
+# This is a benchmarking tool for the configuration pipeline. It generates a
+# synthetic watt snapshot at a given scale, then times the fetch, aconf, IR,
+# and econf phases (and, optionally, measures their peak memory) for:
+#
+# - cold builds, with no cache at all;
+# - cache-check builds, with an empty cache, whose output must match the
+#   cold build; and
+# - incremental builds, where one Mapping changes and the warm cache is
+#   invalidated the same way diagd does it.
+#
+# The results are JSON, so that they can be compared between releases.
+########
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import sys
+
+import functools
+import json
+import logging
+import platform
+import resource
+import statistics
+import time
+import tracemalloc
+
+import click
+
+from ambassador import Cache, Config, IR, EnvoyConfig, Version
+from ambassador.fetch import ResourceFetcher
+from ambassador.utils import NullSecretHandler, dump_json
+
+# Use this instead of click.option
+click_option = functools.partial(click.option, show_default=True)
+click_option_no_default = functools.partial(click.option, show_default=False)
+
+T = TypeVar('T')
+
+PHASES = [ "fetch", "aconf", "ir", "econf" ]
+SCENARIOS = [ "cold", "cache_check", "incremental" ]
+
+
+def crd(kind: str, name: str, namespace: str, spec: Dict[str, Any],
+        labels: Optional[Dict[str, str]]=None) -> Dict[str, Any]:
+    metadata: Dict[str, Any] = { "name": name, "namespace": namespace }
+
+    if labels:
+        metadata["labels"] = labels
+
+    return {
+        "apiVersion": "x.getambassador.io/v3alpha1",
+        "kind": kind,
+        "metadata": metadata,
+        "spec": spec
+    }
+
+
+def route_host(i: int, hosts: int) -> int:
+    # Which Host Mapping i is for, when using teams. Skew this from i, so that
+    # which Host a Mapping is for doesn't decide what kind of glob it uses.
+    return (i + (i // 20)) % hosts
+
+
+def route_glob(i: int, hosts: int, teams: int) -> str:
+    """
+    The host glob for Mapping i, when using teams: most Mappings name a single
+    Host, but some use prefix or suffix globs, and a few match everything.
+    """
+
+    j = route_host(i, hosts)
+    team = j % teams
+    kind = i % 20
+
+    if kind < 12:
+        return f"svc-{j}.team-{team}.example.com"
+    elif kind < 15:
+        return f"svc-{j}.team-{team}.*"
+    elif kind < 18:
+        return f"*.team-{team}.example.com"
+    else:
+        return "*"
+
+
+def synthetic_snapshot(mappings: int=100, hosts: int=10, tlscontexts: int=5, services: int=50,
+                       endpoints: int=3, teams: int=0, namespace: str="default",
+                       generation: int=0) -> Dict[str, Any]:
+    """
+    Generate a watt snapshot with the given number of Mappings, Hosts,
+    TLSContexts, and Services (each with the given number of endpoints).
+
+    Mappings are spread across the Hosts and Services; every fourth Mapping
+    originates TLS using one of the TLSContexts. If there are endpoints, the
+    Mappings use a KubernetesEndpointResolver so that the endpoints matter.
+
+    If teams is set, the Hosts and Mappings are spread across that many team
+    domains instead, with a realistic mix of host globs (see route_glob):
+    every tenth Host is a wildcard for its team's domain, every fifth selects
+    its team's Mappings by label as well as by hostname, and every fifth
+    Mapping is labeled with its team.
+
+    Bumping generation changes the first Mapping (and nothing else), for
+    incremental builds.
+    """
+
+    services = max(services, 1)
+
+    if teams:
+        hosts = max(hosts, 1)
+
+    listeners = [
+        crd("AmbassadorListener", f"listener-{port}", namespace, {
+            "port": port,
+            "protocol": protocol,
+            "securityModel": "XFP",
+            "hostBinding": { "namespace": { "from": "ALL" } }
+        })
+        for port, protocol in [ (8080, "HTTP"), (8443, "HTTPS") ]
+    ]
+
+    host_list = []
+
+    for i in range(hosts):
+        spec: Dict[str, Any] = {
+            "hostname": f"host-{i}.example.com",
+            "tlsSecret": { "name": f"host-{i}-secret" },
+            "requestPolicy": { "insecure": { "action": "Redirect" } }
+        }
+
+        if teams:
+            team = i % teams
+            spec["hostname"] = f"*.team-{team}.example.com" if (i % 10) == 9 else f"svc-{i}.team-{team}.example.com"
+
+            if (i % 5) == 0:
+                spec["selector"] = { "matchLabels": { "team": f"team-{team}" } }
+
+        host_list.append(crd("AmbassadorHost", f"host-{i}", namespace, spec))
+
+    context_list = [
+        crd("TLSContext", f"context-{i}", namespace, {
+            "secret": f"context-{i}-secret",
+            "sni": f"context-{i}.example.com",
+            "alpn_protocols": "h2"
+        })
+        for i in range(tlscontexts)
+    ]
+
+    resolvers = []
+
+    if endpoints > 0:
+        resolvers.append(crd("KubernetesEndpointResolver", "endpoint", namespace, {}))
+
+    mapping_list = []
+
+    for i in range(mappings):
+        labels: Optional[Dict[str, str]] = None
+
+        spec = {
+            "hostname": f"host-{i % hosts}.example.com" if hosts else "*",
+            "prefix": f"/svc-{i}/",
+            "service": f"svc-{i % services}.{namespace}:80",
+            "timeout_ms": 3000 + (generation if i == 0 else 0)
+        }
+
+        if tlscontexts and ((i % 4) == 0):
+            spec["tls"] = f"context-{i % tlscontexts}"
+
+        if endpoints > 0:
+            spec["resolver"] = "endpoint"
+
+        if teams:
+            spec["hostname"] = route_glob(i, hosts, teams)
+
+            if (i % 5) == 0:
+                labels = { "team": f"team-{route_host(i, hosts) % teams}" }
+
+        mapping_list.append(crd("AmbassadorMapping", f"mapping-{i}", namespace, spec, labels=labels))
+
+    service_list = []
+    endpoints_list = []
+
+    for i in range(services):
+        metadata = { "name": f"svc-{i}", "namespace": namespace }
+
+        service_list.append({
+            "apiVersion": "v1",
+            "kind": "Service",
+            "metadata": metadata,
+            "spec": {
+                "clusterIP": f"10.96.{i // 256}.{i % 256}",
+                "ports": [ { "port": 80, "protocol": "TCP", "targetPort": 8080 } ]
+            }
+        })
+
+        if endpoints > 0:
+            endpoints_list.append({
+                "apiVersion": "v1",
+                "kind": "Endpoints",
+                "metadata": metadata,
+                "subsets": [ {
+                    "addresses": [ { "ip": f"10.{i // 256}.{i % 256}.{j}" } for j in range(endpoints) ],
+                    "ports": [ { "port": 8080, "protocol": "TCP" } ]
+                } ]
+            })
+
+    return {
+        "Kubernetes": {
+            "AmbassadorListener": listeners,
+            "AmbassadorHost": host_list,
+            "TLSContext": context_list,
+            "KubernetesEndpointResolver": resolvers,
+            "AmbassadorMapping": mapping_list,
+            "service": service_list,
+            "endpoints": endpoints_list
+        }
+    }
+
+
+class ConfigBenchmark:
+    """
+    Run the configuration pipeline over synthetic snapshots, and collect
+    timings (and, if trace_memory is set, peak memory) for each phase.
+
+    Note that tracing memory slows everything down, so timings taken with
+    trace_memory set are only useful for comparison with each other.
+    """
+
+    def __init__(self, logger: logging.Logger, scale: Dict[str, int],
+                 envoy_version: str="V3", trace_memory: bool=False) -> None:
+        self.logger = logger
+        self.scale = scale
+        self.envoy_version = envoy_version
+        self.trace_memory = trace_memory
+        self.secret_handler = NullSecretHandler(logger, None, None, "0")
+
+        self.serializations = [
+            dump_json(synthetic_snapshot(generation=generation, **scale))
+            for generation in [ 0, 1 ]
+        ]
+
+    def measure(self, phases: Dict[str, Dict[str, Any]], name: str, fn: Callable[[], T]) -> T:
+        if self.trace_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+
+        phase = phases.setdefault(name, {})
+        phase["seconds"] = elapsed
+
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            phase["peak_bytes"] = peak
+
+        return result
+
+    def build(self, serialization: str, cache: Optional[Cache]) -> Tuple[Dict[str, Dict[str, Any]], EnvoyConfig]:
+        phases: Dict[str, Dict[str, Any]] = {}
+
+        aconf = Config()
+        fetcher = ResourceFetcher(self.logger, aconf)
+
+        self.measure(phases, "fetch", lambda: fetcher.parse_watt(serialization))
+        self.measure(phases, "aconf", lambda: aconf.load_all(fetcher.sorted()))
+        ir = self.measure(phases, "ir", lambda: IR(aconf, cache=cache, secret_handler=self.secret_handler))
+        econf = self.measure(phases, "econf", lambda: EnvoyConfig.generate(ir, self.envoy_version, cache=cache))
+
+        return phases, econf
+
+    @staticmethod
+    def econf_json(econf: EnvoyConfig) -> str:
+        return json.dumps(econf.as_dict(), sort_keys=True)
+
+    def run_once(self) -> Dict[str, Dict[str, Any]]:
+        results: Dict[str, Dict[str, Any]] = {}
+
+        # Cold: no cache at all.
+        cold_phases, cold_econf = self.build(self.serializations[0], None)
+        results["cold"] = { "phases": cold_phases }
+
+        # Cache check: an empty cache, whose output must match the cold build.
+        cache = Cache(self.logger)
+        cached_phases, cached_econf = self.build(self.serializations[0], cache)
+
+        results["cache_check"] = {
+            "phases": cached_phases,
+            "identical": self.econf_json(cached_econf) == self.econf_json(cold_econf)
+        }
+
+        # Incremental: change one Mapping, invalidate the warm cache the way
+        # diagd would, and rebuild. The output must match a cold build of the
+        # changed snapshot.
+        keys = IR.delta_cache_keys("AmbassadorMapping", "mapping-0", "default")
+
+        if keys is None:
+            cache = Cache(self.logger)
+        else:
+            for key in keys:
+                cache.invalidate(key)
+
+        incr_phases, incr_econf = self.build(self.serializations[1], cache)
+        _, check_econf = self.build(self.serializations[1], None)
+
+        results["incremental"] = {
+            "phases": incr_phases,
+            "identical": self.econf_json(incr_econf) == self.econf_json(check_econf)
+        }
+
+        return results
+
+    def run(self, repeat: int=1) -> Dict[str, Any]:
+        runs = [ self.run_once() for _ in range(repeat) ]
+
+        scenarios: Dict[str, Any] = {}
+
+        for scenario in SCENARIOS:
+            summary: Dict[str, Any] = {}
+
+            for phase in PHASES + [ "total" ]:
+                if phase == "total":
+                    times = [ sum(run[scenario]["phases"][p]["seconds"] for p in PHASES) for run in runs ]
+                else:
+                    times = [ run[scenario]["phases"][phase]["seconds"] for run in runs ]
+
+                summary[phase] = {
+                    "seconds": [ round(t, 6) for t in times ],
+                    "seconds_min": round(min(times), 6),
+                    "seconds_median": round(statistics.median(times), 6)
+                }
+
+                if self.trace_memory and (phase != "total"):
+                    summary[phase]["peak_bytes"] = max(run[scenario]["phases"][phase]["peak_bytes"] for run in runs)
+
+            if scenario != "cold":
+                summary["identical"] = all(run[scenario]["identical"] for run in runs)
+
+            scenarios[scenario] = summary
+
+        # ru_maxrss is in kilobytes on Linux, but bytes on macOS.
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        if sys.platform != "darwin":
+            max_rss *= 1024
+
+        return {
+            "ambassador_version": Version,
+            "python_version": platform.python_version(),
+            "envoy_api_version": self.envoy_version,
+            "scale": self.scale,
+            "repeat": repeat,
+            "trace_memory": self.trace_memory,
+            "max_rss_bytes": max_rss,
+            "scenarios": scenarios
+        }
+
+
+@click.command(help="Benchmark the configuration pipeline using a synthetic snapshot")
+@click_option('--debug/--no-debug', default=False,
+              help="enable debug logging")
+@click_option('-m', '--mappings', type=click.INT, default=1000,
+              help="number of Mappings")
+@click_option('-h', '--hosts', type=click.INT, default=10,
+              help="number of Hosts")
+@click_option('-t', '--tlscontexts', type=click.INT, default=5,
+              help="number of TLSContexts")
+@click_option('-s', '--services', type=click.INT, default=100,
+              help="number of Services")
+@click_option('-e', '--endpoints', type=click.INT, default=3,
+              help="number of endpoints per Service (0 to use the Service resolver)")
+@click_option('-r', '--repeat', type=click.INT, default=3,
+              help="number of times to run each scenario")
+@click_option('--envoy-version', type=click.Choice([ "V2", "V3" ]), default="V3",
+              help="Envoy API version to generate")
+@click_option('--memory/--no-memory', default=False,
+              help="also measure peak memory per phase (slows everything down)")
+@click_option('-o', '--output', type=click.STRING, default="-",
+              help="where to write the JSON results ('-' for stdout)")
+@click_option_no_default('--snapshot-output', type=click.STRING,
+              help="also save the generated snapshot here, e.g. for use with Madness")
+def main(debug: bool, mappings: int, hosts: int, tlscontexts: int, services: int, endpoints: int,
+         repeat: int, envoy_version: str, memory: bool, output: str, snapshot_output: Optional[str]) -> None:
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.WARNING,
+        format="%(asctime)s benchmark %(levelname)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    logger = logging.getLogger("ambassador")
+
+    scale = {
+        "mappings": mappings,
+        "hosts": hosts,
+        "tlscontexts": tlscontexts,
+        "services": services,
+        "endpoints": endpoints
+    }
+
+    benchmark = ConfigBenchmark(logger, scale, envoy_version=envoy_version, trace_memory=memory)
+
+    if snapshot_output:
+        with open(snapshot_output, "w") as f:
+            f.write(benchmark.serializations[0])
+
+    results = benchmark.run(repeat=repeat)
+    results_json = json.dumps(results, indent=2, sort_keys=True)
+
+    if output == "-":
+        print(results_json)
+    else:
+        with open(output, "w") as f:
+            f.write(results_json + "\n")
+
+    # Failing the consistency checks is a failure of the benchmark, too.
+    ok = all(results["scenarios"][s]["identical"] for s in SCENARIOS if s != "cold")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
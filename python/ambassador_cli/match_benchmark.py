@@ -0,0 +1,279 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+########
+# This is a micro-benchmark for the host-matching primitives that run for
+# every Host and every route when generating Envoy config:
+#
+# - hostglob_matches;
+# - V3Route.matches_domains;
+# - V3Chain.matching_hosts;
+# - IRHost.matches_httpgroup; and
+# - V3RouteIndex.matching_routes, which is what the others are measured
+#   against.
+#
+# It builds a real IR and V3Config from the config benchmark's synthetic
+# snapshot, with its Hosts and Mappings spread across teams so that they use a
+# realistic mix of exact, prefix, suffix, and wildcard globs, then times each
+# primitive over the whole set. The results are JSON; given the results of an
+# earlier run as a baseline, it fails if any primitive's throughput has
+# dropped by more than the tolerance.
+########
+
+from typing import Any, Callable, Dict, List, Optional
+
+import sys
+
+import json
+import logging
+import platform
+import statistics
+import time
+
+import click
+
+from ambassador import Config, IR, EnvoyConfig, Version
+from ambassador.envoy.v3.v3listener import V3Chain
+from ambassador.envoy.v3.v3route import V3RouteIndex
+from ambassador.fetch import ResourceFetcher
+from ambassador.ir.irhost import IRHost
+from ambassador.ir.irhttpmappinggroup import IRHTTPMappingGroup
+from ambassador.ir.irutils import hostglob_matches
+from ambassador.utils import NullSecretHandler, dump_json
+from ambassador_cli.benchmark import click_option, click_option_no_default, synthetic_snapshot
+
+CASES = [ "hostglob_matches", "matches_domains", "matching_hosts", "matches_httpgroup", "route_index" ]
+
+
+class MatchBenchmark:
+    """
+    Build the IR and V3Config for a synthetic_snapshot with teams, then time
+    the host-matching primitives over every Host and route in it. scale holds
+    the number of mappings, hosts, and teams.
+    """
+
+    def __init__(self, logger: logging.Logger, scale: Dict[str, int], min_seconds: float=0.2) -> None:
+        self.logger = logger
+        self.scale = scale
+        self.min_seconds = min_seconds
+
+        aconf = Config()
+        fetcher = ResourceFetcher(logger, aconf)
+        fetcher.parse_watt(dump_json(synthetic_snapshot(tlscontexts=0, endpoints=0, **scale)))
+        aconf.load_all(fetcher.sorted())
+
+        self.ir = IR(aconf, secret_handler=NullSecretHandler(logger, None, None, "0"))
+        self.econf = EnvoyConfig.generate(self.ir, "V3")
+
+        self.hosts: List[IRHost] = list(self.ir.get_hosts())
+        self.groups = [ group for group in self.ir.groups.values() if isinstance(group, IRHTTPMappingGroup) ]
+        self.routes = [ rv.route for rv in self.econf.route_variants ]
+
+        # Every pairing of a Host's hostname with a distinct route glob, which
+        # is what matches_httpgroup ends up checking.
+        globs = sorted(set(group.get('host') or '*' for group in self.groups))
+        self.glob_pairs = [ (host.hostname, glob) for host in self.hosts for glob in globs ]
+
+        self.chain = V3Chain(self.econf, "http", None)
+
+        for host in self.hosts:
+            self.chain.add_host(host)
+
+        self.index = V3RouteIndex(self.econf.route_variants)
+
+    def case_hostglob_matches(self) -> int:
+        for hostname, glob in self.glob_pairs:
+            hostglob_matches(hostname, glob)
+
+        return len(self.glob_pairs)
+
+    def case_matches_domains(self) -> int:
+        domains = [ [ host.hostname ] for host in self.hosts ]
+
+        for route in self.routes:
+            for domain_list in domains:
+                route.matches_domains(domain_list)
+
+        return len(self.routes) * len(domains)
+
+    def case_matching_hosts(self) -> int:
+        for route in self.routes:
+            self.chain.matching_hosts(route)
+
+        # Each call checks every Host in the chain.
+        return len(self.routes) * len(self.chain.hosts)
+
+    def case_matches_httpgroup(self) -> int:
+        for host in self.hosts:
+            for group in self.groups:
+                host.matches_httpgroup(group)
+
+        return len(self.hosts) * len(self.groups)
+
+    def case_route_index(self) -> int:
+        for host in self.hosts:
+            self.index.matching_routes(host)
+
+        # Count the same Host/route pairs that matching_hosts would check.
+        return len(self.routes) * len(self.hosts)
+
+    def index_consistent(self) -> bool:
+        """
+        Does the index give exactly the same answers as checking every route?
+        """
+
+        for host in self.hosts:
+            expected = { idx for idx, route in enumerate(self.routes) if host.matches_httpgroup(route._group) }
+
+            if self.index.matching_routes(host) != expected:
+                return False
+
+        return True
+
+    def time_case(self, fn: Callable[[], int], repeat: int) -> Dict[str, Any]:
+        """
+        Measure the throughput of fn, which does a pass over the whole set and
+        returns how many operations that was, repeat times. Each measurement
+        runs as many passes as fit in min_seconds, so that small sets still
+        give stable numbers.
+        """
+
+        rates: List[float] = []
+        ops = 0
+
+        for _ in range(repeat):
+            total = 0
+            start = time.perf_counter()
+
+            while True:
+                ops = fn()
+                total += ops
+                elapsed = time.perf_counter() - start
+
+                if elapsed >= self.min_seconds:
+                    break
+
+            rates.append(total / elapsed)
+
+        return {
+            "ops": ops,
+            "ops_per_second": round(max(rates), 1),
+            "ops_per_second_median": round(statistics.median(rates), 1),
+            "ops_per_second_all": [ round(r, 1) for r in rates ]
+        }
+
+    def run(self, repeat: int=5) -> Dict[str, Any]:
+        cases = { name: self.time_case(getattr(self, f"case_{name}"), repeat) for name in CASES }
+
+        return {
+            "ambassador_version": Version,
+            "python_version": platform.python_version(),
+            "scale": self.scale,
+            "counts": {
+                "hosts": len(self.hosts),
+                "groups": len(self.groups),
+                "routes": len(self.routes),
+                "glob_pairs": len(self.glob_pairs)
+            },
+            "repeat": repeat,
+            "min_seconds": self.min_seconds,
+            "index_consistent": self.index_consistent(),
+            "cases": cases
+        }
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any], tolerance: float=0.2) -> List[str]:
+    """
+    Compare results against a baseline run, and return a description of every
+    case whose throughput has dropped by more than tolerance (a fraction: 0.2
+    allows a 20% drop). Cases missing from either run are ignored.
+    """
+
+    regressions: List[str] = []
+
+    for name, case in sorted(results.get("cases", {}).items()):
+        base = baseline.get("cases", {}).get(name)
+
+        if not base or not base.get("ops_per_second"):
+            continue
+
+        old = base["ops_per_second"]
+        new = case["ops_per_second"]
+
+        if new < old * (1 - tolerance):
+            regressions.append(f"{name}: {new:.1f} ops/s is {(1 - new / old) * 100:.1f}% below baseline {old:.1f} ops/s")
+
+    return regressions
+
+
+@click.command(help="Benchmark the host-matching primitives using a synthetic snapshot")
+@click_option('--debug/--no-debug', default=False,
+              help="enable debug logging")
+@click_option('-m', '--mappings', type=click.INT, default=1000,
+              help="number of Mappings")
+@click_option('-h', '--hosts', type=click.INT, default=100,
+              help="number of Hosts")
+@click_option('-t', '--teams', type=click.INT, default=10,
+              help="number of teams (domains) to spread Hosts and Mappings across")
+@click_option('-r', '--repeat', type=click.INT, default=5,
+              help="number of times to measure each case")
+@click_option('--min-seconds', type=click.FLOAT, default=0.2,
+              help="minimum time to spend on each measurement")
+@click_option('-o', '--output', type=click.STRING, default="-",
+              help="where to write the JSON results ('-' for stdout)")
+@click_option_no_default('-b', '--baseline', type=click.STRING,
+              help="JSON results of an earlier run to compare against")
+@click_option('--tolerance', type=click.FLOAT, default=0.2,
+              help="fraction by which throughput may drop below the baseline")
+def main(debug: bool, mappings: int, hosts: int, teams: int, repeat: int, min_seconds: float, output: str,
+         baseline: Optional[str], tolerance: float) -> None:
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.WARNING,
+        format="%(asctime)s benchmark %(levelname)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    logger = logging.getLogger("ambassador")
+
+    scale = { "mappings": mappings, "hosts": hosts, "teams": teams }
+
+    results = MatchBenchmark(logger, scale, min_seconds=min_seconds).run(repeat=repeat)
+    ok = results["index_consistent"]
+
+    if baseline:
+        with open(baseline, "r") as f:
+            regressions = compare(json.load(f), results, tolerance=tolerance)
+
+        results["regressions"] = regressions
+
+        for regression in regressions:
+            logger.error(f"regression: {regression}")
+
+        ok = ok and not regressions
+
+    results_json = json.dumps(results, indent=2, sort_keys=True)
+
+    if output == "-":
+        print(results_json)
+    else:
+        with open(output, "w") as f:
+            f.write(results_json + "\n")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
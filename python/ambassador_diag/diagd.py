@@ -15,7 +15,7 @@
 # limitations under the License
 import copy
 import subprocess
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, TYPE_CHECKING
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Type, Union, TYPE_CHECKING
 from typing import cast as typecast
 
 import datetime
@@ -35,13 +35,11 @@ import time
 import traceback
 import uuid
 import requests
-import jsonpatch
 
-from expiringdict import ExpiringDict
-from prometheus_client import CollectorRegistry, ProcessCollector, generate_latest, Info, Gauge
+from prometheus_client import CollectorRegistry, ProcessCollector, generate_latest, Info, Gauge, Counter, Histogram
 from pythonjsonlogger import jsonlogger
 
-import concurrent.futures
+import collections
 
 from pkg_resources import Requirement, resource_filename
 
@@ -52,14 +50,20 @@ from flask import json as flask_json
 import gunicorn.app.base
 
 from ambassador import Cache, Config, IR, EnvoyConfig, Diagnostics, Scout, Version
+from ambassador.cachestore import CacheStore
+from ambassador.config import ACResource
+from ambassador.envoy.ads_files import ADSFileWriter
+from ambassador.envoy.validation import EnvoyValidationCache
+from ambassador.reconfig_profiler import ReconfigProfiler
 from ambassador.reconfig_stats import ReconfigStats
+from ambassador.secretstore import SecretStore, secret_store_for
+from ambassador.snapshot_writer import SnapshotWriter
 from ambassador.ir.irambassador import IRAmbassador
-from ambassador.ir.irbasemapping import IRBaseMapping
-from ambassador.utils import SystemInfo, Timer, PeriodicTrigger, SavedSecret, load_url_contents, parse_json, dump_json, parse_bool
+from ambassador.utils import SystemInfo, Timer, PeriodicTrigger, SavedSecret, load_url_bytes, parse_json, dump_json, parse_bool
 from ambassador.utils import SecretHandler, KubewatchSecretHandler, FSSecretHandler, parse_bool
 from ambassador.fetch import ResourceFetcher
 
-from ambassador.diagnostics import EnvoyStatsMgr, EnvoyStats
+from ambassador.diagnostics import EnvoyStatsMgr, EnvoyStats, OverviewPatcher
 
 from ambassador.constants import Constants
 
@@ -70,8 +74,21 @@ __version__ = Version
 
 boot_time = datetime.datetime.now()
 
-# allows 10 concurrent users, with a request timeout of 60 seconds
-tvars_cache = ExpiringDict(max_len=10, max_age_seconds=60)
+# Overview patches for the Admin UI. Clients we haven't heard from in 60
+# seconds get the whole overview again.
+#
+# Recursively drop all "serialization" keys. This avoids leaking secrets and
+# generally makes the snapshot a lot smaller without losing information that
+# the Admin UI cares about. We have to use python's json library instead of
+# orjson to parse here, because orjson does not support the object_hook
+# feature.
+overview_patcher = OverviewPatcher(serialize=lambda obj: flask_json.dumps(obj),
+                                   parse=lambda s: json.loads(s, object_hook=drop_serializer_key),
+                                   max_age_seconds=60)
+
+# These parts of the overview can change without the configuration or the
+# Envoy stats changing.
+OVERVIEW_VOLATILE = [ 'system', 'envoy_status', 'loginfo', 'notices', 'banner_content' ]
 
 logHandler = None
 if parse_bool(os.environ.get("AMBASSADOR_JSON_LOGGING", "false")):
@@ -122,6 +139,10 @@ def number_of_workers():
 
 class DiagApp (Flask):
     cache: Optional[Cache]
+
+    # Limits for the cache (see Cache), as keyword arguments
+    cache_limits: Dict[str, int]
+
     ambex_pid: int
     kick: Optional[str]
     estatsmgr: EnvoyStatsMgr
@@ -157,6 +178,45 @@ class DiagApp (Flask):
     # Reconfiguration stats
     reconf_stats: ReconfigStats
 
+    # Reconfiguration profiler
+    reconf_profiler: ReconfigProfiler
+
+    # Writes debugging snapshots in the background
+    snapshot_writer: SnapshotWriter
+
+    # Writes secrets to disk, and cleans up the ones we no longer use
+    secret_store: SecretStore
+
+    # Persistent cache store, and the input hashes of a freshly-rehydrated cache
+    cache_store: Optional[CacheStore]
+    cache_inputs: Optional[Dict[str, str]]
+
+    # Should the cache be invalidated by diffing input hashes rather than by
+    # trusting watt's Deltas? If so, last_inputs holds the input hashes that
+    # the cache was last built from.
+    content_deltas: bool
+    last_inputs: Optional[Dict[str, str]]
+
+    # Should a reconfigure where only Services' endpoints changed just patch
+    # the current IR and Envoy config?
+    endpoint_fast_path: bool
+
+    # Which fragments of the Envoy config have already passed validation
+    validation_cache: Optional[EnvoyValidationCache]
+
+    # Writes the Envoy config files that ambex reads
+    ads_files: ADSFileWriter
+
+    # Should queued snapshots be coalesced into a single reconfigure?
+    coalesce_reconfigures: bool
+
+    # Should Diagnostics be built in the background after every reconfigure?
+    eager_diagnostics: bool
+
+    # Bumped every time the config changes, so that we never install
+    # Diagnostics built for an older config.
+    diag_generation: int
+
     # Custom metrics registry to weed-out default metrics collectors because the
     # default collectors can't be prefixed/namespaced with ambassador_.
     # Using the default metrics collectors would lead to name clashes between the Python and Go instrumentations.
@@ -198,14 +258,105 @@ class DiagApp (Flask):
         # ...and the incremental-reconfigure stats.
         self.reconf_stats = ReconfigStats(self.logger)
 
+        # Profile the first few reconfigurations, if asked. (More can be requested
+        # later with /_internal/v0/profile.)
+        self.reconf_profiler = ReconfigProfiler(self.logger, snapshot_path)
+
+        try:
+            profile_count = int(os.environ.get("AMBASSADOR_PROFILE_RECONFIGURES", "0"))
+        except ValueError:
+            self.logger.warning("AMBASSADOR_PROFILE_RECONFIGURES must be an integer, not profiling")
+            profile_count = 0
+
+        if profile_count > 0:
+            self.logger.info(f"AMBASSADOR_PROFILE_RECONFIGURES set, profiling the next {profile_count} reconfigures")
+            self.reconf_profiler.request(profile_count)
+
+        # Snapshots of each reconfiguration get written in the background, once
+        # Envoy has its new config.
+        snapshot_count = int(os.environ.get('AMBASSADOR_SNAPSHOT_COUNT', "4"))
+        snapshot_detail = os.environ.get('AMBASSADOR_SNAPSHOT_DETAIL', "full").lower()
+        snapshot_compression = os.environ.get('AMBASSADOR_SNAPSHOT_COMPRESSION', "none").lower()
+
+        try:
+            self.snapshot_writer = SnapshotWriter(self.logger, snapshot_path, count=snapshot_count,
+                                                  detail=snapshot_detail, compression=snapshot_compression)
+        except ValueError as e:
+            self.logger.warning(f"{e}, using full uncompressed snapshots")
+            self.snapshot_writer = SnapshotWriter(self.logger, snapshot_path, count=snapshot_count)
+
+        # Secrets get written into the snapshot directory. Keep the files for the
+        # last few configurations, in case Envoy hasn't caught up yet.
+        try:
+            secret_generations = int(os.environ.get("AMBASSADOR_SECRET_GENERATIONS", "3"))
+        except ValueError:
+            self.logger.warning("AMBASSADOR_SECRET_GENERATIONS must be an integer, using 3")
+            secret_generations = 3
+
+        self.secret_store = secret_store_for(self.logger, snapshot_path, keep_generations=secret_generations)
+
         # This will raise an exception and crash if you pass it a string. That's intentional.
         self.ambex_pid = int(ambex_pid)
         self.kick = kick
 
+        # Skipping validation of Envoy config fragments we've already validated is
+        # on unless explicitly disabled.
+        self.validation_cache = None
+
+        if parse_bool(os.environ.get("AMBASSADOR_ENVOY_VALIDATION_CACHE", "true")):
+            self.validation_cache = EnvoyValidationCache(self.logger)
+        else:
+            self.logger.info("AMBASSADOR_ENVOY_VALIDATION_CACHE disabled, always validating entire Envoy configuration")
+
         # Initialize the cache if we're allowed to.
+        self.cache_store = None
+        self.cache_inputs = None
+        self.last_inputs = None
+
+        # Working out what changed by diffing the hashes of every input resource,
+        # rather than trusting watt's deltas, is off unless explicitly enabled.
+        self.content_deltas = parse_bool(os.environ.get("AMBASSADOR_CONTENT_DELTAS", "false"))
+
+        if self.content_deltas:
+            self.logger.info("AMBASSADOR_CONTENT_DELTAS enabled, invalidating the cache using content hashes of the inputs")
+
+        # Patching new endpoints into the current configuration, rather than
+        # building a new one, is off unless explicitly enabled.
+        self.endpoint_fast_path = parse_bool(os.environ.get("AMBASSADOR_ENDPOINT_FAST_PATH", "false"))
+
+        if self.endpoint_fast_path:
+            self.logger.info("AMBASSADOR_ENDPOINT_FAST_PATH enabled, patching endpoint-only changes into the current configuration")
+
+        # The cache is unbounded unless limits are set.
+        self.cache_limits = {}
+
+        for name, env_var in [ ("max_entries", "AMBASSADOR_CACHE_MAX_ENTRIES"),
+                               ("max_bytes", "AMBASSADOR_CACHE_MAX_BYTES") ]:
+            try:
+                self.cache_limits[name] = int(os.environ.get(env_var, "0"))
+            except ValueError:
+                self.logger.warning(f"{env_var} must be an integer, ignoring")
+                continue
+
+            if self.cache_limits[name] > 0:
+                self.logger.info(f"{env_var} set, limiting the cache to {self.cache_limits[name]}")
+
         if self.enable_fast_reconfigure:
             self.logger.info("AMBASSADOR_FAST_RECONFIGURE enabled, initializing cache")
-            self.cache = Cache(self.logger)
+            self.cache = self.new_cache()
+
+            # If we're persisting the cache, try to rehydrate it, so that our first
+            # reconfigure doesn't have to start from nothing.
+            if parse_bool(os.environ.get("AMBASSADOR_PERSISTENT_CACHE", "false")):
+                self.logger.info("AMBASSADOR_PERSISTENT_CACHE enabled, loading cache")
+
+                try:
+                    self.cache_store = CacheStore(self.logger, os.path.join(snapshot_path, "cache"))
+                    self.cache_inputs = self.cache_store.load(self.cache)
+                except Exception as e:
+                    self.logger.error(f"could not load persistent cache: {e}")
+                    self.cache = self.new_cache()
+                    self.cache_inputs = None
         else:
             self.logger.info("AMBASSADOR_FAST_RECONFIGURE disabled, not initializing cache")
             self.cache = None
@@ -224,6 +375,25 @@ class DiagApp (Flask):
         self.diag_notices = Gauge(f'diagnostics_notices', f'Number of configuration notices',
                                  namespace='ambassador', registry=self.metrics_registry)
 
+        # ...and on the secrets we write to disk.
+        self.secret_bytes_written = Histogram('secret_bytes_written', 'Bytes of secrets written per reconfigure',
+                                              namespace='ambassador', registry=self.metrics_registry,
+                                              buckets=(0, 1024, 16384, 131072, 1048576, 8388608))
+        self.secret_files = Counter('secret_files', 'Number of secret files, by what happened to them',
+                                    [ 'result' ], namespace='ambassador', registry=self.metrics_registry)
+        self.secret_files_live = Gauge('secret_files_live', 'Number of secret files on disk',
+                                       namespace='ambassador', registry=self.metrics_registry)
+
+        # ...and on the cache.
+        self.cache_lookups = Counter('cache_lookups', 'Number of cache lookups, by result',
+                                     [ 'result' ], namespace='ambassador', registry=self.metrics_registry)
+        self.cache_evictions = Counter('cache_evictions', 'Number of cache entries evicted to stay within limits',
+                                       namespace='ambassador', registry=self.metrics_registry)
+        self.cache_entries = Gauge('cache_entries', 'Number of cache entries',
+                                   namespace='ambassador', registry=self.metrics_registry)
+        self.cache_bytes = Gauge('cache_bytes', 'Estimated bytes held by cache entries (only if AMBASSADOR_CACHE_MAX_BYTES is set)',
+                                 namespace='ambassador', registry=self.metrics_registry)
+
         if debug:
             self.logger.setLevel(logging.DEBUG)
             logging.getLogger('ambassador').setLevel(logging.DEBUG)
@@ -245,6 +415,31 @@ class DiagApp (Flask):
         self.snapshot_path = snapshot_path
         self.clustermap_path = clustermap_path or os.path.join(os.path.dirname(self.bootstrap_path), "clustermap.json")
 
+        # Coalescing queued snapshots into a single reconfigure is off unless
+        # explicitly enabled.
+        self.coalesce_reconfigures = parse_bool(os.environ.get("AMBASSADOR_COALESCE_RECONFIGURES", "false"))
+
+        if self.coalesce_reconfigures:
+            self.logger.info("AMBASSADOR_COALESCE_RECONFIGURES enabled, coalescing queued snapshots")
+
+        # Building Diagnostics in the background after every reconfigure, rather
+        # than on the first request that needs them, is off unless explicitly
+        # enabled.
+        self.eager_diagnostics = parse_bool(os.environ.get("AMBASSADOR_EAGER_DIAGNOSTICS", "false"))
+
+        if self.eager_diagnostics:
+            self.logger.info("AMBASSADOR_EAGER_DIAGNOSTICS enabled, building diagnostics after each reconfigure")
+
+        # Writing each ADS cluster and listener to its own file, so that only
+        # the ones that changed get rewritten, is off unless explicitly enabled.
+        ads_resource_files = parse_bool(os.environ.get("AMBASSADOR_ADS_RESOURCE_FILES", "false"))
+
+        if ads_resource_files:
+            self.logger.info("AMBASSADOR_ADS_RESOURCE_FILES enabled, writing one file per ADS resource")
+
+        self.ads_files = ADSFileWriter(self.logger, os.path.dirname(os.path.abspath(self.ads_path)),
+                                       resource_files=ads_resource_files)
+
         # You must hold config_lock when updating config elements (including diag!).
         self.config_lock = threading.Lock()
 
@@ -262,6 +457,7 @@ class DiagApp (Flask):
         with self.config_lock:
             self.ir = None      # don't update unless you hold config_lock
             self.econf = None   # don't update unless you hold config_lock
+            self.diag_generation = 0
             self.diag = None    # don't update unless you hold config_lock
 
         self.stats_updater = None
@@ -283,6 +479,9 @@ class DiagApp (Flask):
             "single_namespace": str(Config.single_namespace),
         })
 
+    def new_cache(self) -> Cache:
+        return Cache(self.logger, **self.cache_limits)
+
     @property
     def diag(self) -> Optional[Diagnostics]:
         """
@@ -315,7 +514,11 @@ class DiagApp (Flask):
                 # Yup. Use their work.
                 return app._diag
 
-            # OK, go generate diagnostics.
+            # Remember which config we're about to generate diagnostics for...
+            with app.config_lock:
+                generation = app.diag_generation
+
+            # ...then go generate diagnostics.
             _diag = self._generate_diagnostics()
 
             # If that didn't work, no point in messing with the config lock.
@@ -327,6 +530,12 @@ class DiagApp (Flask):
             # with the diag lock, so nowhere else will try to grab the diag lock
             # while holding the config lock.
             with app.config_lock:
+                # If the config changed while we were generating, these
+                # diagnostics are already stale, so hand them to our caller
+                # without keeping them around.
+                if generation != app.diag_generation:
+                    return _diag
+
                 app._diag = _diag
 
             # Finally, we can return app._diag to our caller.
@@ -344,6 +553,34 @@ class DiagApp (Flask):
         """
         self._diag = diag
 
+        if diag is None:
+            # Whatever we're generating right now is for an older config.
+            self.diag_generation += 1
+
+    def prime_diagnostics(self) -> Optional[threading.Thread]:
+        """
+        Start generating diagnostics for the current configuration in the
+        background, so that the next request for them doesn't have to wait
+        for the whole build. Requests that arrive before it's done wait on the
+        diag_lock for it rather than starting a build of their own.
+
+        You MUST NOT hold the config_lock or the diag_lock when calling this.
+        """
+
+        if not self.eager_diagnostics:
+            return None
+
+        def generate() -> None:
+            try:
+                self.diag
+            except Exception as e:
+                self.logger.exception("could not generate diagnostics: %s" % e)
+
+        thread = threading.Thread(target=generate, name="diagnostics", daemon=True)
+        thread.start()
+
+        return thread
+
     def _generate_diagnostics(self) -> Optional[Diagnostics]:
         """
         Do the heavy lifting of generating Diagnostics for our current configuration.
@@ -566,11 +803,9 @@ def standard_handler(f):
 
         app.logger.debug("%s handler %s" % (prefix, func_name))
 
-        # Getting elements in the `tvars_cache` will make sure eviction happens on `max_age_seconds` TTL
-        # for removed patch_client rather than waiting to fill `max_len`.
-        # Looping over a copied list of keys, to prevent mutating tvars_cache while iterating.
-        for k in list(tvars_cache.keys()):
-            tvars_cache.get(k)
+        # Make sure eviction of removed patch_clients happens on the TTL rather
+        # than waiting for the cache to fill up.
+        overview_patcher.expire()
 
         # Default to the exception case
         result_to_log = "server error"
@@ -869,6 +1104,23 @@ def handle_fs():
     return info, status
 
 
+@app.route('/_internal/v0/profile', methods=[ 'GET', 'POST' ])
+@internal_handler
+def handle_profile():
+    # POST to profile the next few reconfigurations (default 1, count=0 cancels);
+    # GET to see what's going on.
+    if request.method == 'POST':
+        try:
+            count = int(request.args.get('count', '1'))
+        except ValueError:
+            return "error: count must be an integer\n", 400
+
+        app.logger.info(f"Profiling requested for the next {count} reconfigures")
+        app.reconf_profiler.request(count)
+
+    return jsonify(app.reconf_profiler.status())
+
+
 @app.route('/_internal/v0/events', methods=[ 'GET' ])
 @internal_handler
 def handle_events():
@@ -935,6 +1187,7 @@ def show_overview(reqid=None):
     # Remember that app.diag is a property that can involve some real expense
     # to compute -- we don't want to call it more than once here, so we cache
     # its value.
+    generation = app.diag_generation
     diag = app.diag
 
     if app.verbose:
@@ -977,25 +1230,19 @@ def show_overview(reqid=None):
             return jsonify(tvars.get(filter_key, None))
 
         if patch_client:
-            # Assume this is the Admin UI. Recursively drop all "serialization"
-            # keys. This avoids leaking secrets and generally makes the
-            # snapshot a lot smaller without losing information that the Admin
-            # UI cares about. We do this below by setting the object_hook
-            # parameter of the json.loads(...) call. We have to use python's
-            # json library instead of orjson, because orjson does not support
-            # the object_hook feature.
-
-            # Get the previous full representation
-            cached_tvars_json = tvars_cache.get(patch_client, dict())
-            # Serialize the tvars into a json-string using the same jsonify Flask serializer, then load the json object
-            response_content = json.loads(flask_json.dumps(tvars), object_hook=drop_serializer_key)
-            # Diff between the previous representation and the current full representation  (http://jsonpatch.com/)
-            patch = jsonpatch.make_patch(cached_tvars_json, response_content)
-            # Save the current full representation in memory
-            tvars_cache[patch_client] = response_content
-
-            # Return only the diff
-            return Response(patch.to_string(), mimetype="application/json")
+            # Assume this is the Admin UI, and return only the diff from what
+            # this client saw last. Everything but OVERVIEW_VOLATILE depends
+            # only on the configuration, the Envoy stats, and the host and
+            # scheme the overview is being shown for, so we needn't serialize
+            # it again unless one of those changes.
+            stable_key = (generation, id(diag), estats.last_update, filter_key,
+                          request.headers.get('Host', '*'),
+                          request.headers.get('X-Forwarded-Proto', 'http').lower())
+
+            patch = overview_patcher.patch_for(patch_client, tvars, stable_key=stable_key,
+                                               volatile=OVERVIEW_VOLATILE)
+
+            return Response(patch, mimetype="application/json")
         else:
             return jsonify(tvars)
     else:
@@ -1203,14 +1450,38 @@ class SystemStatus:
 
 
 class KubeStatus:
-    pool: concurrent.futures.ProcessPoolExecutor
+    """
+    Keeps track of the status we've posted for each resource, and writes the
+    updates out to Kubernetes in batches from a single writer thread, using
+    one `kubestatus --batch` run per batch rather than a kubestatus process
+    per resource.
+
+    While an update is waiting to be written, posting a newer status for the
+    same resource just replaces it. Once max_pending updates are waiting,
+    post() blocks until the writer catches up.
+    """
 
-    def __init__(self, app) -> None:
+    def __init__(self, app, max_batch: int=500, max_pending: int=5000) -> None:
         self.app = app
         self.logger = app.logger
         self.live: Dict[str,  bool] = {}
         self.current_status: Dict[str, str] = {}
-        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=5)
+
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+
+        # self.cond protects self.pending and self.writer.
+        self.cond = threading.Condition()
+        self.pending: 'collections.OrderedDict[str, Tuple[str, str, str, str]]' = collections.OrderedDict()
+        self.writer: Optional[threading.Thread] = None
+
+        self.batch_size = Histogram('kubestatus_batch_size', 'Number of status updates in each kubestatus batch',
+                                    namespace='ambassador', registry=app.metrics_registry,
+                                    buckets=(1, 5, 10, 50, 100, 500, 1000))
+        self.batch_duration = Histogram('kubestatus_batch_duration_seconds', 'Time taken to write each kubestatus batch',
+                                        namespace='ambassador', registry=app.metrics_registry)
+        self.update_results = Counter('kubestatus_updates', 'Number of status updates, by result',
+                                      [ 'result' ], namespace='ambassador', registry=app.metrics_registry)
 
     def mark_live(self, kind: str, name: str, namespace: str) -> None:
         key = f"{kind}/{name}.{namespace}"
@@ -1237,14 +1508,125 @@ class KubeStatus:
 
         if extant == text:
             # self.logger.info(f"KubeStatus MASTER {os.getpid()}: {key} == {text}")
-            pass
-        else:
-            # self.logger.info(f"KubeStatus MASTER {os.getpid()}: {key} needs {text}")
+            return
+
+        # self.logger.info(f"KubeStatus MASTER {os.getpid()}: {key} needs {text}")
+
+        # If the write fails, write_batch will forget this, so that we try
+        # again next time.
+        self.current_status[key] = text
+
+        with self.cond:
+            # We're created before gunicorn forks, so start the writer the
+            # first time we need it.
+            if not self.writer or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self.write_batches, name="kubestatus", daemon=True)
+                self.writer.start()
+
+            if key in self.pending:
+                self.update_results.labels(result='coalesced').inc()
+            else:
+                while len(self.pending) >= self.max_pending:
+                    self.cond.wait()
+
+            self.pending[key] = (kind, name, namespace, text)
+            self.cond.notify_all()
+
+    def write_batches(self) -> None:
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+
+                batch: List[Tuple[str, Tuple[str, str, str, str]]] = []
+
+                while self.pending and (len(batch) < self.max_batch):
+                    batch.append(self.pending.popitem(last=False))
+
+                # Let anyone waiting on backpressure go.
+                self.cond.notify_all()
+
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                self.logger.exception("KubeStatus: could not write batch: %s" % e)
+
+                for key, (kind, name, namespace, text) in batch:
+                    self.forget(key, text)
+
+    def write_batch(self, batch: List[Tuple[str, Tuple[str, str, str, str]]]) -> None:
+        # kubestatus shares one list request between all the updates for a
+        # given kind and namespace, so keep those together.
+        batch.sort(key=lambda item: (item[1][0], item[1][2], item[1][1]))
+
+        start = time.perf_counter()
+        errors = self.run_batch([ update for key, update in batch ])
+
+        self.batch_duration.observe(time.perf_counter() - start)
+        self.batch_size.observe(len(batch))
 
-            # For now we're going to assume that this works.
-            self.current_status[key] = text
-            f = self.pool.submit(kubestatus_update, kind, name, namespace, text)
-            f.add_done_callback(kubestatus_update_done)
+        failed = 0
+
+        for key, (kind, name, namespace, text) in batch:
+            error = errors.get(key)
+
+            if error:
+                self.logger.debug(f"KubeStatus: could not update {key}: {error}")
+                self.forget(key, text)
+                failed += 1
+
+        self.update_results.labels(result='ok').inc(len(batch) - failed)
+        self.update_results.labels(result='error').inc(failed)
+
+        if failed:
+            self.logger.info(f"KubeStatus: {failed} of {len(batch)} status updates failed")
+
+    def forget(self, key: str, text: str) -> None:
+        # Only forget the status if nothing newer has been posted since.
+        if self.current_status.get(key) == text:
+            self.current_status.pop(key, None)
+
+    def run_batch(self, updates: List[Tuple[str, str, str, str]]) -> Dict[str, str]:
+        """
+        Write updates with a single kubestatus run. Returns the error for each
+        key that failed.
+        """
+
+        stream = "".join(json.dumps({ "kind": kind, "name": name, "namespace": namespace,
+                                      "status": json.loads(text) }) + "\n"
+                         for kind, name, namespace, text in updates)
+
+        keys = [ f"{kind}/{name}.{namespace}" for kind, name, namespace, text in updates ]
+
+        cmd = [ 'kubestatus', '--cache-dir', '/tmp/client-go-http-cache', '--batch', '/dev/fd/0' ]
+
+        try:
+            rc = subprocess.run(cmd, input=stream.encode('utf-8'), stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, timeout=5 + 0.1 * len(updates))
+        except subprocess.TimeoutExpired as e:
+            return { key: "timed out" for key in keys }
+
+        if rc.returncode != 0:
+            error = f"error {rc.returncode}: {rc.stderr.decode('utf-8', errors='replace').strip()}"
+            return { key: error for key in keys }
+
+        errors = { key: "no result" for key in keys }
+
+        for line in rc.stdout.decode('utf-8', errors='replace').splitlines():
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+
+            key = f"{result.get('kind')}/{result.get('name')}.{result.get('namespace')}"
+
+            if key in errors:
+                if result.get('error'):
+                    errors[key] = result['error']
+                else:
+                    del(errors[key])
+
+        return errors
 
 
 # The KubeStatusNoMappings class clobbers the mark_live() method of the
@@ -1265,23 +1647,6 @@ class KubeStatusNoMappings (KubeStatus):
 
         super().post(kind, name, namespace, text)
 
-def kubestatus_update(kind: str, name: str, namespace: str, text: str) -> str:
-    cmd = [ 'kubestatus', '--cache-dir', '/tmp/client-go-http-cache', kind, name, '-n', namespace, '-u', '/dev/fd/0' ]
-    # print(f"KubeStatus UPDATE {os.getpid()}: running command: {cmd}")
-
-    try:
-        rc = subprocess.run(cmd, input=text.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=5)
-        if rc.returncode == 0:
-            return f"{name}.{namespace}: update OK"
-        else:
-            return f"{name}.{namespace}: error {rc.returncode}"
-
-    except subprocess.TimeoutExpired as e:
-        return f"{name}.{namespace}: timed out\n\n{e.output}"
-
-def kubestatus_update_done(f: concurrent.futures.Future) -> None:
-    # print(f"KubeStatus DONE {os.getpid()}: result {f.result()}")
-    pass
 
 class AmbassadorEventWatcher(threading.Thread):
     # The key for 'Actions' is chimed - chimed_ok - env_good. This will make more sense
@@ -1306,6 +1671,10 @@ class AmbassadorEventWatcher(threading.Thread):
         self.logger = self.app.logger
         self.events: queue.Queue = queue.Queue()
 
+        # Events we pulled off self.events while coalescing, but didn't handle yet.
+        self.pending: Deque[Tuple[str, Any, queue.Queue]] = collections.deque()
+        self.coalesced = 0          # How many snapshots have we skipped by coalescing?
+
         self.chimed = False         # Have we ever sent a chime about the environment?
         self.last_chime = False     # What was the status of our last chime? (starts as False)
         self.env_good = False       # Is our environment currently believed to be OK?
@@ -1329,7 +1698,7 @@ class AmbassadorEventWatcher(threading.Thread):
         self.logger.info("starting event watcher")
 
         while True:
-            cmd, arg, rqueue = self.events.get()
+            cmd, arg, rqueue = self.pending.popleft() if self.pending else self.events.get()
             # self.logger.info("EVENT: %s" % cmd)
 
             if cmd == 'CONFIG_FS':
@@ -1344,7 +1713,10 @@ class AmbassadorEventWatcher(threading.Thread):
 
                 try:
                     if version == 'watt':
-                        self.load_config_watt(rqueue, url)
+                        if self.app.coalesce_reconfigures:
+                            self.load_config_watt_coalesced(rqueue, url)
+                        else:
+                            self.load_config_watt(rqueue, url)
                     else:
                         raise RuntimeError("config from %s not supported" % version)
                 except Exception as e:
@@ -1438,103 +1810,367 @@ class AmbassadorEventWatcher(threading.Thread):
 
             return
 
+        snapshot = re.sub(r'[^A-Za-z0-9_-]', '_', path)
+
         # OK, we're starting a reconfiguration. BE CAREFUL TO STOP THE TIMER
         # BEFORE YOU RESPOND TO THE CALLER.
         self.app.config_timer.start()
+        self.app.reconf_profiler.start()
 
-        snapshot = re.sub(r'[^A-Za-z0-9_-]', '_', path)
-        scc = FSSecretHandler(app.logger, path, app.snapshot_path, "0")
+        # _load_ir finishes the profile itself (if we're profiling) whenever it
+        # gets far enough; this catches every other way out.
+        try:
+            scc = FSSecretHandler(app.logger, path, app.snapshot_path, "0")
 
-        with self.app.fetcher_timer:
-            aconf = Config()
-            fetcher = ResourceFetcher(app.logger, aconf)
-            fetcher.load_from_filesystem(path, k8s=app.k8s, recurse=True)
+            with self.app.fetcher_timer:
+                aconf = Config()
+                fetcher = ResourceFetcher(app.logger, aconf)
+                fetcher.load_from_filesystem(path, k8s=app.k8s, recurse=True)
 
-        if not fetcher.elements:
-            self.logger.debug("no configuration resources found at %s" % path)
-            # Don't bail from here -- go ahead and reload the IR.
-            #
-            # XXX This is basically historical logic, honestly. But if you try
-            # to respond from here and bail, STOP THE RECONFIGURATION TIMER.
+            if not fetcher.elements:
+                self.logger.debug("no configuration resources found at %s" % path)
+                # Don't bail from here -- go ahead and reload the IR.
+                #
+                # XXX This is basically historical logic, honestly. But if you try
+                # to respond from here and bail, STOP THE RECONFIGURATION TIMER.
 
-        self._load_ir(rqueue, aconf, fetcher, scc, snapshot)
+            self._load_ir(rqueue, aconf, fetcher, scc, snapshot)
+        finally:
+            self.app.reconf_profiler.finish(snapshot, "aborted")
 
     # load_config_watt reconfigures from the filesystem. It's the one true way of
     # reconfiguring these days.
     #
     # BE CAREFUL ABOUT STOPPING THE RECONFIGURATION TIMER ONCE IT IS STARTED.
-    def load_config_watt(self, rqueue: queue.Queue, url: str):
+    def load_config_watt(self, rqueue: queue.Queue, url: str,
+                         prior_deltas: Optional[List[Dict[str, Any]]]=None, prior_reset: Optional[str]=None):
         snapshot = url.split('/')[-1]
         ss_path = os.path.join(app.snapshot_path, "snapshot-tmp.yaml")
 
         # OK, we're starting a reconfiguration. BE CAREFUL TO STOP THE TIMER
         # BEFORE YOU RESPOND TO THE CALLER.
         self.app.config_timer.start()
+        self.app.reconf_profiler.start()
 
-        self.logger.debug("copying configuration: watt, %s to %s" % (url, ss_path))
+        # _load_ir finishes the profile itself (if we're profiling) whenever it
+        # gets far enough; this catches every other way out.
+        try:
+            self.logger.debug("copying configuration: watt, %s to %s" % (url, ss_path))
 
-        # Grab the serialization, and save it to disk too.
-        serialization = load_url_contents(self.logger, url, stream2=open(ss_path, "w"))
+            # Grab the serialization, and save it to disk too. We leave it as raw bytes:
+            # there's no need to decode the whole thing just to parse it.
+            with open(ss_path, "wb") as ss_stream:
+                serialization = load_url_bytes(self.logger, url, stream2=ss_stream)
 
-        if not serialization:
-            self.logger.debug("no data loaded from snapshot %s" % snapshot)
-            # We never used to return here. I'm not sure if that's really correct?
-            #
-            # IF YOU CHANGE THIS, BE CAREFUL TO STOP THE RECONFIGURATION TIMER.
+            if not serialization:
+                self.logger.debug("no data loaded from snapshot %s" % snapshot)
+                # We never used to return here. I'm not sure if that's really correct?
+                #
+                # IF YOU CHANGE THIS, BE CAREFUL TO STOP THE RECONFIGURATION TIMER.
 
-        # Weirdly, we don't need a special WattSecretHandler: parse_watt knows how to handle
-        # the secrets that watt sends.
-        scc = SecretHandler(app.logger, url, app.snapshot_path, snapshot)
+            # Weirdly, we don't need a special WattSecretHandler: parse_watt knows how to handle
+            # the secrets that watt sends.
+            scc = SecretHandler(app.logger, url, app.snapshot_path, snapshot)
 
-        # OK. Time the various configuration sections separately.
+            # OK. Time the various configuration sections separately.
 
-        with self.app.fetcher_timer:
-            aconf = Config()
-            fetcher = ResourceFetcher(app.logger, aconf)
+            with self.app.fetcher_timer:
+                aconf = Config()
+                fetcher = ResourceFetcher(app.logger, aconf)
 
-            if serialization:
-                fetcher.parse_watt(serialization)
+                if serialization:
+                    fetcher.parse_watt(serialization)
 
-        if not fetcher.elements:
-            self.logger.debug("no configuration found in snapshot %s" % snapshot)
+                # Don't hang onto the serialization for the rest of the reconfigure.
+                serialization = None
 
-            # Don't actually bail here. If they send over a valid config that happens
-            # to have nothing for us, it's still a legit config.
-            #
-            # IF YOU CHANGE THIS, BE CAREFUL TO STOP THE RECONFIGURATION TIMER.
+            if not fetcher.elements:
+                self.logger.debug("no configuration found in snapshot %s" % snapshot)
+
+                # Don't actually bail here. If they send over a valid config that happens
+                # to have nothing for us, it's still a legit config.
+                #
+                # IF YOU CHANGE THIS, BE CAREFUL TO STOP THE RECONFIGURATION TIMER.
+
+            self._load_ir(rqueue, aconf, fetcher, scc, snapshot,
+                          prior_deltas=prior_deltas, prior_reset=prior_reset)
+        finally:
+            self.app.reconf_profiler.finish(snapshot, "aborted")
+
+    def coalesce_config(self) -> List[Tuple[str, queue.Queue]]:
+        """
+        Pull every watt CONFIG event queued right behind the one we're handling
+        off the queue, and return their URLs and response queues, oldest first.
+        The first other event we find stops us, and gets handled next.
+        """
+
+        queued: List[Tuple[str, queue.Queue]] = []
+
+        while not self.pending:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            cmd, arg, rqueue = event
+
+            if (cmd == 'CONFIG') and (arg[0] == 'watt'):
+                queued.append((arg[1], rqueue))
+            else:
+                self.pending.append(event)
+
+        return queued
+
+    # watt_deltas_needed returns whether the next reconfigure will actually
+    # look at watt's Deltas. It won't if there's no cache, or if _load_ir is
+    # going to work out the deltas itself from the input hashes.
+    def watt_deltas_needed(self) -> bool:
+        if self.app.cache is None:
+            return False
+
+        if self.app.cache_inputs is not None:
+            return False
+
+        if self.app.content_deltas and (self.app.last_inputs is not None):
+            return False
+
+        return True
+
+    # load_config_watt_coalesced is load_config_watt for when snapshots are
+    # arriving faster than we can handle them: every snapshot already queued
+    # behind this one is folded into a single reconfigure using the latest.
+    def load_config_watt_coalesced(self, rqueue: queue.Queue, url: str) -> None:
+        pending_configs = [ (url, rqueue) ] + self.coalesce_config()
+
+        if len(pending_configs) == 1:
+            self.load_config_watt(rqueue, url)
+            return
+
+        superseded = pending_configs[:-1]
+        latest_url, latest_rqueue = pending_configs[-1]
+        snapshot = latest_url.split('/')[-1]
+
+        self.coalesced += len(superseded)
+        self.logger.info("coalescing %d superseded snapshot(s) into snapshot %s (%d coalesced so far)" %
+                         (len(superseded), snapshot, self.coalesced))
+
+        # Each snapshot's deltas are relative to the one before it, so the cache
+        # needs the deltas of every snapshot we're skipping, too. (If a skipped
+        # snapshot has the same URL as the latest, we can't get at its contents
+        # any more -- but then we'd only have loaded the latest anyway.)
+        prior_deltas: List[Dict[str, Any]] = []
+        prior_reset: Optional[str] = None
+
+        for old_url, _ in (superseded if self.watt_deltas_needed() else []):
+            if old_url == latest_url:
+                continue
+
+            serialization = load_url_bytes(self.logger, old_url)
+            watt_dict = parse_json(serialization) if serialization else None
+
+            if not isinstance(watt_dict, dict):
+                self.logger.debug(f"could not read deltas from superseded snapshot {old_url}")
+                prior_reset = "coalesced"
+                break
+
+            prior_deltas.extend(watt_dict.get('Deltas') or [])
+
+        # Handle the latest snapshot, then give every caller its result.
+        result_queue: queue.Queue = queue.Queue()
+        status, info = 500, 'configuration failed'
+
+        try:
+            self.load_config_watt(result_queue, latest_url, prior_deltas=prior_deltas, prior_reset=prior_reset)
+        except Exception as e:
+            self.logger.error("could not reconfigure: %s" % e)
+            self.logger.exception(e)
+
+        if not result_queue.empty():
+            status, info = result_queue.get()
+
+        self._respond(latest_rqueue, status, info)
+
+        for old_url, old_rqueue in superseded:
+            self._respond(old_rqueue, status, 'coalesced into snapshot %s: %s' % (snapshot, info))
+
+    def collect_secrets(self) -> None:
+        stats = self.app.secret_store.end_generation()
+
+        self.app.secret_bytes_written.observe(stats["bytes_written"])
+        self.app.secret_files.labels(result="written").inc(stats["files_written"])
+        self.app.secret_files.labels(result="skipped").inc(stats["files_skipped"])
+        self.app.secret_files.labels(result="removed").inc(stats["files_removed"])
+        self.app.secret_files_live.set(stats["files"])
+
+        self.logger.debug("secrets: wrote %d files (%d bytes), skipped %d unchanged, removed %d" %
+                          (stats["files_written"], stats["bytes_written"], stats["files_skipped"],
+                           stats["files_removed"]))
+
+    def collect_cache(self) -> None:
+        stats = self.app.cache.end_generation()
+
+        self.app.cache_lookups.labels(result="hit").inc(stats["hits"])
+        self.app.cache_lookups.labels(result="miss").inc(stats["misses"])
+        self.app.cache_evictions.inc(stats["evicted"])
+        self.app.cache_entries.set(stats["entries"])
+        self.app.cache_bytes.set(stats["bytes"])
+
+        self.logger.debug("cache: %d hits, %d misses, evicted %d, %d entries (%d bytes)" %
+                          (stats["hits"], stats["misses"], stats["evicted"], stats["entries"], stats["bytes"]))
+
+    def _update_endpoints(self, rqueue: queue.Queue, aconf: Config, inputs: Optional[Dict[str, str]],
+                          snapshot: str) -> bool:
+        """
+        If the only thing that changed since the last reconfigure is which
+        addresses some Services' endpoints have, patch the new endpoints into
+        the current IR and Envoy config rather than building new ones. Returns
+        True if that worked, in which case the reconfigure is done (and the
+        reconfiguration timer stopped). Returns False if we need a real
+        reconfigure, in which case nothing has been touched.
+        """
+
+        if not self.app.endpoint_fast_path:
+            return False
+
+        if (inputs is None) or (self.app.last_inputs is None) or (self.app.ir is None) or (self.app.econf is None):
+            return False
+
+        deltas = CacheStore.deltas(self.app.last_inputs, inputs)
+
+        if not deltas:
+            return False
+
+        for delta in deltas:
+            if (delta['kind'] != 'Service') or (delta['deltaType'] != 'update'):
+                return False
+
+        changed = set(ACResource.content_key(delta['kind'], delta['metadata']['name'], delta['metadata']['namespace'])
+                      for delta in deltas)
+
+        services = { key: service for key, service in (aconf.get_config('service') or {}).items()
+                     if ACResource.content_key(service.kind, service.name, service.get('namespace') or '') in changed }
+
+        if len(services) != len(changed):
+            return False
+
+        with self.app.config_lock:
+            clusters = self.app.ir.update_endpoints(services)
+
+            if clusters is None:
+                return False
+
+            updated = self.app.econf.update_endpoints(clusters)
+
+            # Force app.diag to None so that it'll be regenerated on-demand.
+            app.diag = None
+
+        # The current IR and Envoy config now match these inputs.
+        self.app.last_inputs = inputs
+        app.latest_snapshot = snapshot
 
-        self._load_ir(rqueue, aconf, fetcher, scc, snapshot)
+        if updated:
+            # Only the clusters we just patched get rewritten.
+            _, ads_config, _ = self.app.econf.split_config()
+            app.ads_files.write_ads(app.ads_path, ads_config)
+
+        app.prime_diagnostics()
+
+        self.app.config_timer.stop()
+        self.app.reconf_profiler.finish(snapshot, "endpoints")
+
+        if updated:
+            if app.kick:
+                self.logger.debug("running '%s'" % app.kick)
+                os.system(app.kick)
+            elif app.ambex_pid != 0:
+                self.logger.debug("notifying PID %d ambex" % app.ambex_pid)
+                os.kill(app.ambex_pid, signal.SIGHUP)
+
+        self._respond(rqueue, 200, 'configuration updated (endpoints) from snapshot %s' % snapshot)
+
+        self.logger.info("configuration updated (endpoints) from snapshot %s (%d services, %d clusters re-resolved, %d Envoy clusters patched)" %
+                         (snapshot, len(services), len(clusters), updated))
+
+        # This counts as an incremental reconfigure, so it'll get checked against
+        # a complete one now and then, like any other.
+        self.app.reconf_stats.mark("incremental")
+
+        return True
 
     # _load_ir is where the heavy lifting of a reconfigure happens.
     #
     # AT THE POINT OF ENTRY, THE RECONFIGURATION TIMER IS RUNNING. DO NOT LEAVE
     # THIS METHOD WITHOUT STOPPING THE RECONFIGURATION TIMER.
     def _load_ir(self, rqueue: queue.Queue, aconf: Config, fetcher: ResourceFetcher,
-                 secret_handler: SecretHandler, snapshot: str) -> None:
+                 secret_handler: SecretHandler, snapshot: str,
+                 prior_deltas: Optional[List[Dict[str, Any]]]=None, prior_reset: Optional[str]=None) -> None:
+        # If we're persisting the cache, or working out what changed ourselves,
+        # we'll need to know what our inputs were. Hash them before Config gets
+        # its hands on them.
+        inputs: Optional[Dict[str, str]] = None
+
+        if ((self.app.cache_store is not None) or ((self.app.cache is not None) and self.app.content_deltas) or
+            self.app.endpoint_fast_path):
+            inputs = fetcher.content_hashes()
+
         with self.app.aconf_timer:
             aconf.load_all(fetcher.sorted())
 
-        aconf_path = os.path.join(app.snapshot_path, "aconf-tmp.json")
-        open(aconf_path, "w").write(aconf.as_json())
+        # The snapshot writer may still be serializing the current aconf and
+        # IR, which share cached objects with the one we're about to build (and
+        # which the endpoint fast path patches in place), so let it finish.
+        self.app.snapshot_writer.wait_serialized()
+
+        # If all that changed is where some Services' endpoints are, we may be
+        # able to just patch the current configuration.
+        if self._update_endpoints(rqueue, aconf, inputs, snapshot):
+            return
 
         # Assume that this should be marked as a complete reconfigure.
         config_type = "complete"
 
         # OK. If we have a cache...
         if self.app.cache is not None:
-            # ...then we'll start by assuming that we'll need to reset it.
-            reset_cache = True
+            # ...then we'll start by assuming that we'll need to reset it, because
+            # there are no deltas.
+            reset_reason: Optional[str] = "no-deltas"
+            deltas: List[Dict[str, Any]] = [ *(prior_deltas or []), *fetcher.deltas ]
+
+            # If we work out the deltas ourselves, they're authoritative: an empty
+            # list really does mean that nothing changed.
+            authoritative = False
+
+            if (self.app.cache_inputs is not None) and (inputs is not None):
+                # The cache was just loaded from disk, so whatever deltas watt sent
+                # aren't relative to it. Work out our own from the input hashes.
+                deltas = CacheStore.deltas(self.app.cache_inputs, inputs)
+                authoritative = True
+                self.app.cache_inputs = None
+
+                self.logger.info(f"CACHE: rehydrated cache has {len(deltas)} changed inputs")
+            elif self.app.content_deltas and (self.app.last_inputs is not None) and (inputs is not None):
+                # Diff against the inputs the cache was last built from. This
+                # catches anything watt's deltas miss, and covers any snapshots
+                # we coalesced away, too.
+                watt_delta_count = len(deltas)
+                deltas = CacheStore.deltas(self.app.last_inputs, inputs)
+                authoritative = True
+
+                self.logger.debug(f"CACHE: {len(deltas)} changed inputs (watt reported {watt_delta_count} deltas)")
 
             # Next up: are there any deltas?
-            if fetcher.deltas:
+            if prior_reset and not authoritative:
+                # We skipped snapshots whose deltas we don't know.
+                reset_reason = prior_reset
+            elif deltas or authoritative:
                 # Yes. We're going to walk over them all and assemble a list
-                # of things to delete and a count of errors while processing our
-                # list.
+                # of things to invalidate. If we find a delta we can't handle
+                # incrementally, we'll note why and stop.
 
-                delta_errors = 0
+                reset_reason = None
                 to_invalidate: List[str] = []
 
-                for delta in fetcher.deltas:
+                for delta in deltas:
                     self.logger.debug(f"Delta: {delta}")
 
                     # The "kind" of a Delta must be a string; assert that to make
@@ -1543,53 +2179,59 @@ class AmbassadorEventWatcher(threading.Thread):
                     delta_kind = delta['kind']
                     assert(isinstance(delta_kind, str))
 
-                    # Only worry about Mappings and TCPMappings right now.
-                    if (delta_kind == 'Mapping') or (delta_kind == 'TCPMapping'):
-                        # XXX C'mon, mypy, is this cast really necessary?
-                        metadata = typecast(Dict[str, str], delta.get("metadata", {}))
-                        name = metadata.get("name", "")
-                        namespace = metadata.get("namespace", "")
+                    # XXX C'mon, mypy, is this cast really necessary?
+                    metadata = typecast(Dict[str, str], delta.get("metadata", {}))
+                    name = metadata.get("name", "")
+                    namespace = metadata.get("namespace", "")
 
-                        if not name or not namespace:
-                            # This is an error.
-                            delta_errors += 1
+                    if not name:
+                        # This is an error. (Some kinds can be cluster-scoped, so
+                        # we don't insist on a namespace here.)
+                        self.logger.error(f"Delta object needs name: {delta}")
+                        reset_reason = "delta-errors"
+                        break
 
-                            self.logger.error(f"Delta object needs name and namespace: {delta}")
-                        else:
-                            key = IRBaseMapping.make_cache_key(delta_kind, name, namespace)
-                            to_invalidate.append(key)
+                    keys = IR.delta_cache_keys(delta_kind, name, namespace)
 
-                # OK. If we have things to invalidate, and we have NO ERRORS...
-                if to_invalidate and not delta_errors:
-                    # ...then we can invalidate all those things instead of clearing the cache.
-                    reset_cache = False
+                    if keys is None:
+                        # We can't handle this kind of change incrementally.
+                        self.logger.debug(f"Delta: {delta_kind} {name}.{namespace} requires a complete reconfigure")
+                        reset_reason = "module" if (delta_kind == "Module") else "unsupported-kind"
+                        break
 
+                    to_invalidate.extend(keys)
+
+                # OK. If we have no reason to reset the cache...
+                if not reset_reason:
+                    # ...then we can invalidate all those things instead of clearing the cache.
                     for key in to_invalidate:
                         self.logger.debug(f"Delta: invalidating {key}")
                         self.app.cache.invalidate(key)
 
             # When all is said and done, reset the cache if necessary.
-            if reset_cache:
+            if reset_reason:
                 # This is _not_ an incremental reconfigure. Reset the cache...
-                self.logger.debug("RESETTING CACHE")
-                self.app.cache = Cache(self.logger)
+                self.logger.debug(f"RESETTING CACHE: {reset_reason}")
+                self.app.cache = self.app.new_cache()
+                self.app.reconf_stats.mark_reset(reset_reason)
             else:
                 # OK, we're doing an incremental reconfigure.
                 config_type = "incremental"
 
+        # Until the new IR and Envoy config are published, neither the cache nor
+        # the current config match any set of inputs.
+        self.app.last_inputs = None
+
         with self.app.ir_timer:
             ir = IR(aconf, secret_handler=secret_handler, cache=self.app.cache)
 
-        ir_path = os.path.join(app.snapshot_path, "ir-tmp.json")
-        open(ir_path, "w").write(ir.as_json())
-
         with self.app.econf_timer:
             self.logger.debug("generating envoy configuration with api version %s" % Config.envoy_api_version)
             econf = EnvoyConfig.generate(ir, Config.envoy_api_version, cache=self.app.cache)
 
         # DON'T generate the Diagnostics here, because that turns out to be expensive.
         # Instead, we'll just reset app.diag to None, then generate it on-demand when
-        # we need it.
+        # we need it (or in the background, if AMBASSADOR_EAGER_DIAGNOSTICS is set).
         #
         # DO go ahead and split the Envoy config into its components for later, though.
         bootstrap_config, ads_config, clustermap = econf.split_config()
@@ -1621,69 +2263,41 @@ class AmbassadorEventWatcher(threading.Thread):
             self.check_scout("attempted bad update")
 
             # DO stop the reconfiguration timer before leaving.
+            # The cache now reflects inputs that we didn't publish, so make sure
+            # the next snapshot gets a complete reconfigure rather than being
+            # diffed against them.
+            self.app.last_inputs = None
+
             self.app.config_timer.stop()
+            self.app.reconf_profiler.finish(snapshot, "invalid")
             self._respond(rqueue, 500, 'ignoring (%s) in snapshot %s' % (econf_bad_reason, snapshot))
             return
 
-        snapcount = int(os.environ.get('AMBASSADOR_SNAPSHOT_COUNT', "4"))
-        snaplist: List[Tuple[str, str]] = []
-
-        if snapcount > 0:
-            self.logger.debug("rotating snapshots for snapshot %s" % snapshot)
-
-            # If snapcount is 4, this range statement becomes range(-4, -1)
-            # which gives [ -4, -3, -2 ], which the list comprehension turns
-            # into [ ( "-3", "-4" ), ( "-2", "-3" ), ( "-1", "-2" ) ]...
-            # which is the list of suffixes to rename to rotate the snapshots.
-
-            snaplist += [ (str(x+1), str(x)) for x in range(-1 * snapcount, -1) ]
-
-            # After dealing with that, we need to rotate the current file into -1.
-            snaplist.append(( '', '-1' ))
-
-        # Whether or not we do any rotation, we need to cycle in the '-tmp' file.
-        snaplist.append(( '-tmp', '' ))
-
-        for from_suffix, to_suffix in snaplist:
-            for fmt in [ "aconf{}.json", "econf{}.json", "ir{}.json", "snapshot{}.yaml" ]:
-                from_path = os.path.join(app.snapshot_path, fmt.format(from_suffix))
-                to_path = os.path.join(app.snapshot_path, fmt.format(to_suffix))
-
-                # Make sure we don't leave this method on error! The reconfiguration
-                # timer is still running, but also, the snapshots are a debugging aid:
-                # if we can't rotate them, meh, whatever.
-
-                try:
-                    self.logger.debug("rotate: %s -> %s" % (from_path, to_path))
-                    os.rename(from_path, to_path)
-                except IOError as e:
-                    self.logger.debug("skip %s -> %s: %s" % (from_path, to_path, e))
-                    pass
-                except Exception as e:
-                    self.logger.debug("could not rename %s -> %s: %s" % (from_path, to_path, e))
-
         app.latest_snapshot = snapshot
         self.logger.debug("saving Envoy configuration for snapshot %s" % snapshot)
 
-        with open(app.bootstrap_path, "w") as output:
-            output.write(dump_json(bootstrap_config, pretty=True))
-
-        with open(app.ads_path, "w") as output:
-            output.write(dump_json(ads_config, pretty=True))
-
-        with open(app.clustermap_path, "w") as output:
-            output.write(dump_json(clustermap, pretty=True))
+        # Only files that actually changed get rewritten.
+        app.ads_files.write_file(app.bootstrap_path, bootstrap_config)
+        app.ads_files.write_ads(app.ads_path, ads_config)
+        app.ads_files.write_file(app.clustermap_path, clustermap)
 
         with app.config_lock:
             app.aconf = aconf
             app.ir = ir
             app.econf = econf
 
+            # The current IR and Envoy config now match these inputs.
+            self.app.last_inputs = inputs
+
             # Force app.diag to None so that it'll be regenerated on-demand.
             app.diag = None
 
+        # ...or, if asked, regenerated right away in the background.
+        app.prime_diagnostics()
+
         # We're finally done with the whole configuration process.
         self.app.config_timer.stop()
+        self.app.reconf_profiler.finish(snapshot, config_type)
 
         if app.kick:
             self.logger.debug("running '%s'" % app.kick)
@@ -1692,6 +2306,20 @@ class AmbassadorEventWatcher(threading.Thread):
             self.logger.debug("notifying PID %d ambex" % app.ambex_pid)
             os.kill(app.ambex_pid, signal.SIGHUP)
 
+        # Now that Envoy has the new config, secrets that none of the last few
+        # configs used can go.
+        self.collect_secrets()
+
+        # The snapshots are just a debugging aid, so write them (and rotate the
+        # old ones) only now that the new config is out there. The aconf, Envoy
+        # config, and IR get serialized on the writer thread, and the next
+        # reconfiguration waits for that before it changes anything they share.
+        app.snapshot_writer.submit(snapshot, {
+            "aconf": aconf.as_json,
+            "econf": lambda: self.econf_json(ads_config),
+            "ir": ir.as_json
+        })
+
         # don't worry about TCPMappings yet
         mappings = app.aconf.get_config('mappings')
 
@@ -1730,6 +2358,17 @@ class AmbassadorEventWatcher(threading.Thread):
         # Remember that we've reconfigured.
         self.app.reconf_stats.mark(config_type)
 
+        # Now that the cache isn't being used, get it back within its limits...
+        if self.app.cache is not None:
+            self.collect_cache()
+
+        # ...and if we're persisting the cache, now's the time, since we know this config is good.
+        if (self.app.cache_store is not None) and (self.app.cache is not None) and (inputs is not None):
+            try:
+                self.app.cache_store.save(self.app.cache, inputs)
+            except Exception as e:
+                self.logger.error(f"could not save persistent cache: {e}")
+
         if app.health_checks and not app.stats_updater:
             app.logger.debug("starting Envoy status updater")
             app.stats_updater = PeriodicTrigger(app.watcher.update_estats, period=5)
@@ -1900,6 +2539,8 @@ class AmbassadorEventWatcher(threading.Thread):
                     feat['frc_cache_misses'] = self.app.cache.misses
                     feat['frc_inv_calls'] = self.app.cache.invalidate_calls
                     feat['frc_inv_objects'] = self.app.cache.invalidated_objects
+                    feat['frc_evictions'] = self.app.cache.evictions
+                    feat['frc_evicted_objects'] = self.app.cache.evicted_objects
                 else:
                     # Fast reconfigure is off.
                     feat['frc_enabled'] = False
@@ -1910,6 +2551,9 @@ class AmbassadorEventWatcher(threading.Thread):
                 feat['frc_check_count'] = self.app.reconf_stats.checks
                 feat['frc_check_errors'] = self.app.reconf_stats.errors
 
+                for reason, count in self.app.reconf_stats.resets.items():
+                    feat[f'frc_reset_{reason.replace("-", "_")}'] = count
+
                 request_data = app.estatsmgr.get_stats().requests
 
                 if request_data:
@@ -1954,18 +2598,28 @@ class AmbassadorEventWatcher(threading.Thread):
         self.app.logger.debug("Scout notices: %s" % dump_json(scout_notices))
         self.app.logger.debug("App notices after scout: %s" % dump_json(app.notices.notices))
 
+    @staticmethod
+    def econf_json(config: Dict[str, Any]) -> str:
+        """
+        Serialize an Envoy config the way Envoy validates it, which is also how
+        it gets saved in the snapshots.
+        """
+
+        return dump_json({ k: v for k, v in config.items() if k != '@type' }, pretty=True)
+
     def validate_envoy_config(self, ir: IR, config, retries) -> bool:
         if self.app.no_envoy:
             self.app.logger.debug("Skipping validation")
             return True
 
-        # We want to keep the original config untouched
-        validation_config = copy.deepcopy(config)
-
-        # Envoy fails to validate with @type field in envoy config, so removing that
-        validation_config.pop('@type')
+        # Envoy fails to validate with @type field in envoy config, so remove that. We
+        # want to keep the original config untouched, but we don't modify anything
+        # else, so a shallow copy is enough...
+        validation_config = { k: v for k, v in config.items() if k != '@type' }
 
         if os.environ.get("AMBASSADOR_DEBUG_CLUSTER_CONFIG", "false").lower() == "true":
+            # ...except here.
+            validation_config = copy.deepcopy(validation_config)
             vconf_clusters = validation_config['static_resources']['clusters']
 
             if len(vconf_clusters) > 10:
@@ -2020,12 +2674,38 @@ class AmbassadorEventWatcher(threading.Thread):
                 with open(os.path.join(app.snapshot_path, f"problems-{stamp}.json"), "w") as output:
                     output.write(bad_dict_str)
 
-        config_json = dump_json(validation_config, pretty=True)
+        validation_cache = self.app.validation_cache
+
+        if validation_cache is None:
+            return self.run_envoy_validation(ir, validation_config, retries)
+
+        # We have a validation cache, so we may not need to validate everything.
+        needed = validation_cache.validation_config(validation_config)
+
+        if needed is None:
+            self.logger.debug("all Envoy configuration fragments validated previously, skipping validation")
+            return True
+
+        if needed is not validation_config:
+            if self.run_envoy_validation(ir, needed, retries):
+                validation_cache.mark_valid(validation_config)
+                return True
+
+            # The partial config might be missing something that the whole config has,
+            # so validate everything before we give up.
+            self.logger.info("partial Envoy configuration failed validation, validating entire configuration")
+
+        if self.run_envoy_validation(ir, validation_config, retries):
+            validation_cache.mark_valid(validation_config)
+            return True
+
+        return False
 
+    def run_envoy_validation(self, ir: IR, validation_config: Dict[str, Any], retries: int) -> bool:
         econf_validation_path = os.path.join(app.snapshot_path, "econf-tmp.json")
 
         with open(econf_validation_path, "w") as output:
-            output.write(config_json)
+            output.write(dump_json(validation_config, pretty=True))
 
         command = ['envoy', '--service-node', 'test-id', '--service-cluster', ir.ambassador_nodename, '--config-path', econf_validation_path, '--mode', 'validate']
 
@@ -2079,7 +2759,7 @@ class AmbassadorEventWatcher(threading.Thread):
         except:
             pass
 
-        self.logger.error("{}\ncould not validate the envoy configuration above after {} retries, failed with error \n{}\n(exit code {})\nAborting update...".format(config_json, retries, v_str, v_exit))
+        self.logger.error("{}\ncould not validate the envoy configuration above after {} retries, failed with error \n{}\n(exit code {})\nAborting update...".format(dump_json(validation_config, pretty=True), retries, v_str, v_exit))
         return False
 
 
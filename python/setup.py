@@ -58,7 +58,9 @@ setup(
             'diagd=ambassador_diag.diagd:main',
             'mockery=ambassador_cli.mockery:main',
             'grab-snapshots=ambassador_cli.grab_snapshots:main',
-            'ert=ambassador_cli.ert:main'
+            'ert=ambassador_cli.ert:main',
+            'config-benchmark=ambassador_cli.benchmark:main',
+            'match-benchmark=ambassador_cli.match_benchmark:main'
         ]
     },
 
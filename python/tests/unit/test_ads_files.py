@@ -0,0 +1,154 @@
+import copy
+import json
+import logging
+import os
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.envoy.ads_files import ADSFileWriter
+
+from tests.utils import compile_with_cachecheck
+
+
+MANIFESTS = """
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorListener
+metadata:
+  name: listener-8080
+  namespace: default
+spec:
+  port: 8080
+  protocol: HTTP
+  securityModel: INSECURE
+  hostBinding:
+    namespace:
+      from: ALL
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorMapping
+metadata:
+  name: foo
+  namespace: default
+spec:
+  hostname: "*"
+  prefix: /foo/
+  service: foo
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorMapping
+metadata:
+  name: bar
+  namespace: default
+spec:
+  hostname: "*"
+  prefix: /bar/
+  service: bar
+"""
+
+
+def ads_config():
+    r = compile_with_cachecheck(MANIFESTS, envoy_version="V3")
+    _, config, _ = r["v3"].split_config()
+
+    return config
+
+
+def cluster_named(config, name):
+    return [ c for c in config['static_resources']['clusters'] if c['name'] == name ][0]
+
+
+@pytest.mark.compilertest
+def test_ads_single_file(tmp_path):
+    config = ads_config()
+    ads_path = str(tmp_path / "envoy.json")
+
+    # Resource files from an earlier run must not survive.
+    stale = tmp_path / "ambassador-ads-cluster-stale.json"
+    stale.write_text("{}")
+
+    writer = ADSFileWriter(logger, str(tmp_path))
+    assert not stale.exists()
+
+    manifest = writer.write_ads(ads_path, config)
+    assert manifest["changed"] == [ "envoy.json" ]
+
+    with open(ads_path) as f:
+        assert json.load(f) == json.loads(json.dumps(config))
+
+    # Writing the same thing again doesn't touch the file.
+    manifest = writer.write_ads(ads_path, config)
+    assert manifest["changed"] == []
+    assert manifest["version"] == 2
+    assert writer.stats()["skipped"] == 1
+
+
+@pytest.mark.compilertest
+def test_ads_resource_files(tmp_path):
+    config = ads_config()
+    ads_path = str(tmp_path / "envoy.json")
+    writer = ADSFileWriter(logger, str(tmp_path), resource_files=True)
+
+    manifest = writer.write_ads(ads_path, config)
+
+    cluster_names = set(c['name'] for c in config['static_resources']['clusters'])
+    listener_names = set(l['name'] for l in config['static_resources']['listeners'])
+
+    assert "cluster_foo_default" in cluster_names
+    assert manifest["changed"] == [ "envoy.json" ]
+    assert len(manifest["added"]) == len(cluster_names) + len(listener_names)
+    assert set(r["name"] for r in manifest["resources"].values()) == cluster_names | listener_names
+
+    # The main file has no clusters or listeners left...
+    with open(ads_path) as f:
+        base = json.load(f)
+
+    assert base['static_resources']['clusters'] == []
+    assert base['static_resources']['listeners'] == []
+
+    # ...and each resource file is a Bootstrap holding one resource.
+    filename = ADSFileWriter.resource_filename("cluster", "cluster_foo_default")
+
+    with open(tmp_path / filename) as f:
+        doc = json.load(f)
+
+    assert doc['@type'] == config['@type']
+    assert [ c['name'] for c in doc['static_resources']['clusters'] ] == [ "cluster_foo_default" ]
+
+    # Change one cluster and drop another: only those files are touched.
+    config2 = copy.deepcopy(config)
+    cluster_named(config2, "cluster_foo_default")['connect_timeout'] = "9.000s"
+    config2['static_resources']['clusters'].remove(cluster_named(config2, "cluster_bar_default"))
+
+    manifest = writer.write_ads(ads_path, config2)
+
+    assert manifest["version"] == 2
+    assert manifest["added"] == []
+    assert manifest["changed"] == [ filename ]
+    assert manifest["removed"] == [ ADSFileWriter.resource_filename("cluster", "cluster_bar_default") ]
+    assert not os.path.exists(tmp_path / manifest["removed"][0])
+
+    with open(tmp_path / ADSFileWriter.MANIFEST_NAME) as f:
+        assert json.load(f) == manifest
+
+    # Nothing but resource files, the main file, and dotfiles in the directory.
+    for name in os.listdir(tmp_path):
+        assert name.startswith(ADSFileWriter.PREFIX) or name.startswith(".") or name == "envoy.json"
+
+
+def test_resource_filename():
+    assert ADSFileWriter.resource_filename("cluster", "cluster_foo") == "ambassador-ads-cluster-cluster_foo.json"
+
+    unsafe1 = ADSFileWriter.resource_filename("listener", "a/b")
+    unsafe2 = ADSFileWriter.resource_filename("listener", "a:b")
+
+    assert unsafe1 != unsafe2
+    assert "/" not in unsafe1
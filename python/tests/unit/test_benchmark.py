@@ -0,0 +1,79 @@
+import json
+import logging
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador_cli.benchmark import ConfigBenchmark, PHASES, SCENARIOS, synthetic_snapshot
+
+
+def test_synthetic_snapshot():
+    snapshot = synthetic_snapshot(mappings=8, hosts=2, tlscontexts=1, services=3, endpoints=2)
+    k8s = snapshot["Kubernetes"]
+
+    assert len(k8s["AmbassadorMapping"]) == 8
+    assert len(k8s["AmbassadorHost"]) == 2
+    assert len(k8s["TLSContext"]) == 1
+    assert len(k8s["service"]) == 3
+    assert len(k8s["endpoints"]) == 3
+    assert len(k8s["endpoints"][0]["subsets"][0]["addresses"]) == 2
+
+    # Only the first Mapping changes between generations.
+    changed = synthetic_snapshot(mappings=8, hosts=2, tlscontexts=1, services=3, endpoints=2, generation=1)
+    diffs = [ m["metadata"]["name"]
+              for m, c in zip(k8s["AmbassadorMapping"], changed["Kubernetes"]["AmbassadorMapping"]) if m != c ]
+
+    assert diffs == [ "mapping-0" ]
+
+
+def test_synthetic_snapshot_teams():
+    snapshot = synthetic_snapshot(mappings=40, hosts=10, teams=2)
+    k8s = snapshot["Kubernetes"]
+
+    assert len(k8s["AmbassadorHost"]) == 10
+    assert len(k8s["AmbassadorMapping"]) == 40
+
+    globs = [ m["spec"]["hostname"] for m in k8s["AmbassadorMapping"] ]
+
+    # There's a mix of exact, prefix, suffix, and wildcard globs.
+    assert any(g == "*" for g in globs)
+    assert any(g.startswith("*.") for g in globs)
+    assert any(g.endswith(".*") for g in globs)
+    assert any("*" not in g for g in globs)
+
+    hostnames = [ h["spec"]["hostname"] for h in k8s["AmbassadorHost"] ]
+    assert any(h.startswith("*.") for h in hostnames)
+    assert any("selector" in h["spec"] for h in k8s["AmbassadorHost"])
+    assert any("labels" in m["metadata"] for m in k8s["AmbassadorMapping"])
+
+
+@pytest.mark.compilertest
+def test_benchmark():
+    scale = { "mappings": 12, "hosts": 3, "tlscontexts": 2, "services": 4, "endpoints": 2 }
+    benchmark = ConfigBenchmark(logger, scale, trace_memory=True)
+    results = benchmark.run(repeat=2)
+
+    # Make sure the results really are JSON.
+    results = json.loads(json.dumps(results))
+
+    assert results["scale"] == scale
+    assert results["repeat"] == 2
+    assert results["max_rss_bytes"] > 0
+
+    for scenario in SCENARIOS:
+        summary = results["scenarios"][scenario]
+
+        for phase in PHASES:
+            assert len(summary[phase]["seconds"]) == 2
+            assert summary[phase]["seconds_min"] <= summary[phase]["seconds_median"]
+            assert summary[phase]["peak_bytes"] > 0
+
+        if scenario != "cold":
+            assert summary["identical"], f"{scenario} does not match an uncached build"
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Set, Tuple
 
 import difflib
 import json
@@ -19,6 +19,7 @@ logging.basicConfig(
 logger = logging.getLogger("ambassador")
 
 from ambassador import Cache, Config, IR, EnvoyConfig
+from ambassador.cachestore import CacheStore
 from ambassador.ir.ir import IRFileChecker
 from ambassador.fetch import ResourceFetcher
 from ambassador.utils import SecretHandler, NullSecretHandler, Timer
@@ -67,8 +68,7 @@ class Builder:
                 if not allow_updates:
                     raise RuntimeError(f"Cannot update {key}")
 
-                if self.cache is not None:
-                    self.cache.invalidate(key)
+                self.invalidate_delta(kind, name, namespace)
 
             self.resources[key] = rsrc
 
@@ -87,7 +87,18 @@ class Builder:
             if key in self.resources:
                 del(self.resources[key])
 
-                if self.cache is not None:
+                self.invalidate_delta(kind, name, namespace)
+
+    def invalidate_delta(self, kind: str, name: str, namespace: str) -> None:
+        # Do what diagd does with a delta: invalidate the affected keys, or
+        # reset the cache if that's impossible.
+        if self.cache is not None:
+            keys = IR.delta_cache_keys(kind, name, namespace)
+
+            if keys is None:
+                self.cache = Cache(logger)
+            else:
+                for key in keys:
                     self.cache.invalidate(key)
 
     def build(self, version='V2') -> Tuple[IR, EnvoyConfig]:
@@ -102,6 +113,8 @@ class Builder:
 
         aconf.load_all(fetcher.sorted())
 
+        self.inputs = CacheStore.input_hashes(fetcher.elements)
+
         ir = IR(aconf, cache=self.cache,
                 file_checker=lambda path: True,
                 secret_handler=self.secret_handler)
@@ -378,5 +391,348 @@ def test_long_cluster_1():
 
     print("test_long_cluster_1 done")
 
+def test_dependency_chain():
+    # Dependencies on uncached things chain: Secret -> TLSContext -> Mapping,
+    # and invalidating the Secret has to take out the Mapping (and everything
+    # linked from it).
+    builder = Builder(logger, "cache_test_1.yaml")
+    builder.build()
+
+    cache = builder.cache
+    mapping_key = "AmbassadorMapping-v2-foo-4-default"
+    group_keys = sorted(cache.links[mapping_key])
+
+    secret_key = Cache.dependency_key("Secret", "tls-cert", "default")
+    ctx_key = Cache.dependency_key("TLSContext", "origination")
+
+    cache.add_dependency(secret_key, ctx_key)
+    cache.add_dependency(ctx_key, mapping_key)
+
+    # Invalidating an unrelated dependency does nothing...
+    cache.invalidate(Cache.dependency_key("Secret", "other-cert", "default"))
+    assert cache[mapping_key] is not None
+
+    # ...but invalidating the Secret removes the Mapping and its Group.
+    cache.invalidate(secret_key)
+
+    assert cache[mapping_key] is None
+    assert group_keys and all(cache[k] is None for k in group_keys)
+    assert (secret_key not in cache.links) and (ctx_key not in cache.links)
+
+    builder.build()
+    builder.check_last("after invalidating a dependency")
+
+
+def test_delta_keys():
+    assert IR.delta_cache_keys("AmbassadorMapping", "foo", "default") == [ "AmbassadorMapping-v2-foo-default" ]
+    assert IR.delta_cache_keys("AmbassadorListener", "foo", "default") == []
+    assert IR.delta_cache_keys("ConsulResolver", "consul-dc1", "default") == [ "Dep-Resolver-consul-dc1" ]
+    assert IR.delta_cache_keys("Module", "ambassador", "default") is None
+    assert IR.delta_cache_keys("AuthService", "auth", "default") is None
+
+
+@pytest.mark.parametrize("action", [ "update", "delete" ])
+def test_tlscontext_delta(action):
+    builder1 = Builder(logger, "cache_test_4.yaml")
+    builder2 = Builder(logger, "cache_test_4.yaml", enable_cache=False)
+
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    builder1.check("baseline", b1, b2, strip_cache_keys=True)
+
+    # Changing the TLSContext has to change the cluster that uses it, without
+    # resetting the cache.
+    cache = builder1.cache
+
+    if action == "update":
+        builder1.apply_yaml("cache_delta_4.yaml")
+        builder2.apply_yaml("cache_delta_4.yaml")
+    else:
+        builder1.delete_yaml("cache_delta_4.yaml")
+        builder2.delete_yaml("cache_delta_4.yaml")
+
+    assert builder1.cache is cache
+    assert cache["AmbassadorMapping-v2-foo-0-default"] is None
+    assert cache["AmbassadorMapping-v2-foo-1-default"] is not None
+
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    builder1.check(f"after {action}", b1, b2, strip_cache_keys=True)
+
+
+@pytest.mark.parametrize("action", [ "update", "delete" ])
+def test_resolver_delta(action):
+    builder1 = Builder(logger, "cache_test_5.yaml")
+    builder2 = Builder(logger, "cache_test_5.yaml", enable_cache=False)
+
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    builder1.check("baseline", b1, b2, strip_cache_keys=True)
+
+    # Changing the resolver has to change the Mapping that uses it, without
+    # resetting the cache.
+    cache = builder1.cache
+
+    if action == "update":
+        builder1.apply_yaml("cache_delta_5.yaml")
+        builder2.apply_yaml("cache_delta_5.yaml")
+    else:
+        builder1.delete_yaml("cache_delta_5.yaml")
+        builder2.delete_yaml("cache_delta_5.yaml")
+
+    assert builder1.cache is cache
+    assert cache["AmbassadorMapping-v2-foo-0-default"] is None
+    assert cache["AmbassadorMapping-v2-foo-1-default"] is not None
+
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    builder1.check(f"after {action}", b1, b2, strip_cache_keys=True)
+
+
+def test_dependency_graph():
+    builder = Builder(logger, "cache_test_1.yaml")
+    builder.build()
+
+    cache = builder.cache
+    check_links(cache, set())
+
+    mapping_key = "AmbassadorMapping-v2-foo-4-default"
+    group_key, = cache.links[mapping_key]
+    cluster_key = "Cluster-cluster_foo_4_example_com_default"
+
+    # What depends on the Mapping is everything it owns, all the way down...
+    dependents = cache.dependents(mapping_key)
+    assert { group_key, cluster_key, f"V2-{cluster_key}" } <= dependents
+
+    # ...and going the other way, the cluster depends on the Group and the
+    # Mapping, and on the resolver it used.
+    dependencies = cache.dependencies(cluster_key)
+    assert { mapping_key, group_key, "Dep-Resolver-kubernetes-service" } <= dependencies
+
+    # Invalidating the cluster takes it out of its owner's links, too.
+    cache.invalidate(cluster_key)
+
+    assert cache[cluster_key] is None
+    assert cluster_key not in cache.links[group_key]
+    assert cache.dependents(mapping_key) == dependents - { cluster_key, f"V2-{cluster_key}" }
+    check_links(cache, { cluster_key, f"V2-{cluster_key}" })
+
+    # Invalidating the Mapping takes out exactly its dependents.
+    cache.invalidate(mapping_key)
+
+    assert not any(cache[key] for key in cache.dependents(mapping_key) | { mapping_key })
+    assert (mapping_key not in cache.links) and (mapping_key not in cache.reverse_links)
+    check_links(cache, dependents | { mapping_key })
+
+    builder.build()
+    builder.check_last("after invalidating a cluster and its Mapping")
+
+
+def test_persistent_cache(tmp_path):
+    builder1 = Builder(logger, "cache_test_4.yaml")
+    builder2 = Builder(logger, "cache_test_4.yaml", enable_cache=False)
+
+    builder1.build()
+
+    store = CacheStore(logger, str(tmp_path), fingerprint="test")
+    store.save(builder1.cache, builder1.inputs)
+
+    # Saving again without changes shouldn't write anything new.
+    saved = os.stat(tmp_path / "cache.pickle")
+    store.save(builder1.cache, builder1.inputs)
+    assert os.stat(tmp_path / "cache.pickle").st_ino == saved.st_ino
+
+    # Rehydrate into a fresh cache, as diagd would at startup...
+    cache = Cache(logger)
+    inputs = CacheStore(logger, str(tmp_path), fingerprint="test").load(cache)
+
+    assert inputs == builder1.inputs
+    assert sorted(cache.cache.keys()) == sorted(builder1.cache.cache.keys())
+    assert cache.links == builder1.cache.links
+    assert cache.reverse_links == builder1.cache.reverse_links
+    assert cache.detached
+
+    # Objects shared between entries are still shared.
+    routes = [ rsrc for rsrc, _ in cache.cache.values() if hasattr(rsrc, "_group") ]
+    assert routes
+
+    for route in routes:
+        assert route._group is cache.cache[route._group.cache_key][0]
+
+    # ...and then change a TLSContext while "down".
+    builder1.cache = cache
+    builder1.apply_yaml("cache_delta_4.yaml")
+    builder2.apply_yaml("cache_delta_4.yaml")
+
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    deltas = CacheStore.deltas(inputs, builder1.inputs)
+    assert [ (d["kind"], d["metadata"]["name"]) for d in deltas ] == [ ("TLSContext", "origination") ]
+
+    # The rehydrated cache was used, and everything was adopted by the new IR.
+    assert not cache.detached
+    assert cache.hits > 0
+    assert all(rsrc.ir is b1[0] for rsrc, _ in cache.cache.values() if hasattr(rsrc, "ir"))
+
+    builder1.check("after rehydration", b1, b2, strip_cache_keys=True)
+
+    # A different fingerprint means the persisted cache can't be used.
+    cache = Cache(logger)
+    assert CacheStore(logger, str(tmp_path), fingerprint="other").load(cache) is None
+    assert not cache.cache
+    assert not os.path.exists(tmp_path / "cache.pickle")
+
+
+def test_persistent_cache_tampering(tmp_path):
+    builder = Builder(logger, "cache_test_4.yaml")
+    builder.build()
+
+    store = CacheStore(logger, str(tmp_path), fingerprint="test")
+    store.save(builder.cache, builder.inputs)
+
+    # A pickle we didn't sign never gets unpickled...
+    with open(tmp_path / "cache.pickle", "rb") as f:
+        signature, data = f.read().split(b"\n", 1)
+
+    with open(tmp_path / "cache.pickle", "wb") as f:
+        f.write(signature + b"\n" + data + b" ")
+
+    cache = Cache(logger)
+    assert CacheStore(logger, str(tmp_path), fingerprint="test").load(cache) is None
+    assert not cache.cache
+
+    # ...and neither does one that anyone else could have written.
+    store.saved = None
+    store.save(builder.cache, builder.inputs)
+    os.chmod(tmp_path / "cache.pickle", 0o666)
+
+    assert CacheStore(logger, str(tmp_path), fingerprint="test").load(cache) is None
+    assert not cache.cache
+
+    # The key itself has to be private, too.
+    os.chmod(tmp_path / "cache.key", 0o644)
+
+    with pytest.raises(PermissionError):
+        CacheStore(logger, str(tmp_path), fingerprint="test")
+
+
+def test_service_annotation_dependencies():
+    builder = Builder(logger, "cache_test_6.yaml")
+    ir, _ = builder.build()
+
+    mappings = { mapping.name: mapping for group in ir.groups.values()
+                 for mapping in group.mappings }
+    group_key = ir.groups[mappings["svc-b"].group_id].cache_key
+    service_key = Cache.dependency_key("Service", "svc", "default")
+
+    # Both Mappings from the Service's annotations depend on it, including the
+    # one that joined the other's group...
+    for name in [ "svc-a", "svc-b" ]:
+        assert service_key in builder.cache.dependencies(mappings[name].cache_key)
+
+    assert service_key in builder.cache.dependencies(group_key)
+
+    # ...but the Mapping CRD doesn't, even though its rkey looks the same.
+    assert mappings["svc"].rkey == mappings["svc-a"].rkey
+    assert service_key not in builder.cache.dependencies(mappings["svc"].cache_key)
+
+    # Changing the Service rebuilds its Mappings' group, and only that.
+    builder.invalidate_delta("Service", "svc", "default")
+
+    assert builder.cache[group_key] is None
+    assert builder.cache[mappings["svc-a"].cache_key] is None
+    assert builder.cache[mappings["svc"].cache_key] is not None
+
+
+def check_links(cache: Cache, evicted: Set[str]) -> None:
+    # Everything a cached entry owns has to still be cached, and nothing can
+    # depend on anything that was evicted.
+    for key, owned_keys in cache.links.items():
+        for owned in owned_keys:
+            if key in cache.cache:
+                assert owned in cache.cache, f"{key} -> {owned} dangles"
+
+            assert owned not in evicted, f"{key} -> {owned} was evicted"
+            assert key in cache.reverse_links.get(owned, ()), f"{key} -> {owned} has no reverse link"
+
+    for owned, owners in cache.reverse_links.items():
+        for key in owners:
+            assert owned in cache.links.get(key, ()), f"{owned} <- {key} has no link"
+
+
+def test_evict_unused():
+    builder1 = Builder(logger, "cache_test_1.yaml")
+    builder2 = Builder(logger, "cache_test_1.yaml", enable_cache=False)
+
+    cache = builder1.cache
+    builder1.build()
+    cache.end_generation()
+
+    # Drop some Mappings without telling the cache, leaving their entries
+    # behind...
+    for key in [ k for k in builder1.resources.keys() if k.endswith("-foo-4-default") ]:
+        del(builder1.resources[key])
+        del(builder2.resources[key])
+
+    builder1.build()
+
+    # (Mappings are never fetched, just the Groups they own.)
+    recency = cache.recency()
+    live = set(key for key, generation in recency.items() if generation == cache.generation)
+    assert live < set(cache.cache.keys())
+
+    # ...which are exactly what a bounded cache evicts.
+    cache.max_entries = len(live)
+    cached = set(cache.cache.keys())
+    stats = cache.end_generation()
+
+    assert stats["evicted"] > 0
+    assert stats["entries"] == len(live)
+    assert set(cache.cache.keys()) == live
+    assert cache.evicted_objects == stats["evicted"]
+    check_links(cache, cached - live)
+
+    # Everything that's left gets used again, and nothing else is built.
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    assert set(cache.cache.keys()) == live
+    builder1.check("after eviction", b1, b2, strip_cache_keys=True)
+
+
+@pytest.mark.parametrize("limits", [ { "max_entries": 5 }, { "max_bytes": 20000 } ])
+def test_bounded_cache(limits):
+    builder1 = Builder(logger, "cache_test_1.yaml")
+    builder2 = Builder(logger, "cache_test_1.yaml", enable_cache=False)
+
+    cache = Cache(logger, **limits)
+    builder1.cache = cache
+
+    for i in range(3):
+        b1 = builder1.build()
+        b2 = builder2.build()
+
+        builder1.check(f"bounded build {i}", b1, b2, strip_cache_keys=True)
+
+        cached = set(cache.cache.keys())
+        stats = cache.end_generation()
+
+        assert stats["evicted"] > 0
+        assert stats["entries"] == len(cache.cache)
+        assert len(cache.cache) <= limits.get("max_entries", len(cache.cache))
+        assert cache.total_bytes <= limits.get("max_bytes", cache.total_bytes)
+        assert set(cache.sizes.keys()) <= set(cache.cache.keys())
+        check_links(cache, cached - set(cache.cache.keys()))
+
+        if i > 0:
+            # Whatever survived eviction was used.
+            assert stats["hits"] > 0
+
+
 if __name__ == '__main__':
     pytest.main(sys.argv)
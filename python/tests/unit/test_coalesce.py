@@ -0,0 +1,131 @@
+import logging
+import queue
+
+from types import SimpleNamespace
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+import ambassador_diag.diagd as diagd
+from ambassador_diag.diagd import AmbassadorEventWatcher
+
+
+class CoalescingWatcher (AmbassadorEventWatcher):
+    """
+    An AmbassadorEventWatcher that records reconfigures instead of doing them.
+    """
+
+    def __init__(self, **app) -> None:
+        # By default, there's a cache that relies on watt's deltas.
+        app = { "cache": object(), "cache_inputs": None, "content_deltas": False, "last_inputs": None, **app }
+
+        super().__init__(SimpleNamespace(logger=logger, coalesce_reconfigures=True, **app))
+        self.loads = []
+
+    def load_config_watt(self, rqueue, url, prior_deltas=None, prior_reset=None):
+        self.loads.append((url, prior_deltas, prior_reset))
+        self._respond(rqueue, 200, "configuration updated from %s" % url.split('/')[-1])
+
+
+def mapping_delta(name):
+    return { "kind": "AmbassadorMapping", "metadata": { "name": name, "namespace": "default" } }
+
+
+SNAPSHOTS = {
+    "http://localhost/snap-1": b'{"Kubernetes": {}, "Deltas": [ %s ]}' % (
+        b'{"kind": "AmbassadorMapping", "metadata": {"name": "one", "namespace": "default"}}'),
+    "http://localhost/snap-2": b'{"Kubernetes": {}}',
+}
+
+
+def test_coalesce(monkeypatch):
+    monkeypatch.setattr(diagd, "load_url_bytes", lambda logger, url, stream2=None: SNAPSHOTS.get(url))
+
+    watcher = CoalescingWatcher()
+
+    rqueues = [ queue.Queue() for _ in range(5) ]
+
+    watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-2"), rqueues[1]))
+    watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-3"), rqueues[2]))
+    watcher.events.put(('TIMER', None, rqueues[3]))
+    watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-4"), rqueues[4]))
+
+    watcher.load_config_watt_coalesced(rqueues[0], "http://localhost/snap-1")
+
+    # Only the latest snapshot before the TIMER got loaded, with the deltas of
+    # the snapshots it replaced.
+    assert watcher.loads == [ ("http://localhost/snap-3", [ mapping_delta("one") ], None) ]
+    assert watcher.coalesced == 2
+
+    assert rqueues[2].get_nowait() == (200, "configuration updated from snap-3")
+
+    for rqueue in rqueues[0:2]:
+        assert rqueue.get_nowait() == (200, "coalesced into snapshot snap-3: configuration updated from snap-3")
+
+    # The TIMER is next, and the last CONFIG is still waiting behind it.
+    assert list(watcher.pending) == [ ('TIMER', None, rqueues[3]) ]
+    assert watcher.events.get_nowait() == ('CONFIG', ('watt', "http://localhost/snap-4"), rqueues[4])
+
+
+def test_coalesce_single(monkeypatch):
+    monkeypatch.setattr(diagd, "load_url_bytes", lambda logger, url, stream2=None: SNAPSHOTS.get(url))
+
+    watcher = CoalescingWatcher()
+    rqueue: queue.Queue = queue.Queue()
+
+    watcher.load_config_watt_coalesced(rqueue, "http://localhost/snap-1")
+
+    assert watcher.loads == [ ("http://localhost/snap-1", None, None) ]
+    assert watcher.coalesced == 0
+    assert rqueue.get_nowait() == (200, "configuration updated from snap-1")
+
+
+def test_coalesce_unknown_deltas(monkeypatch):
+    monkeypatch.setattr(diagd, "load_url_bytes", lambda logger, url, stream2=None: SNAPSHOTS.get(url))
+
+    watcher = CoalescingWatcher()
+    rqueues = [ queue.Queue() for _ in range(3) ]
+
+    # snap-missing can't be read, so we can't know its deltas.
+    watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-missing"), rqueues[1]))
+    watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-2"), rqueues[2]))
+
+    watcher.load_config_watt_coalesced(rqueues[0], "http://localhost/snap-1")
+
+    assert watcher.loads == [ ("http://localhost/snap-2", [ mapping_delta("one") ], "coalesced") ]
+
+    # Superseded snapshots with the same URL as the latest don't need reading.
+    watcher.loads = []
+    watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-missing"), rqueues[1]))
+
+    watcher.load_config_watt_coalesced(rqueues[0], "http://localhost/snap-missing")
+
+    assert watcher.loads[-1] == ("http://localhost/snap-missing", [], None)
+
+
+def test_coalesce_deltas_unused(monkeypatch):
+    def load_url_bytes(logger, url, stream2=None):
+        raise AssertionError("fetched %s" % url)
+
+    monkeypatch.setattr(diagd, "load_url_bytes", load_url_bytes)
+
+    # With no cache, or with content-hash deltas, watt's deltas never get used,
+    # so the superseded snapshots don't even get fetched.
+    for app in [ { "cache": None }, { "content_deltas": True, "last_inputs": {} }, { "cache_inputs": {} } ]:
+        watcher = CoalescingWatcher(**app)
+        rqueues = [ queue.Queue() for _ in range(3) ]
+
+        watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-2"), rqueues[1]))
+        watcher.events.put(('CONFIG', ('watt', "http://localhost/snap-3"), rqueues[2]))
+
+        watcher.load_config_watt_coalesced(rqueues[0], "http://localhost/snap-1")
+
+        assert watcher.loads == [ ("http://localhost/snap-3", [], None) ]
+
+        for rqueue in rqueues[0:2]:
+            assert rqueue.get_nowait() == (200, "coalesced into snapshot snap-3: configuration updated from snap-3")
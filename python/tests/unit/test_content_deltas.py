@@ -0,0 +1,94 @@
+import json
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config
+from ambassador.cachestore import CacheStore
+from ambassador.config.acresource import ACResource
+from ambassador.fetch import ResourceFetcher
+from ambassador_cli.benchmark import synthetic_snapshot
+
+
+def mapping(name: str, prefix: str, serialization: str="") -> ACResource:
+    return ACResource.from_dict(f"{name}.default.1", f"{name}.default", serialization, {
+        "apiVersion": "getambassador.io/v3alpha1",
+        "kind": "Mapping",
+        "name": name,
+        "namespace": "default",
+        "prefix": prefix,
+        "service": "backend"
+    })
+
+
+def fetch(snapshot) -> ResourceFetcher:
+    fetcher = ResourceFetcher(logger, Config())
+    fetcher.parse_watt(json.dumps(snapshot))
+
+    return fetcher
+
+
+def test_content_hash():
+    one = mapping("one", "/one/", serialization="status: pending")
+    same = mapping("one", "/one/", serialization="status: ready")
+    other = mapping("one", "/other/")
+
+    # The serialization doesn't count, the contents do.
+    assert one.content_hash() == same.content_hash()
+    assert one.content_hash() != other.content_hash()
+
+
+def test_content_hashes_duplicates():
+    one = mapping("one", "/one/")
+    two = mapping("one", "/two/")
+
+    hashes = ACResource.content_hashes([ one, two ])
+    assert list(hashes.keys()) == [ "Mapping|one|default" ]
+
+    # The order the duplicates arrive in doesn't matter.
+    assert ACResource.content_hashes([ two, one ]) == hashes
+    assert hashes != ACResource.content_hashes([ one ])
+
+
+def test_deltas():
+    old = { "Mapping|a|default": "1", "Mapping|b|default": "2", "Host|c|default": "3" }
+    new = { "Mapping|a|default": "1", "Mapping|b|default": "4", "Service|d|other": "5" }
+
+    deltas = CacheStore.deltas(old, new)
+
+    assert [ (d["kind"], d["metadata"]["name"], d["metadata"]["namespace"], d["deltaType"]) for d in deltas ] == [
+        ( "Host", "c", "default", "delete" ),
+        ( "Mapping", "b", "default", "update" ),
+        ( "Service", "d", "other", "add" ),
+    ]
+
+    assert CacheStore.deltas(new, new) == []
+
+
+def test_snapshot_deltas():
+    scale = { "mappings": 6, "hosts": 2, "tlscontexts": 1, "services": 2, "endpoints": 2 }
+
+    first = fetch(synthetic_snapshot(**scale)).content_hashes()
+
+    # The same snapshot again hashes the same.
+    assert fetch(synthetic_snapshot(**scale)).content_hashes() == first
+
+    # A new generation changes exactly one Mapping.
+    changed = fetch(synthetic_snapshot(generation=1, **scale)).content_hashes()
+    deltas = CacheStore.deltas(first, changed)
+
+    assert len(deltas) == 1
+    assert deltas[0]["metadata"]["name"] == "mapping-0"
+    assert deltas[0]["deltaType"] == "update"
+
+    # Dropping the last Mapping deletes it, and nothing else.
+    fewer = fetch(synthetic_snapshot(**{ **scale, "mappings": 5 })).content_hashes()
+    deltas = CacheStore.deltas(first, fewer)
+
+    assert [ (d["metadata"]["name"], d["deltaType"]) for d in deltas ] == [ ( "mapping-5", "delete" ) ]
@@ -0,0 +1,103 @@
+import logging
+import threading
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+import ambassador_diag.diagd as diagd
+
+
+class SlowDiagnostics:
+    """
+    Stands in for DiagApp._generate_diagnostics, and doesn't finish until
+    told to.
+    """
+
+    def __init__(self) -> None:
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.built = []
+
+    def __call__(self):
+        self.started.set()
+        assert self.release.wait(10)
+
+        diag = object()
+        self.built.append(diag)
+        return diag
+
+
+def setup_app(monkeypatch, generate):
+    app = diagd.app
+
+    for name, value in [ ("logger", logger),
+                         ("config_lock", threading.Lock()),
+                         ("diag_lock", threading.Lock()),
+                         ("eager_diagnostics", True),
+                         ("diag_generation", 0),
+                         ("_diag", None),
+                         ("_generate_diagnostics", generate) ]:
+        monkeypatch.setattr(app, name, value, raising=False)
+
+    return app
+
+
+def test_eager_diagnostics(monkeypatch):
+    generate = SlowDiagnostics()
+    app = setup_app(monkeypatch, generate)
+
+    thread = app.prime_diagnostics()
+    assert generate.started.wait(10)
+
+    # A request that arrives mid-build waits for the background build instead
+    # of starting its own.
+    answers = []
+    reader = threading.Thread(target=lambda: answers.append(app.diag))
+    reader.start()
+
+    generate.release.set()
+    thread.join(10)
+    reader.join(10)
+
+    assert len(generate.built) == 1
+    assert app._diag is generate.built[0]
+    assert answers == [ generate.built[0] ]
+
+
+def test_stale_diagnostics(monkeypatch):
+    generate = SlowDiagnostics()
+    app = setup_app(monkeypatch, generate)
+
+    thread = app.prime_diagnostics()
+    assert generate.started.wait(10)
+
+    # The config changes while diagnostics are being built...
+    with app.config_lock:
+        app.diag = None
+
+    generate.release.set()
+    thread.join(10)
+
+    # ...so the diagnostics that were being built get thrown away.
+    assert len(generate.built) == 1
+    assert app._diag is None
+
+    # The next build is for the current config, so it sticks.
+    app.prime_diagnostics().join(10)
+
+    assert len(generate.built) == 2
+    assert app._diag is generate.built[1]
+
+
+def test_lazy_diagnostics(monkeypatch):
+    generate = SlowDiagnostics()
+    app = setup_app(monkeypatch, generate)
+    monkeypatch.setattr(app, "eager_diagnostics", False)
+
+    assert app.prime_diagnostics() is None
+    assert not generate.started.is_set()
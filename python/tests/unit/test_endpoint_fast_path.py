@@ -0,0 +1,239 @@
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config, IR, EnvoyConfig
+from ambassador.cachestore import CacheStore
+from ambassador.config.acresource import ACResource
+from ambassador.fetch import ResourceFetcher
+from ambassador.envoy.ads_files import ADSFileWriter
+from ambassador.reconfig_profiler import ReconfigProfiler
+from ambassador.reconfig_stats import ReconfigStats
+from ambassador.snapshot_writer import SnapshotWriter
+from ambassador.utils import NullSecretHandler, Timer
+from ambassador_cli.benchmark import synthetic_snapshot
+
+import ambassador_diag.diagd as diagd
+from ambassador_diag.diagd import AmbassadorEventWatcher
+
+SCALE = { "mappings": 6, "hosts": 2, "tlscontexts": 1, "services": 3, "endpoints": 2 }
+
+
+def load(snapshot, secret_handler=None):
+    aconf = Config()
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_watt(json.dumps(snapshot))
+    aconf.load_all(fetcher.sorted())
+
+    ir = IR(aconf, secret_handler=secret_handler or NullSecretHandler(logger, None, None, "0"))
+    econf = EnvoyConfig.generate(ir, "V3")
+
+    return fetcher.content_hashes(), aconf, ir, econf
+
+
+def changed_services(old_inputs, new_inputs, aconf):
+    changed = set(ACResource.content_key(d["kind"], d["metadata"]["name"], d["metadata"]["namespace"])
+                  for d in CacheStore.deltas(old_inputs, new_inputs))
+
+    return { key: svc for key, svc in aconf.get_config("service").items()
+             if ACResource.content_key(svc.kind, svc.name, svc.get("namespace") or "") in changed }
+
+
+def clusters_for(econf):
+    return { cluster["name"]: cluster for cluster in econf.as_dict()["static_resources"]["clusters"] }
+
+
+@pytest.mark.compilertest
+def test_update_endpoints(monkeypatch):
+    # Legacy mode puts the endpoints into each cluster's load_assignment,
+    # rather than leaving them to EDS.
+    monkeypatch.setattr(Config, "legacy_mode", True)
+
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+
+    snapshot = synthetic_snapshot(**SCALE)
+    inputs, _, ir, econf = load(snapshot, secret_handler)
+
+    # Pods come and go for svc-1.
+    snapshot["Kubernetes"]["endpoints"][1]["subsets"][0]["addresses"] = [ { "ip": "10.9.9.1" }, { "ip": "10.9.9.2" } ]
+    new_inputs, new_aconf, _, new_econf = load(snapshot, secret_handler)
+
+    services = changed_services(inputs, new_inputs, new_aconf)
+    assert list(services.keys()) == [ "k8s-svc-1-default" ]
+
+    clusters = ir.update_endpoints(services)
+    assert clusters
+    assert all(cluster.targets[0]["ip"].startswith("10.9.9.") for cluster in clusters)
+
+    assert econf.update_endpoints(clusters) == len(clusters)
+
+    # Patching gets exactly what a complete rebuild does.
+    assert clusters_for(econf) == clusters_for(new_econf)
+    assert ir.services["k8s-svc-1-default"] is services["k8s-svc-1-default"]
+
+    # Patching again changes nothing.
+    assert ir.update_endpoints(services) == []
+
+
+@pytest.mark.compilertest
+def test_update_endpoints_eds():
+    snapshot = synthetic_snapshot(**SCALE)
+    inputs, _, ir, econf = load(snapshot)
+    before = clusters_for(econf)
+
+    snapshot["Kubernetes"]["endpoints"][0]["subsets"][0]["addresses"].append({ "ip": "10.9.9.9" })
+    new_inputs, new_aconf, _, _ = load(snapshot)
+
+    clusters = ir.update_endpoints(changed_services(inputs, new_inputs, new_aconf))
+    assert clusters
+
+    # EDS clusters get their endpoints from ambex, so the Envoy config stays put.
+    assert econf.update_endpoints(clusters) == 0
+    assert clusters_for(econf) == before
+
+
+@pytest.mark.compilertest
+def test_update_endpoints_not_only_endpoints():
+    snapshot = synthetic_snapshot(**SCALE)
+    inputs, _, ir, _ = load(snapshot)
+    targets = { name: cluster.targets for name, cluster in ir.clusters.items() }
+
+    # Losing every endpoint changes which ports the Service has...
+    snapshot["Kubernetes"]["endpoints"][0]["subsets"][0]["addresses"] = []
+
+    # ...and relabeling a Service changes more than its endpoints.
+    snapshot["Kubernetes"]["service"][1]["metadata"] = { **snapshot["Kubernetes"]["service"][1]["metadata"],
+                                                         "labels": { "team": "other" } }
+
+    new_inputs, new_aconf, _, _ = load(snapshot)
+    services = changed_services(inputs, new_inputs, new_aconf)
+    assert sorted(services.keys()) == [ "k8s-svc-0-default", "k8s-svc-1-default" ]
+
+    for key, service in services.items():
+        assert ir.update_endpoints({ key: service }) is None
+
+    # Nothing was touched.
+    assert { name: cluster.targets for name, cluster in ir.clusters.items() } == targets
+    assert all(ir.services[key] is not service for key, service in services.items())
+
+
+def setup_app(monkeypatch, tmp_path, inputs, ir, econf):
+    app = diagd.app
+
+    config_timer = Timer("reconfiguration")
+    config_timer.start()
+
+    for name, value in [ ("logger", logger),
+                         ("config_lock", threading.Lock()),
+                         ("diag_lock", threading.Lock()),
+                         ("endpoint_fast_path", True),
+                         ("eager_diagnostics", False),
+                         ("last_inputs", inputs),
+                         ("ir", ir),
+                         ("econf", econf),
+                         ("diag_generation", 0),
+                         ("_diag", None),
+                         ("latest_snapshot", "1"),
+                         ("ads_path", str(tmp_path / "ads.json")),
+                         ("ads_files", ADSFileWriter(logger, str(tmp_path))),
+                         ("config_timer", config_timer),
+                         ("reconf_profiler", ReconfigProfiler(logger, str(tmp_path))),
+                         ("reconf_stats", ReconfigStats(logger)),
+                         ("snapshot_writer", SnapshotWriter(logger, str(tmp_path), detail="none")),
+                         ("kick", None),
+                         ("ambex_pid", 0) ]:
+        monkeypatch.setattr(app, name, value, raising=False)
+
+    return app
+
+
+@pytest.mark.compilertest
+def test_fast_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "legacy_mode", True)
+
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+    snapshot = synthetic_snapshot(**SCALE)
+    inputs, _, ir, econf = load(snapshot, secret_handler)
+
+    app = setup_app(monkeypatch, tmp_path, inputs, ir, econf)
+    watcher = AmbassadorEventWatcher(app)
+
+    snapshot["Kubernetes"]["endpoints"][2]["subsets"][0]["addresses"] = [ { "ip": "10.9.9.3" } ]
+    new_inputs, new_aconf, _, _ = load(snapshot, secret_handler)
+
+    rqueue: queue.Queue = queue.Queue()
+    assert watcher._update_endpoints(rqueue, new_aconf, new_inputs, "2")
+
+    assert rqueue.get_nowait() == (200, "configuration updated (endpoints) from snapshot 2")
+    assert app.last_inputs == new_inputs
+    assert app.latest_snapshot == "2"
+    assert app.diag_generation == 1
+
+    # The new endpoint made it to ambex.
+    with open(app.ads_path) as f:
+        assert "10.9.9.3" in f.read()
+
+    # Anything more than endpoints needs a real reconfigure.
+    snapshot = synthetic_snapshot(generation=1, **SCALE)
+    newer_inputs, newer_aconf, _, _ = load(snapshot, secret_handler)
+
+    assert not watcher._update_endpoints(rqueue, newer_aconf, newer_inputs, "3")
+    assert rqueue.empty()
+    assert app.last_inputs == new_inputs
+
+
+@pytest.mark.compilertest
+def test_fast_path_after_invalid_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "legacy_mode", True)
+
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+    snapshot = synthetic_snapshot(**SCALE)
+    inputs, _, ir, econf = load(snapshot, secret_handler)
+
+    app = setup_app(monkeypatch, tmp_path, inputs, ir, econf)
+
+    for name, value in [ ("cache", None),
+                         ("cache_store", None),
+                         ("cache_inputs", None),
+                         ("content_deltas", False),
+                         ("validation_retries", 1),
+                         ("aconf_timer", Timer("AConf")),
+                         ("ir_timer", Timer("IR")),
+                         ("econf_timer", Timer("EConf")) ]:
+        monkeypatch.setattr(app, name, value, raising=False)
+
+    watcher = AmbassadorEventWatcher(app)
+    monkeypatch.setattr(watcher, "validate_envoy_config", lambda *args, **kwargs: False)
+    monkeypatch.setattr(watcher, "check_scout", lambda *args, **kwargs: None)
+
+    # A Mapping changes, but Envoy rejects the new config...
+    snapshot = synthetic_snapshot(generation=1, **SCALE)
+    aconf = Config()
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_watt(json.dumps(snapshot))
+
+    rqueue: queue.Queue = queue.Queue()
+    watcher._load_ir(rqueue, aconf, fetcher, secret_handler, "2")
+
+    assert rqueue.get_nowait()[0] == 500
+    assert app.ir is ir
+    assert app.last_inputs is None
+
+    # ...so an endpoint-only change after that can't just be patched onto the
+    # old config: the Mapping change would never get applied.
+    snapshot["Kubernetes"]["endpoints"][2]["subsets"][0]["addresses"] = [ { "ip": "10.9.9.3" } ]
+    new_inputs, new_aconf, _, _ = load(snapshot, secret_handler)
+
+    assert not watcher._update_endpoints(rqueue, new_aconf, new_inputs, "3")
+    assert rqueue.empty()
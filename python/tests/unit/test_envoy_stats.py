@@ -18,6 +18,7 @@ logging.basicConfig(
 logger = logging.getLogger("ambassador")
 
 from ambassador.diagnostics import EnvoyStatsMgr, EnvoyStats
+from ambassador.diagnostics.envoy_stats import parse_envoy_stats
 
 
 class EnvoyStatsMocker:
@@ -251,5 +252,46 @@ def test_locks():
     assert not stats5.is_ready()
 
 
+def test_streamed_stats():
+    mocker = EnvoyStatsMocker()
+    text = mocker.fetch_envoy_stats()
+    mocker.stats_idx = 0
+
+    def stream_lines():
+        # Hand lines over one at a time, the way a streamed response does.
+        for line in text.split("\n"):
+            yield line
+
+    esm_text = EnvoyStatsMgr(logger, fetch_log_levels=mocker.fetch_log_levels,
+                             fetch_envoy_stats=lambda: text)
+    esm_stream = EnvoyStatsMgr(logger, fetch_log_levels=mocker.fetch_log_levels,
+                               fetch_envoy_stats=stream_lines)
+
+    esm_text.update()
+    esm_stream.update()
+
+    assert esm_stream.get_stats().clusters == esm_text.get_stats().clusters
+    assert esm_stream.get_stats().requests == esm_text.get_stats().requests
+    assert esm_stream.get_stats().envoy == esm_text.get_stats().envoy
+
+    # Per-cluster stats only show up in the cluster records.
+    envoy_stats, cluster_records = parse_envoy_stats(stream_lines())
+    assert "cluster" not in envoy_stats
+    assert len(cluster_records) == 336
+    assert cluster_records['cluster_127_0_0_1_8500_ambassador'] == [ 1, 1, 4220, 4220, 14, 14, 0 ]
+
+    # A connection that drops partway through is an update error.
+    def broken_stream():
+        yield from text.split("\n")[:100]
+        raise ConnectionResetError("connection reset by peer")
+
+    esm_broken = EnvoyStatsMgr(logger, fetch_log_levels=EnvoyStatsMocker().fetch_log_levels,
+                               fetch_envoy_stats=broken_stream)
+    esm_broken.update()
+
+    assert esm_broken.get_stats().update_errors == 1
+    assert esm_broken.get_stats().last_update is None
+
+
 if __name__ == '__main__':
     pytest.main(sys.argv)
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import subprocess
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.envoy.validation import EnvoyValidationCache
+
+from tests.utils import compile_with_cachecheck, default_listener_manifests
+
+import ambassador_diag.diagd as diagd
+from ambassador_diag.diagd import AmbassadorEventWatcher
+
+
+def mapping_manifest(name: str, prefix: str) -> str:
+    return f"""
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorMapping
+metadata:
+  name: {name}
+  namespace: default
+spec:
+  hostname: "*"
+  prefix: {prefix}
+  service: {name}
+"""
+
+
+def compile_ads(*mappings: str):
+    r = compile_with_cachecheck(default_listener_manifests() + "".join(mappings), envoy_version="V3")
+    _, ads, _ = r["v3"].split_config()
+
+    return r["ir"], ads
+
+
+def ads_config(*mappings: str):
+    return compile_ads(*mappings)[1]
+
+
+def names(config, kind):
+    return sorted(x['name'] for x in config['static_resources'][kind])
+
+
+@pytest.mark.compilertest
+def test_validation_cache():
+    vcache = EnvoyValidationCache(logger)
+
+    config1 = ads_config(mapping_manifest("foo", "/foo/"), mapping_manifest("bar", "/bar/"))
+
+    # Nothing has validated yet, so we need to validate everything.
+    assert vcache.validation_config(config1) is config1
+    vcache.mark_valid(config1)
+
+    # The same config needs no validation at all.
+    assert vcache.validation_config(config1) is None
+
+    # Adding a Mapping for a new service changes the listeners and adds a cluster...
+    config2 = ads_config(mapping_manifest("foo", "/foo/"), mapping_manifest("bar", "/bar/"),
+                         mapping_manifest("baz", "/baz/"))
+    partial = vcache.validation_config(config2)
+
+    assert partial is not None
+    assert partial is not config2
+
+    # ...so we validate the changed listeners, along with every cluster they need...
+    assert names(partial, 'listeners') == names(config2, 'listeners')
+
+    needed = EnvoyValidationCache.referenced_clusters(config2['static_resources']['listeners'])
+    assert set([ "cluster_baz_default", "cluster_foo_default", "cluster_bar_default" ]) <= needed
+    assert set(names(partial, 'clusters')) == needed & set(names(config2, 'clusters'))
+
+    vcache.mark_valid(config2)
+    assert vcache.validation_config(config2) is None
+
+    # ...but changing a cluster alone only needs that cluster.
+    config3 = dict(config2)
+    config3['static_resources'] = dict(config2['static_resources'])
+    config3['static_resources']['clusters'] = [ dict(c) for c in config2['static_resources']['clusters'] ]
+
+    changed = [ c for c in config3['static_resources']['clusters'] if c['name'] == "cluster_baz_default" ][0]
+    changed['connect_timeout'] = "9.000s"
+
+    partial = vcache.validation_config(config3)
+    assert partial is not None
+    assert names(partial, 'clusters') == [ "cluster_baz_default" ]
+    assert names(partial, 'listeners') == []
+
+    # Duplicate clusters can only be caught by validating everything.
+    config4 = dict(config2)
+    config4['static_resources'] = dict(config2['static_resources'])
+    config4['static_resources']['clusters'] = config2['static_resources']['clusters'] + [ changed ]
+
+    assert vcache.validation_config(config4) is config4
+
+    assert (vcache.full, vcache.partial, vcache.skipped) == (2, 2, 2)
+
+
+@pytest.mark.compilertest
+def test_validation_file(monkeypatch, tmp_path):
+    app = diagd.app
+    vcache = EnvoyValidationCache(logger)
+
+    for name, value in [ ("logger", logger),
+                         ("no_envoy", False),
+                         ("snapshot_path", str(tmp_path)),
+                         ("validation_cache", vcache) ]:
+        monkeypatch.setattr(app, name, value, raising=False)
+
+    validated = []
+
+    def check_output(command, **kwargs):
+        path = command[command.index('--config-path') + 1]
+
+        with open(path) as f:
+            validated.append((os.path.basename(path), json.load(f)))
+
+        return b''
+
+    monkeypatch.setattr(subprocess, "check_output", check_output)
+
+    watcher = AmbassadorEventWatcher(app)
+    econf_path = tmp_path / "econf-tmp.json"
+
+    def complete(config):
+        # Envoy can't validate with @type present, so it's not in the file.
+        return { k: v for k, v in json.loads(json.dumps(config)).items() if k != '@type' }
+
+    ir, config1 = compile_ads(mapping_manifest("foo", "/foo/"))
+    assert watcher.validate_envoy_config(ir, config1, 1)
+    assert validated == [ ("econf-tmp.json", complete(config1)) ]
+
+    # Validating only part of the config writes only that part...
+    config2 = dict(config1)
+    config2['static_resources'] = dict(config1['static_resources'])
+    config2['static_resources']['clusters'] = [ dict(c, connect_timeout="9.000s") if c['name'] == "cluster_foo_default" else c
+                                                for c in config1['static_resources']['clusters'] ]
+
+    assert watcher.validate_envoy_config(ir, config2, 1)
+
+    assert validated[-1][0] == "econf-tmp.json"
+    assert names(validated[-1][1], 'clusters') == [ "cluster_foo_default" ]
+
+    # ...and when nothing needs validating, nothing gets written at all.
+    os.unlink(econf_path)
+    assert watcher.validate_envoy_config(ir, config2, 1)
+
+    assert len(validated) == 2
+    assert not econf_path.exists()
+
+    # The snapshots get the complete config either way.
+    assert json.loads(watcher.econf_json(config2)) == complete(config2)
@@ -1,5 +1,9 @@
+import http.server
+import io
+import json
 import logging
 import sys
+import threading
 
 import pytest
 
@@ -30,7 +34,7 @@ from ambassador.fetch.k8sprocessor import (
 )
 from ambassador.fetch.ambassador import AmbassadorProcessor
 from ambassador.fetch.service import ServiceProcessor
-from ambassador.utils import parse_yaml
+from ambassador.utils import load_url_bytes, load_url_contents, parse_yaml
 
 
 def k8s_object_from_yaml(yaml: str) -> KubernetesObject:
@@ -424,5 +428,72 @@ class TestDependencyManager:
         assert self.deps.sorted_watt_keys() == ['secret', 'service', 'ingressclasses']
 
 
+class TestWattIngestion:
+
+    def setup_method(self):
+        self.snapshot = json.dumps({
+            'Kubernetes': {
+                'AmbassadorMapping': [ {
+                    'apiVersion': 'x.getambassador.io/v3alpha1',
+                    'kind': 'AmbassadorMapping',
+                    'metadata': { 'name': 'test', 'namespace': 'default' },
+                    'spec': { 'hostname': '*', 'prefix': '/${WATT_TEST_PREFIX}/', 'service': 'test.default' }
+                } ]
+            },
+            'Deltas': [
+                { 'kind': 'AmbassadorMapping', 'metadata': { 'name': 'test', 'namespace': 'default' }, 'deltaType': 'add' }
+            ]
+        })
+
+    def fetch(self, serialization):
+        fetcher = ResourceFetcher(logger, Config())
+        fetcher.parse_watt(serialization)
+
+        return fetcher
+
+    def test_bytes(self, monkeypatch):
+        monkeypatch.setenv('WATT_TEST_PREFIX', 'expanded')
+
+        from_str = self.fetch(self.snapshot)
+        from_bytes = self.fetch(self.snapshot.encode('utf-8'))
+
+        assert len(from_bytes.elements) == 1
+        assert from_bytes.elements[0].as_dict() == from_str.elements[0].as_dict()
+        assert from_bytes.elements[0]['prefix'] == '/expanded/'
+        assert from_bytes.deltas == from_str.deltas
+
+    def test_load_url(self):
+        payload = (self.snapshot * 1000).encode('utf-8')
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/snapshot'
+
+            tee = io.BytesIO()
+            assert load_url_bytes(logger, url, stream2=tee) == payload
+            assert tee.getvalue() == payload
+
+            assert load_url_contents(logger, url) == payload.decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert load_url_bytes(logger, url) is None
+
+
 if __name__ == '__main__':
     pytest.main(sys.argv)
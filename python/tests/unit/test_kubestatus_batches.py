@@ -0,0 +1,142 @@
+import logging
+import threading
+
+from types import SimpleNamespace
+
+from prometheus_client import CollectorRegistry
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador_diag.diagd import KubeStatus, KubeStatusNoMappings
+
+
+class RecordingKubeStatus (KubeStatus):
+    """
+    A KubeStatus that records batches instead of running kubestatus. The
+    first batch doesn't finish until we say so.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        self.registry = CollectorRegistry()
+        super().__init__(SimpleNamespace(logger=logger, metrics_registry=self.registry), **kwargs)
+
+        self.batches = []
+        self.in_flight = threading.Event()
+        self.release = threading.Event()
+        self.done = threading.Semaphore(0)
+        self.fail = set()
+
+    def run_batch(self, updates):
+        self.batches.append(list(updates))
+
+        if len(self.batches) == 1:
+            self.in_flight.set()
+            assert self.release.wait(10)
+
+        return { f"{kind}/{name}.{namespace}": "nope"
+                 for kind, name, namespace, text in updates if name in self.fail }
+
+    def write_batch(self, batch):
+        super().write_batch(batch)
+        self.done.release()
+
+    def wait_batches(self, count):
+        for _ in range(count):
+            assert self.done.acquire(timeout=10)
+
+    def metric(self, name, **labels):
+        return self.registry.get_sample_value(f"ambassador_{name}", labels)
+
+
+def test_batches_coalesce():
+    ks = RecordingKubeStatus()
+
+    ks.post("Ingress", "first", "default", '{"n": 0}')
+    assert ks.in_flight.wait(10)
+
+    # While the first batch is in flight, updates pile up and repeated
+    # updates for the same resource replace each other.
+    for i in range(1, 4):
+        ks.post("Ingress", "a", "default", '{"n": %d}' % i)
+        ks.post("Mapping", "m", "other", '{"n": %d}' % i)
+        ks.post("Ingress", "b", "other", '{"n": %d}' % i)
+
+    # Posting a status that's already current does nothing.
+    ks.post("Ingress", "a", "default", '{"n": 3}')
+
+    ks.release.set()
+    ks.wait_batches(2)
+
+    assert ks.batches == [
+        [ ("Ingress", "first", "default", '{"n": 0}') ],
+        # Grouped by kind and namespace.
+        [ ("Ingress", "a", "default", '{"n": 3}'),
+          ("Ingress", "b", "other", '{"n": 3}'),
+          ("Mapping", "m", "other", '{"n": 3}') ]
+    ]
+
+    assert ks.metric("kubestatus_updates_total", result="coalesced") == 6
+    assert ks.metric("kubestatus_updates_total", result="ok") == 4
+    assert ks.metric("kubestatus_batch_size_count") == 2
+
+
+def test_failed_updates_retry():
+    ks = RecordingKubeStatus()
+    ks.release.set()
+    ks.fail.add("bad")
+
+    for _ in range(2):
+        # Hold the writer off until both updates are posted.
+        with ks.cond:
+            ks.post("Ingress", "good", "default", '{}')
+            ks.post("Ingress", "bad", "default", '{}')
+
+        ks.wait_batches(1)
+
+    # Only the update that failed gets written again.
+    assert [ name for batch in ks.batches for kind, name, namespace, text in batch ].count("good") == 1
+    assert ks.batches[-1] == [ ("Ingress", "bad", "default", '{}') ]
+    assert ks.metric("kubestatus_updates_total", result="error") == 2
+
+
+def test_backpressure():
+    ks = RecordingKubeStatus(max_batch=2, max_pending=2)
+
+    ks.post("Ingress", "first", "default", '{}')
+    assert ks.in_flight.wait(10)
+
+    ks.post("Ingress", "a", "default", '{}')
+    ks.post("Ingress", "b", "default", '{}')
+
+    # The queue is full, so the next post has to wait for the writer.
+    blocked = threading.Thread(target=ks.post, args=("Ingress", "c", "default", '{}'))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+
+    # ...but updating something already queued doesn't.
+    ks.post("Ingress", "a", "default", '{"again": true}')
+
+    ks.release.set()
+    blocked.join(10)
+    assert not blocked.is_alive()
+
+    ks.wait_batches(3)
+
+    assert [ [ name for kind, name, namespace, text in batch ] for batch in ks.batches ] == [
+        [ "first" ], [ "a", "b" ], [ "c" ]
+    ]
+
+
+def test_no_mappings():
+    ks = KubeStatusNoMappings(SimpleNamespace(logger=logger, metrics_registry=CollectorRegistry()))
+    ks.post("Mapping", "m", "default", '{}')
+
+    assert ks.current_status == {}
+    assert not ks.pending
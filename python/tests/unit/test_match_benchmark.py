@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador_cli.match_benchmark import CASES, MatchBenchmark, compare
+
+
+def test_compare():
+    baseline = { "cases": { "fast": { "ops_per_second": 1000.0 },
+                            "slow": { "ops_per_second": 1000.0 },
+                            "gone": { "ops_per_second": 1000.0 } } }
+    results = { "cases": { "fast": { "ops_per_second": 850.0 },
+                           "slow": { "ops_per_second": 700.0 },
+                           "new": { "ops_per_second": 1.0 } } }
+
+    regressions = compare(baseline, results, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("slow:")
+
+    assert compare(baseline, results, tolerance=0.5) == []
+
+
+@pytest.mark.compilertest
+def test_match_benchmark():
+    benchmark = MatchBenchmark(logger, { "mappings": 60, "hosts": 12, "teams": 3 }, min_seconds=0.01)
+    results = benchmark.run(repeat=2)
+
+    assert results["index_consistent"]
+    assert results["counts"]["hosts"] == 12
+    assert results["counts"]["routes"] >= 60
+
+    for name in CASES:
+        case = results["cases"][name]
+
+        assert case["ops"] > 0
+        assert case["ops_per_second"] > 0
+        assert len(case["ops_per_second_all"]) == 2
+
+    # A run never regresses against itself.
+    assert compare(results, results) == []
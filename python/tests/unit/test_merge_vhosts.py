@@ -0,0 +1,109 @@
+import json
+import logging
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from tests.utils import econf_compile
+
+
+def manifests() -> str:
+    # Three Hosts: shop and blog get only the Mappings for every host, but api
+    # has one of its own, too.
+    yaml = """
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorListener
+metadata:
+  name: listener-8080
+  namespace: default
+spec:
+  port: 8080
+  protocol: HTTP
+  securityModel: XFP
+  hostBinding:
+    namespace:
+      from: ALL
+"""
+
+    for name in [ "api", "shop", "blog" ]:
+        yaml += f"""
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorHost
+metadata:
+  name: {name}
+  namespace: default
+spec:
+  hostname: {name}.example.com
+  acmeProvider:
+    authority: none
+  requestPolicy:
+    insecure:
+      action: Route
+"""
+
+    for name, hostname in [ ("health", "*"), ("static", "*"), ("api", "api.example.com") ]:
+        yaml += f"""
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorMapping
+metadata:
+  name: {name}
+  namespace: default
+spec:
+  hostname: "{hostname}"
+  prefix: /{name}/
+  service: {name}
+"""
+
+    return yaml
+
+
+def generate(monkeypatch, merge: bool):
+    monkeypatch.setenv("AMBASSADOR_MERGE_VIRTUAL_HOSTS", "true" if merge else "false")
+
+    return econf_compile(manifests(), envoy_version="V3")
+
+
+def route_configs(econf):
+    for listener in econf["static_resources"]["listeners"]:
+        for filter_chain in listener["filter_chains"]:
+            for f in filter_chain["filters"]:
+                if f["name"] == "envoy.filters.network.http_connection_manager":
+                    yield f["typed_config"]["route_config"]
+
+
+def routes_by_domain(econf):
+    # For each route_config, what routes does each domain get?
+    return [ { domain: vhost["routes"] for vhost in route_config["virtual_hosts"] for domain in vhost["domains"] }
+             for route_config in route_configs(econf) ]
+
+
+@pytest.mark.compilertest
+def test_merge_vhosts(monkeypatch):
+    separate = generate(monkeypatch, merge=False)
+    merged = generate(monkeypatch, merge=True)
+
+    # Every domain still gets exactly the same routes...
+    assert routes_by_domain(merged) == routes_by_domain(separate)
+
+    # ...but each distinct route table shows up only once per route_config.
+    vhost_count = lambda econf: sum(len(rc["virtual_hosts"]) for rc in route_configs(econf))
+
+    assert vhost_count(merged) < vhost_count(separate)
+
+    domains = [ sorted(vhost["domains"]) for rc in route_configs(merged) for vhost in rc["virtual_hosts"] ]
+    assert [ "blog.example.com", "shop.example.com" ] in domains
+    assert [ "api.example.com" ] in domains
+
+    for route_config in route_configs(merged):
+        tables = [ json.dumps(vhost["routes"], sort_keys=True) for vhost in route_config["virtual_hosts"] ]
+        assert len(tables) == len(set(tables))
@@ -0,0 +1,97 @@
+import copy
+import json
+
+import jsonpatch
+
+from ambassador.diagnostics import OverviewPatcher
+
+
+def drop_serialization(d):
+    d.pop("serialization", None)
+    return d
+
+
+def new_patcher(**kwargs):
+    return OverviewPatcher(serialize=json.dumps,
+                           parse=lambda s: json.loads(s, object_hook=drop_serialization),
+                           **kwargs)
+
+
+def overview(uptime, routes, errors=None):
+    return {
+        "envoy_status": { "uptime": uptime },
+        "route_info": [ { "key": r, "serialization": "secret" } for r in routes ],
+        "errors": errors or []
+    }
+
+
+def expected(tvars):
+    return json.loads(json.dumps(tvars), object_hook=drop_serialization)
+
+
+def test_patches_rebuild_overview():
+    patcher = new_patcher()
+    seen = {}
+
+    for tvars in [ overview(1, [ "a", "b" ]),
+                   overview(2, [ "a", "b" ]),
+                   overview(3, [ "a", "c", "d" ], errors=[ "oops" ]),
+                   { "route_info": [] } ]:
+        patch = json.loads(patcher.patch_for("client", tvars))
+        seen = jsonpatch.apply_patch(seen, patch)
+
+        assert seen == expected(tvars)
+
+    # Nothing changed, so nothing to patch.
+    assert json.loads(patcher.patch_for("client", { "route_info": [] })) == []
+
+
+def test_patches_are_shared():
+    patcher = new_patcher()
+
+    first = overview(1, [ "a", "b" ])
+    second = overview(2, [ "a", "b", "c" ])
+
+    for client in [ "one", "two", "three" ]:
+        patcher.patch_for(client, copy.deepcopy(first))
+
+    patches = set(patcher.patch_for(client, copy.deepcopy(second)) for client in [ "one", "two", "three" ])
+
+    # Everyone went from the same version to the same version, so they all
+    # got the same patch, and it was only computed once.
+    assert len(patches) == 1
+    assert patcher.stats()["patches_shared"] == 4
+
+    # A client we've never heard of gets everything.
+    patch = json.loads(patcher.patch_for("four", copy.deepcopy(second)))
+    assert jsonpatch.apply_patch({}, patch) == expected(second)
+
+
+def test_stable_sections():
+    patcher = new_patcher()
+
+    patcher.patch_for("client", overview(1, [ "a" ]), stable_key=1, volatile=[ "envoy_status" ])
+    assert patcher.stats()["serialized"] == 3
+
+    # Only the volatile section gets serialized again...
+    patch = json.loads(patcher.patch_for("client", overview(2, [ "a" ]), stable_key=1, volatile=[ "envoy_status" ]))
+    assert patcher.stats()["serialized"] == 4
+    assert patch == [ { "op": "replace", "path": "/envoy_status/uptime", "value": 2 } ]
+
+    # ...until the stable key changes.
+    seen = jsonpatch.apply_patch({}, json.loads(patcher.patch_for("other", overview(2, [ "a" ]))))
+    patch = json.loads(patcher.patch_for("other", overview(3, [ "b" ]), stable_key=2, volatile=[ "envoy_status" ]))
+    assert jsonpatch.apply_patch(seen, patch) == expected(overview(3, [ "b" ]))
+
+
+def test_forgotten_versions():
+    patcher = new_patcher(max_versions=2)
+
+    patcher.patch_for("old", overview(1, [ "a" ]))
+    patcher.patch_for("new", overview(2, [ "a" ]))
+    patcher.patch_for("new", overview(3, [ "a" ]))
+
+    # The version "old" has is gone, so it has to start over.
+    patch = json.loads(patcher.patch_for("old", overview(3, [ "a" ])))
+    assert jsonpatch.apply_patch({}, patch) == expected(overview(3, [ "a" ]))
+    assert patcher.stats()["versions"] == 2
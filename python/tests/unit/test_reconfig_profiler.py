@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+import ambassador_diag.diagd as diagd
+from ambassador.reconfig_profiler import ReconfigProfiler
+from ambassador.utils import Timer
+
+
+class WidgetFactory:
+    @classmethod
+    def load_all(cls, seconds: float) -> None:
+        busy_wait(seconds)
+
+
+def busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+
+    while time.perf_counter() < end:
+        pass
+
+
+def test_reconfig_profiler(tmp_path):
+    profiler = ReconfigProfiler(logger, str(tmp_path), interval=0.001)
+
+    # Nothing requested, nothing profiled.
+    assert not profiler.start()
+    assert profiler.finish("snapshot-0", "complete") is None
+
+    assert profiler.request(2) == 2
+
+    for i in range(3):
+        profiling = profiler.start()
+        WidgetFactory.load_all(0.1)
+        paths = profiler.finish(f"snapshot-{i}", "complete")
+
+        if i < 2:
+            assert profiling
+            assert paths and all(os.path.exists(p) for p in paths)
+        else:
+            # We only asked for two.
+            assert not profiling
+            assert paths is None
+
+    status = profiler.status()
+    assert status["remaining"] == 0
+    assert status["profiles"] == 2
+    assert not status["active"]
+
+    folded_path, summary_path = status["last_paths"]
+
+    # Every folded line is "frame;frame;... count", and our busy loop should
+    # show up under the factory.
+    lines = open(folded_path).read().splitlines()
+    assert lines
+
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+
+    assert any(("WidgetFactory.load_all;" in line) and ("busy_wait" in line) for line in lines)
+
+    summary = json.load(open(summary_path))
+    assert summary["snapshot"] == "snapshot-1"
+    assert summary["outcome"] == "complete"
+    assert summary["samples"] == sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+    assert summary["phases"]["WidgetFactory.load_all"]["samples"] > 0
+    assert summary["top_self"][0]["function"].endswith("busy_wait")
+
+
+def test_reconfig_profiler_aborted(tmp_path):
+    profiler = ReconfigProfiler(logger, str(tmp_path), interval=0.001)
+    profiler.request(2)
+
+    # If a reconfigure never finishes, the next one writes out what it got.
+    assert profiler.start()
+    busy_wait(0.01)
+
+    assert profiler.start()
+    assert profiler.status()["profiles"] == 1
+
+    summary = json.load(open(profiler.status()["last_paths"][1]))
+    assert summary["outcome"] == "aborted"
+
+    assert profiler.finish("snapshot-1", "incremental")
+    assert profiler.request(0) == 0
+
+
+def test_reconfig_profiler_failed_reconfigure(tmp_path, monkeypatch):
+    profiler = ReconfigProfiler(logger, str(tmp_path), interval=0.001)
+    profiler.request(1)
+
+    monkeypatch.setattr(diagd.app, "logger", logger, raising=False)
+    monkeypatch.setattr(diagd.app, "snapshot_path", str(tmp_path), raising=False)
+    monkeypatch.setattr(diagd, "load_url_bytes", lambda logger, url, stream2=None: None)
+
+    watcher = diagd.AmbassadorEventWatcher(SimpleNamespace(logger=logger, reconf_profiler=profiler,
+                                                           config_timer=Timer("reconfiguration"),
+                                                           fetcher_timer=Timer("Fetcher")))
+
+    def failing_load_ir(*args, **kwargs):
+        busy_wait(0.01)
+        raise RuntimeError("no IR for you")
+
+    watcher._load_ir = failing_load_ir
+
+    # A reconfigure that blows up still writes out its profile.
+    with pytest.raises(RuntimeError):
+        watcher.load_config_watt(None, "http://localhost/snapshot-1")
+
+    status = profiler.status()
+    assert not status["active"]
+    assert status["profiles"] == 1
+
+    summary = json.load(open(status["last_paths"][1]))
+    assert summary["snapshot"] == "snapshot-1"
+    assert summary["outcome"] == "aborted"
@@ -78,6 +78,7 @@ def test_reconfig_stats():
 
     assert_checks(r, 84, False, True)
 
+    r.mark_reset("module")
     r.mark("complete", 100)
     assert_checks(r, 101, False, True)
     r.mark("incremental", 102)
@@ -93,6 +94,7 @@ def test_reconfig_stats():
     assert r.incrementals_outstanding == 2
     assert r.checks == 3
     assert r.errors == 1
+    assert r.resets == { "module": 1 }
 
 
 if __name__ == '__main__':
@@ -0,0 +1,97 @@
+import copy
+import io
+import logging
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.cachestore import CachePickler, CacheUnpickler
+from ambassador.ir.irbasemapping import IRBaseMapping
+from ambassador.ir.ircluster import IRCluster
+from ambassador.ir.irresource import IRResource
+
+from tests.utils import compile_with_cachecheck
+
+
+MANIFESTS = """
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorListener
+metadata:
+  name: listener-8080
+  namespace: default
+spec:
+  port: 8080
+  protocol: HTTP
+  securityModel: INSECURE
+  hostBinding:
+    namespace:
+      from: ALL
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorMapping
+metadata:
+  name: slotted
+  namespace: default
+spec:
+  hostname: "*"
+  prefix: /slotted/
+  service: slotted:8080
+"""
+
+
+def test_slot_names():
+    assert { 'ir', 'logger', '_active', '_errored', '_cache_key' } <= IRResource._slot_names
+    assert { 'cached_status', 'status_update', 'cluster_key' } <= IRBaseMapping._slot_names
+    assert { '_hostname', '_port', '_cache_key' } <= IRCluster._slot_names
+
+
+@pytest.mark.compilertest
+def test_resource_slots():
+    r = compile_with_cachecheck(MANIFESTS, envoy_version="V3")
+    ir = r["ir"]
+
+    mapping = [ m for g in ir.groups.values() for m in g.mappings if m.name == "slotted" ][0]
+    cluster = ir.clusters[mapping.cluster.name]
+
+    # Bookkeeping lives in slots, not in the dict...
+    for key in [ 'ir', 'logger', '_active', '_errored', '_cache_key', 'cluster_key' ]:
+        assert key not in mapping
+
+    assert mapping.ir is ir
+    assert mapping.is_active()
+    assert mapping.cache_key == "AmbassadorMapping-v2-slotted-default"
+    assert mapping.prefix == "/slotted/"
+
+    # ...but as_dict still reports it.
+    md = mapping.as_dict()
+    assert md['_active'] is True
+    assert md['_errored'] is False
+    assert md['_cache_key'] == mapping.cache_key
+    assert 'ir' not in md
+    assert 'logger' not in md
+
+    cd = cluster.as_dict()
+    assert cd['_hostname'] == "slotted"
+    assert cd['_port'] == 8080
+
+    # Nobody has referred to the Mapping, so it has no _referenced_by.
+    assert '_referenced_by' not in mapping
+
+    # Slots have to survive copying and pickling, since the cache relies on both.
+    buffer = io.BytesIO()
+    CachePickler(buffer).dump(cluster)
+    buffer.seek(0)
+
+    for clone in [ copy.copy(cluster), CacheUnpickler(buffer).load() ]:
+        assert clone._hostname == "slotted"
+        assert clone._port == 8080
+        assert clone.cache_key == cluster.cache_key
+        assert clone.name == cluster.name
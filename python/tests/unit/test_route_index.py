@@ -0,0 +1,116 @@
+import logging
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from tests.utils import compile_with_cachecheck
+
+
+def host_manifest(name: str, hostname: str, extra: str="") -> str:
+    return f"""
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorHost
+metadata:
+  name: {name}
+  namespace: default
+spec:
+  hostname: "{hostname}"
+  requestPolicy:
+    insecure:
+      action: Route{extra}
+"""
+
+
+def mapping_manifest(name: str, hostname: str, labels: str="") -> str:
+    return f"""
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorMapping
+metadata:
+  name: {name}
+  namespace: default{labels}
+spec:
+  hostname: "{hostname}"
+  prefix: /{name}/
+  service: {name}
+"""
+
+
+MANIFESTS = """
+---
+apiVersion: x.getambassador.io/v3alpha1
+kind: AmbassadorListener
+metadata:
+  name: listener-8080
+  namespace: default
+spec:
+  port: 8080
+  protocol: HTTP
+  securityModel: INSECURE
+  hostBinding:
+    namespace:
+      from: ALL
+""" + \
+    host_manifest("exact", "foo.example.com") + \
+    host_manifest("other", "bar.example.org") + \
+    host_manifest("glob", "*.example.com") + \
+    host_manifest("labeled", "labeled.example.net", """
+  selector:
+    matchLabels:
+      team: blue""") + \
+    mapping_manifest("exact", "foo.example.com") + \
+    mapping_manifest("prefix", "foo.*") + \
+    mapping_manifest("suffix", "*.example.com") + \
+    mapping_manifest("star", "*") + \
+    mapping_manifest("middle", "foo.*.com") + \
+    mapping_manifest("nomatch", "nothing.example.io") + \
+    mapping_manifest("blue", "nothing.example.io", """
+  labels:
+    team: blue""") + \
+    mapping_manifest("red", "nothing.example.io", """
+  labels:
+    team: red""")
+
+
+@pytest.mark.compilertest
+def test_route_index():
+    r = compile_with_cachecheck(MANIFESTS, envoy_version="V3")
+
+    ir = r["ir"]
+    econf = r["v3"]
+
+    hosts = ir.get_hosts()
+    assert sorted(host.hostname for host in hosts) == \
+        [ "*.example.com", "bar.example.org", "foo.example.com", "labeled.example.net" ]
+
+    # The index must agree exactly with asking each Host about each route.
+    for host in hosts:
+        expected = set(idx for idx, rv in enumerate(econf.route_variants)
+                       if host.matches_httpgroup(rv.route._group))
+
+        assert econf.route_index.matching_routes(host) == expected, f"{host.hostname} mismatch"
+
+    def matched(hostname):
+        host = [ h for h in hosts if h.hostname == hostname ][0]
+
+        return sorted(set(econf.route_variants[idx].route._group.get('host')
+                          for idx in econf.route_index.matching_routes(host)))
+
+    assert matched("foo.example.com") == [ "*", "*.example.com", "foo.*", "foo.example.com" ]
+    assert matched("bar.example.org") == [ "*" ]
+    assert matched("*.example.com") == [ "*.example.com", "foo.example.com" ]
+
+    # The labeled Host picks up the blue Mapping by selector.
+    labeled = [ h for h in hosts if h.hostname == "labeled.example.net" ][0]
+    labeled_routes = [ econf.route_variants[idx].route for idx in econf.route_index.matching_routes(labeled) ]
+
+    assert sorted(route["match"]["prefix"] for route in labeled_routes
+                  if route._group.get('host') == "nothing.example.io") == [ "/blue/" ]
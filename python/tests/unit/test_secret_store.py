@@ -0,0 +1,115 @@
+import logging
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.secretstore import SecretStore, secret_store_for
+from ambassador.utils import SecretHandler
+
+
+def secret_path(cache_dir, name: str, filename: str) -> str:
+    return os.path.join(str(cache_dir), "default", "secrets-decoded", name, filename)
+
+
+def test_skip_unchanged(tmp_path):
+    store = SecretStore(logger, str(tmp_path))
+    path = secret_path(tmp_path, "one", "ABC.crt")
+
+    store.write(path, "cert")
+    inode = os.stat(path).st_ino
+
+    store.write(path, "cert")
+
+    stats = store.end_generation()
+    assert stats["files_written"] == 1
+    assert stats["files_skipped"] == 1
+    assert stats["bytes_written"] == 4
+
+    # Unchanged contents aren't rewritten...
+    assert os.stat(path).st_ino == inode
+
+    # ...but changed ones are, atomically, leaving nothing else behind.
+    store.write(path, "new cert")
+
+    with open(path) as f:
+        assert f.read() == "new cert"
+
+    assert os.listdir(os.path.dirname(path)) == [ "ABC.crt" ]
+    assert store.end_generation()["files_written"] == 1
+
+
+def test_existing_files(tmp_path):
+    path = secret_path(tmp_path, "one", "ABC.key")
+    SecretStore(logger, str(tmp_path)).write(path, "key")
+
+    # A new store (after a restart, say) checks what's on disk before writing.
+    store = SecretStore(logger, str(tmp_path))
+    store.write(path, "key")
+
+    stats = store.end_generation()
+    assert stats["files_written"] == 0
+    assert stats["files_skipped"] == 1
+
+
+def test_collect(tmp_path):
+    store = SecretStore(logger, str(tmp_path), keep_generations=2)
+
+    old = secret_path(tmp_path, "old", "OLD.crt")
+    live = secret_path(tmp_path, "live", "LIVE.crt")
+    stranger = secret_path(tmp_path, "stranger", "STRANGER.crt")
+
+    # Something left over from before we started...
+    os.makedirs(os.path.dirname(stranger))
+
+    with open(stranger, "w") as f:
+        f.write("stranger")
+
+    # ...then one secret that stops being used, and one that doesn't.
+    store.write(old, "old")
+    store.write(live, "live")
+    store.end_generation()
+
+    store.write(live, "live")
+    assert store.end_generation()["files_removed"] == 0
+
+    assert os.path.exists(old)
+    assert os.path.exists(stranger)
+
+    store.write(live, "live")
+    stats = store.end_generation()
+
+    assert stats["files_removed"] == 2
+    assert stats["files"] == 1
+
+    assert not os.path.exists(os.path.dirname(old))
+    assert not os.path.exists(os.path.dirname(stranger))
+    assert os.path.exists(live)
+
+
+def test_shared_store(tmp_path):
+    cache_dir = str(tmp_path)
+
+    first = SecretHandler(logger, "source", cache_dir, "1")
+    ss = first.cache_internal("tls", "default", "crt", "key", None, "root")
+
+    assert ss
+    assert ss.cert_path == secret_path(tmp_path, "tls", os.path.basename(ss.cert_path))
+    assert ss.root_cert_path.endswith(".root.crt")
+
+    # Every handler for the same cache_dir shares the store, so a later
+    # reconfigure doesn't write the secret again.
+    second = SecretHandler(logger, "source", cache_dir, "2")
+    assert second.secret_store is first.secret_store
+    assert secret_store_for(logger, cache_dir) is first.secret_store
+
+    second.cache_internal("tls", "default", "crt", "key", None, "root")
+
+    stats = second.secret_store.end_generation()
+    assert stats["files_written"] == 3
+    assert stats["files_skipped"] == 3
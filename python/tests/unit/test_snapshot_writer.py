@@ -0,0 +1,155 @@
+import gzip
+import logging
+import os
+import threading
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.snapshot_writer import SnapshotWriter
+
+
+def reconfigure(writer, path, n, **serializers):
+    # What the reconfiguration writes for itself before submitting.
+    with open(os.path.join(path, "snapshot-tmp.yaml"), "w") as output:
+        output.write(f"snapshot {n}")
+
+    with open(os.path.join(path, "econf-tmp.json"), "w") as output:
+        output.write(f"econf {n}")
+
+    writer.submit(str(n), { "aconf": lambda: f"aconf {n}", "ir": lambda: f"ir {n}", **serializers })
+
+
+def contents(path, name):
+    if name.endswith(".gz"):
+        with gzip.open(os.path.join(path, name), "rt") as input:
+            return input.read()
+
+    with open(os.path.join(path, name), "r") as input:
+        return input.read()
+
+
+def test_rotation(tmp_path):
+    path = str(tmp_path)
+    writer = SnapshotWriter(logger, path, count=2)
+
+    for n in range(1, 5):
+        reconfigure(writer, path, n)
+        assert writer.wait_idle(10)
+
+    # The current snapshot, plus the two before it.
+    for artifact in [ "aconf", "econf", "ir" ]:
+        assert contents(path, f"{artifact}.json") == f"{artifact} 4"
+        assert contents(path, f"{artifact}-1.json") == f"{artifact} 3"
+        assert contents(path, f"{artifact}-2.json") == f"{artifact} 2"
+
+    assert contents(path, "snapshot.yaml") == "snapshot 4"
+    assert contents(path, "snapshot-2.yaml") == "snapshot 2"
+
+    # Nothing left lying around.
+    assert len(os.listdir(path)) == 12
+    assert writer.stats()["written"] == 4
+
+
+def test_detail_and_compression(tmp_path):
+    path = str(tmp_path)
+    writer = SnapshotWriter(logger, path, count=0, detail="minimal", compression="gzip")
+
+    reconfigure(writer, path, 1)
+    assert writer.wait_idle(10)
+
+    assert sorted(os.listdir(path)) == [ "econf.json.gz", "snapshot.yaml.gz" ]
+    assert contents(path, "econf.json.gz") == "econf 1"
+    assert contents(path, "snapshot.yaml.gz") == "snapshot 1"
+
+    with pytest.raises(ValueError):
+        SnapshotWriter(logger, path, detail="everything")
+
+
+def test_superseded_jobs(tmp_path):
+    path = str(tmp_path)
+    writer = SnapshotWriter(logger, path, count=4)
+
+    started = threading.Event()
+    release = threading.Event()
+    write_contents = writer.write_contents
+
+    def slow_write_contents(path, contents):
+        if contents == b"ir 1":
+            started.set()
+            assert release.wait(10)
+
+        write_contents(path, contents)
+
+    writer.write_contents = slow_write_contents
+
+    reconfigure(writer, path, 1)
+    assert started.wait(10)
+
+    # While the first job is being written, two more reconfigurations come
+    # in. Only the latest gets written, and the second's files are cleaned up.
+    reconfigure(writer, path, 2)
+    reconfigure(writer, path, 3)
+
+    release.set()
+    assert writer.wait_idle(10)
+
+    assert contents(path, "ir.json") == "ir 3"
+    assert contents(path, "ir-1.json") == "ir 1"
+    assert contents(path, "snapshot.yaml") == "snapshot 3"
+    assert not [ name for name in os.listdir(path) if name.startswith(".") ]
+
+    assert writer.stats()["written"] == 2
+    assert writer.stats()["dropped"] == 1
+
+
+def test_serialized_in_background(tmp_path):
+    path = str(tmp_path)
+    writer = SnapshotWriter(logger, path, count=0)
+
+    started = threading.Event()
+    release = threading.Event()
+
+    # Serializing happens on the writer thread, so the next reconfiguration
+    # has to wait for it before changing anything that gets serialized.
+    ir = { "generation": 1 }
+
+    def serialize_ir():
+        started.set()
+        assert release.wait(10)
+        return str(ir)
+
+    reconfigure(writer, path, 1, ir=serialize_ir)
+    assert started.wait(10)
+    assert not writer.wait_serialized(0.1)
+
+    release.set()
+    assert writer.wait_serialized(10)
+    ir["generation"] = 2
+    assert writer.wait_idle(10)
+
+    assert contents(path, "ir.json") == str({ "generation": 1 })
+
+
+def test_unwanted_artifacts_not_serialized(tmp_path):
+    path = str(tmp_path)
+    serialized = []
+
+    def serializer(artifact):
+        return lambda: serialized.append(artifact) or artifact
+
+    for detail in [ "none", "minimal" ]:
+        writer = SnapshotWriter(logger, path, count=0, detail=detail)
+        reconfigure(writer, path, 1, aconf=serializer("aconf"), ir=serializer("ir"))
+
+        assert writer.wait_serialized(10)
+        assert writer.wait_idle(10)
+
+    assert serialized == []
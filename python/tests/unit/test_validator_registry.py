@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from google.protobuf import json_format
+
+from ambassador import Config
+from ambassador.config import ACResource
+from ambassador.config.validators import validator_registry
+from ambassador.proto.v2.Host_pb2 import HostSpec
+
+
+def host(name, **spec):
+    return ACResource(f"{name}.default.1", "test", kind="Host", name=name, namespace="default",
+                      apiVersion="getambassador.io/v2", **spec)
+
+
+def test_proto_validation():
+    validator_registry.clear()
+
+    good = host("good", hostname="foo.example.com", tlsSecret={ "name": "foo" })
+    bad = host("bad", hostname="foo.example.com", bogus=1)
+
+    rc = Config().get_validator("v2", "Host")(good)
+    assert rc, rc
+
+    rc = Config().get_validator("v2", "Host")(bad)
+    assert not rc
+
+    # Same error as parsing the JSON would give.
+    try:
+        json_format.Parse(json.dumps({ "hostname": "foo.example.com", "bogus": 1 }), HostSpec())
+        assert False, "bogus field accepted"
+    except json_format.ParseError as e:
+        assert rc.as_dict()['error'] == str(e)
+
+    # A new Config uses the same proto class, and doesn't validate the same
+    # contents again.
+    assert validator_registry.stats()["misses"] == 2
+
+    for name in [ "good", "bad" ]:
+        rc = Config().get_validator("v2", "Host")(good if name == "good" else bad)
+        assert bool(rc) == (name == "good")
+
+    assert validator_registry.stats() == {
+        "protoclasses": 1,
+        "schemas": 0,
+        "results": 2,
+        "hits": 2,
+        "misses": 2
+    }
+
+
+def test_jsonschema_validation(tmp_path):
+    validator_registry.clear()
+
+    os.makedirs(os.path.join(tmp_path, "v9"))
+
+    with open(os.path.join(tmp_path, "v9", "Widget.schema"), "w") as output:
+        json.dump({
+            "type": "object",
+            "properties": { "size": { "type": "integer" } },
+            "required": [ "size" ]
+        }, output)
+
+    def widget(name, **spec):
+        return ACResource(f"{name}.default.1", "test", kind="Widget", name=name,
+                          apiVersion="getambassador.io/v9", **spec)
+
+    for _ in range(2):
+        validator = Config(schema_dir_path=str(tmp_path)).get_validator("v9", "Widget")
+
+        assert validator(widget("ok", size=3))
+
+        rc = validator(widget("bad", size="large"))
+        assert not rc
+        assert rc.as_dict()['error'].startswith("not a valid Widget: 'large' is not of type 'integer'")
+
+    assert validator_registry.stats()["schemas"] == 1
+    assert validator_registry.stats()["misses"] == 2
+    assert validator_registry.stats()["hits"] == 2
+
+    # Kinds with no schema or proto still get the cannot_validate validator.
+    assert Config(schema_dir_path=str(tmp_path)).get_validator("v9", "Gadget")(widget("other"))